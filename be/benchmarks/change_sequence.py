@@ -0,0 +1,174 @@
+"""
+Change sequence lock benchmark
+
+Every task write, and every archive batch, reserves its change sequence
+numbers last and keeps the single `task_change_sequence` row locked until
+it commits (see next_change_seq). On MySQL that part of the writes runs one
+at a time, whatever the pool size: the time a write holds the row bounds the
+write throughput of the whole deployment.
+
+Measures that hold time per kind of write, from the reservation to the end
+of the commit, along with the time of the whole write, and derives the
+ceiling it puts on writes and tasks written per second. SQLite serializes
+writers anyway, run it against MySQL with --db-url for numbers that apply
+to production. Run from the `be` directory:
+
+    python -m benchmarks.change_sequence --tasks 100000 --iterations 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import service.task_archive_service
+import service.task_service
+from benchmarks.common import percentiles
+from benchmarks.suite import seed
+from models.task import TaskBulkUpdateItemDTO, TaskCreateDTO, TaskUpdateDTO
+from service.task_archive_service import TaskArchiveService
+from service.task_change_service import next_change_seq
+from service.task_service import TaskService
+from utils.clock import utc_now
+from utils.task_cache import task_cache
+
+hold_samples: list[float] = []
+
+
+async def timed_next_change_seq(session: AsyncSession, count: int = 1) -> int:
+    session.sync_session.info["seq_locked_at"] = time.perf_counter()
+    return await next_change_seq(session, count)
+
+
+@event.listens_for(Session, "after_commit")
+def _record_hold(session):
+    locked_at = session.info.pop("seq_locked_at", None)
+    if locked_at is not None:
+        hold_samples.append(time.perf_counter() - locked_at)
+
+
+def operations(tasks: int, users: int, args, rnd: random.Random) -> dict:
+    created: list[int] = []
+    bulk_created: list[list[int]] = []
+
+    def user_id() -> int:
+        return rnd.randint(1, users)
+
+    async def create_task(session):
+        task = await TaskService(session).create_task(
+            TaskCreateDTO(title="Bench", description="Created", assignee_id=user_id()),
+            creator_id=user_id(),
+        )
+        created.append(task.id)
+
+    async def update_task(session):
+        await TaskService(session).update_task(
+            rnd.randint(1, tasks), TaskUpdateDTO(assignee_id=user_id())
+        )
+
+    async def delete_task(session):
+        await TaskService(session).delete_task(created.pop())
+
+    async def bulk_create_tasks(session):
+        items = [
+            TaskCreateDTO(title=f"Bulk {i}", description="Created", assignee_id=user_id())
+            for i in range(args.bulk_size)
+        ]
+        results = await TaskService(session).bulk_create_tasks(items, creator_id=user_id())
+        bulk_created.append([result.id for result in results])
+
+    async def bulk_update_tasks(session):
+        first = rnd.randint(1, tasks - args.bulk_size)
+        await TaskService(session).bulk_update_tasks(
+            [
+                TaskBulkUpdateItemDTO(id=task_id, assignee_id=user_id())
+                for task_id in range(first, first + args.bulk_size)
+            ]
+        )
+
+    async def bulk_delete_tasks(session):
+        await TaskService(session).bulk_delete_tasks(bulk_created.pop())
+
+    async def archive_batch(session):
+        # The seeded tasks were all written just now
+        cutoff = utc_now() + timedelta(days=1)
+        await TaskArchiveService(session).archive_batch(cutoff, args.archive_batch_size)
+
+    # Name: (operation, tasks written per call); deletes use what was created
+    return {
+        "task.create_task": (create_task, 1),
+        "task.update_task": (update_task, 1),
+        "task.delete_task": (delete_task, 1),
+        "task.bulk_create_tasks": (bulk_create_tasks, args.bulk_size),
+        "task.bulk_update_tasks": (bulk_update_tasks, args.bulk_size),
+        "task.bulk_delete_tasks": (bulk_delete_tasks, args.bulk_size),
+        "task_archive.archive_batch": (archive_batch, args.archive_batch_size),
+    }
+
+
+async def run(db_url: str, args) -> dict:
+    rnd = random.Random(args.seed)
+    await seed(db_url, args.users, args.tasks, rnd)
+    engine = create_async_engine(db_url)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    task_cache.backend = None
+    service.task_service.next_change_seq = timed_next_change_seq
+    service.task_archive_service.next_change_seq = timed_next_change_seq
+
+    results = {}
+    for name, (operation, written) in operations(args.tasks, args.users, args, rnd).items():
+        hold_samples.clear()
+        samples = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            async with session_maker() as session:
+                await operation(session)
+            samples.append(time.perf_counter() - start)
+        hold = percentiles(hold_samples)
+        writes_per_second = 1000 / hold["p50_ms"]
+        results[name] = {
+            "tasks_per_write": written,
+            "write": percentiles(samples),
+            "sequence_held": hold,
+            # Writers queue on the row, this is the most the database takes
+            "max_writes_per_second": round(writes_per_second, 1),
+            "max_tasks_per_second": round(writes_per_second * written),
+        }
+
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--bulk-size", type=int, default=100)
+    parser.add_argument("--archive-batch-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--db-url",
+        help="Async URL of an empty database to use instead of a temporary SQLite file, "
+        "its tables are dropped and recreated",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = args.db_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'sequence.db')}"
+        results = {"params": vars(args), "operations": asyncio.run(run(db_url, args))}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Request coalescing benchmark
+
+Sends bursts of --concurrency identical `GET /tasks/` and `GET /users/all`
+requests from different users, as when every client refreshes at once,
+with request coalescing on and off. Reports the burst latency and the DB
+queries issued per burst. Principals are cached beforehand, the queries
+are those of the listings. Run from the `be` directory:
+
+    python -m benchmarks.coalescing --tasks 100000 --concurrency 50 --bursts 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.suite import seed, user_email
+from database import get_session
+from main import app
+from utils.metrics import request_metrics
+from utils.rate_limit import rate_limiter
+from utils.security import create_access_token
+from utils.shared_state import LocalStateBackend, shared_state
+from utils.single_flight import single_flight
+
+PATHS = ("/tasks/?limit=100", "/users/all?limit=100")
+
+
+async def burst(client: httpx.AsyncClient, path: str, tokens: list[str]) -> float:
+    start = time.perf_counter()
+    responses = await asyncio.gather(
+        *(client.get(path, headers={"Authorization": f"Bearer {token}"}) for token in tokens)
+    )
+    elapsed = time.perf_counter() - start
+    assert all(response.status_code == 200 for response in responses)
+    return elapsed
+
+
+async def measure(client: httpx.AsyncClient, path: str, tokens: list[str], args) -> dict:
+    single_flight.clear()
+    queries = request_metrics.queries_total
+    latencies = [await burst(client, path, tokens) for _ in range(args.bursts)]
+    return {
+        "burst_ms_p50": round(statistics.median(latencies) * 1000, 2),
+        "queries_per_burst": round((request_metrics.queries_total - queries) / args.bursts, 1),
+        "collapsed_per_burst": round(single_flight.stats()["collapsed"] / args.bursts, 1),
+    }
+
+
+async def run(db_url: str, args) -> dict:
+    await seed(db_url, args.users, args.tasks, random.Random(args.seed))
+    engine = create_async_engine(db_url)
+    request_metrics.attach(engine.sync_engine)
+    maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_session():
+        async with maker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_session
+    # Revocation checks stay in memory, the queries counted are the listings'
+    shared_state.backend = LocalStateBackend()
+    # Every request comes from the same client address
+    rate_limiter.backend = None
+    tokens = [
+        create_access_token({"sub": user_email(user_id), "id": user_id})
+        for user_id in range(2, args.concurrency + 2)
+    ]
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warms the principal cache
+        await burst(client, "/users/me", tokens)
+        for path in PATHS:
+            results[path] = {}
+            for enabled in (False, True):
+                single_flight.enabled = enabled
+                results[path]["coalesced" if enabled else "alone"] = await measure(
+                    client, path, tokens, args
+                )
+
+    app.dependency_overrides.clear()
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'coalescing.db')}"
+        results = {"params": vars(args), **asyncio.run(run(db_url, args))}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
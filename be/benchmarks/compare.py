@@ -0,0 +1,64 @@
+"""
+Compare two benchmark suite results
+
+Prints p50/p95 latency per operation side by side with the relative change,
+slowdowns beyond --threshold are flagged and make the exit status non zero.
+
+Run from the `be` directory:
+
+    python -m benchmarks.compare before.json after.json --threshold 0.2
+"""
+
+import argparse
+import json
+import sys
+
+
+def flatten(results: dict) -> dict[str, dict]:
+    """Maps `size/section/[level/]operation` to its percentiles."""
+    rows = {}
+    for size, data in results["sizes"].items():
+        for name, stats in data.get("service", {}).items():
+            rows[f"{size}/service/{name}"] = stats
+        for level, operations in data.get("http", {}).items():
+            for name, stats in operations.items():
+                rows[f"{size}/http/{level}/{name}"] = stats
+    return rows
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before if before else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"{before.get('revision')} -> {after.get('revision')}")
+    regressions = 0
+    before_rows, after_rows = flatten(before), flatten(after)
+    for key in sorted(before_rows.keys() & after_rows.keys()):
+        old, new = before_rows[key], after_rows[key]
+        p50, p95 = change(old["p50_ms"], new["p50_ms"]), change(old["p95_ms"], new["p95_ms"])
+        flag = ""
+        if p50 > args.threshold or p95 > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(
+            f"{key:70} p50 {old['p50_ms']:>9.2f} -> {new['p50_ms']:>9.2f} ({p50:+.0%})"
+            f"  p95 {old['p95_ms']:>9.2f} -> {new['p95_ms']:>9.2f} ({p95:+.0%}){flag}"
+        )
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
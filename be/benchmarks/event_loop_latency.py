@@ -0,0 +1,147 @@
+"""
+Event loop latency benchmark
+
+Compares request latency of the async session path against the previous
+setup, where a synchronous Session ran blocking queries directly inside the
+`async def` handlers. A share of the requests issue a slow query, the rest
+are cheap primary key reads through `TaskService.get_task_by_id`.
+
+Run from the `be` directory:
+
+    python -m benchmarks.event_loop_latency --requests 500 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import joinedload
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import percentiles
+from models.task import Task
+from models.user import User
+from service.task_service import TaskService
+
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000)
+    return ms
+
+
+def _register_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep_ms", 1, _sleep_ms)
+
+
+def seed(db_url: str, users: int, tasks: int):
+    engine = create_engine(db_url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(
+            User(email=f"user{i}@example.com", password="x", name=f"User {i}")
+            for i in range(1, users + 1)
+        )
+        session.add_all(
+            Task(
+                title=f"Task {i}",
+                description="Benchmark task",
+                assignee_id=random.randint(1, users),
+                creator_id=random.randint(1, users),
+            )
+            for i in range(1, tasks + 1)
+        )
+        session.commit()
+    engine.dispose()
+
+
+async def run_requests(handler, args) -> dict:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    fast, slow = [], []
+
+    async def one():
+        is_slow = random.random() < args.slow_ratio
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(random.randint(1, args.tasks), is_slow)
+            (slow if is_slow else fast).append(time.perf_counter() - start)
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    wall = time.perf_counter() - wall
+    return {
+        "throughput_rps": round(args.requests / wall, 1),
+        "fast": percentiles(fast),
+        "slow": percentiles(slow) if len(slow) > 1 else None,
+    }
+
+
+async def bench_async(db_file: str, args) -> dict:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_file}", pool_size=args.concurrency
+    )
+    event.listen(engine.sync_engine, "connect", _register_sleep)
+
+    async def handler(task_id: int, is_slow: bool):
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            if is_slow:
+                await session.execute(text(f"SELECT sleep_ms({args.slow_ms})"))
+            await TaskService(session=session).get_task_by_id(task_id)
+
+    result = await run_requests(handler, args)
+    await engine.dispose()
+    return result
+
+
+async def bench_blocking(db_file: str, args) -> dict:
+    engine = create_engine(f"sqlite:///{db_file}", pool_size=args.concurrency)
+    event.listen(engine, "connect", _register_sleep)
+
+    async def handler(task_id: int, is_slow: bool):
+        # Mirrors the old handlers: sync queries inside a coroutine
+        with Session(engine) as session:
+            if is_slow:
+                session.execute(text(f"SELECT sleep_ms({args.slow_ms})"))
+            statement = (
+                select(Task)
+                .where(Task.id == task_id)
+                .options(joinedload(Task.assignee))
+            )
+            session.exec(statement).one_or_none()
+        await asyncio.sleep(0)
+
+    result = await run_requests(handler, args)
+    engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--slow-ratio", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        seed(f"sqlite:///{db_file}", args.users, args.tasks)
+        results = {
+            "params": vars(args),
+            "blocking": asyncio.run(bench_blocking(db_file, args)),
+            "async": asyncio.run(bench_async(db_file, args)),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Task listing index benchmark
+
+Justifies the indexes of migration 0003: seeds the task table, then for each
+listing query shape prints the EXPLAIN plan and latency with the composite
+indexes dropped (the schema before it: primary key only on SQLite, plus the
+implicit foreign key indexes on MySQL) and with them in place.
+
+Run from the `be` directory:
+
+    python -m benchmarks.indexes --tasks 1000000 --users 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import joinedload
+from sqlmodel import select
+
+from benchmarks.common import percentiles
+from benchmarks.suite import seed
+from models.task import Task, TaskFilterDTO
+from service.task_service import TaskService
+from utils.pagination import encode_cursor, keyset_paginate
+
+INDEXES = sorted(Task.__table__.indexes, key=lambda index: index.name)
+# Plain DDL, an Index built on the table columns would join Task's metadata
+FK_INDEXES = [
+    "CREATE INDEX ix_task_assignee_id ON task (assignee_id)",
+    "CREATE INDEX ix_task_creator_id ON task (creator_id)",
+]
+
+
+def listing_query(filters: TaskFilterDTO, cursor: str | None, limit: int):
+    # Same statement as TaskService.find_all
+    query = select(Task).options(joinedload(Task.assignee))
+    query = TaskService._apply_filters(query, filters)
+    return keyset_paginate(query, Task.id, limit, cursor)
+
+
+def query_shapes(args, rnd: random.Random) -> dict:
+    """Name -> factory of (filters, cursor) for the queries the app runs."""
+
+    def user_id() -> int:
+        return rnd.randint(1, args.users)
+
+    return {
+        "assignee (/tasks/my)": lambda: (TaskFilterDTO(assignee_id=user_id()), None),
+        "assignee + is_complete": lambda: (
+            TaskFilterDTO(assignee_id=user_id(), is_complete=False), None
+        ),
+        "assignee + is_complete, next page": lambda: (
+            TaskFilterDTO(assignee_id=user_id(), is_complete=False),
+            encode_cursor(rnd.randint(1, args.tasks // 2)),
+        ),
+        "creator": lambda: (TaskFilterDTO(creator_id=user_id()), None),
+    }
+
+
+async def explain(conn, statement) -> list[str]:
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN" if conn.dialect.name == "sqlite" else "EXPLAIN"
+    rows = (await conn.exec_driver_sql(f"{prefix} {sql}")).all()
+    return [" | ".join(str(v) for v in row) for row in rows]
+
+
+async def measure(engine, args, rnd: random.Random) -> dict:
+    results = {}
+    async with engine.connect() as conn:
+        for name, make in query_shapes(args, rnd).items():
+            filters, cursor = make()
+            plan = await explain(conn, listing_query(filters, cursor, args.limit))
+            samples = []
+            for _ in range(args.iterations):
+                filters, cursor = make()
+                statement = listing_query(filters, cursor, args.limit)
+                start = time.perf_counter()
+                (await conn.execute(statement)).all()
+                samples.append(time.perf_counter() - start)
+            results[name] = {"plan": plan, **percentiles(samples)}
+    return results
+
+
+async def run(db_url: str, args) -> dict:
+    rnd = random.Random(args.seed)
+    # Seeded through create_all, which creates the indexes declared on Task
+    seed_seconds = await seed(db_url, args.users, args.tasks, rnd)
+    engine = create_async_engine(db_url)
+
+    async with engine.begin() as conn:
+        if conn.dialect.name == "mysql":
+            # Stand-ins for the implicit foreign key indexes InnoDB had before
+            for ddl in FK_INDEXES:
+                await conn.execute(text(ddl))
+        for index in INDEXES:
+            await conn.run_sync(index.drop)
+    without = await measure(engine, args, random.Random(args.seed))
+
+    async with engine.begin() as conn:
+        for index in INDEXES:
+            await conn.run_sync(index.create)
+        if conn.dialect.name == "sqlite":
+            await conn.execute(text("ANALYZE"))
+    with_indexes = await measure(engine, args, random.Random(args.seed))
+
+    await engine.dispose()
+    return {
+        "seed_seconds": seed_seconds,
+        "indexes": [index.name for index in INDEXES],
+        "without_indexes": without,
+        "with_indexes": with_indexes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db-url", help="Async URL of an empty database, defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = args.db_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'indexes.db')}"
+        results = {"params": vars(args), **asyncio.run(run(db_url, args))}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
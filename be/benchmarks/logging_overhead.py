@@ -0,0 +1,157 @@
+"""
+Logging overhead benchmark
+
+Measures what logging costs the request path, in microseconds per log call
+on the calling thread:
+
+- the previous setup, a `logging.basicConfig` stream handler writing each
+  record synchronously, with eager f-string messages,
+- the `logger.py` pipeline, a queue handler with a JSON writer thread and
+  %-style messages, with and without sampling,
+- both message styles with the level above INFO, where nothing is written,
+- both setups writing to a sink that stalls --sink-delay-ms per write, as a
+  full pipe or a slow disk does,
+
+and the per-request cost of `CorrelationIdMiddleware` around an empty ASGI
+app. Records go to a temporary file.
+
+Run from the `be` directory:
+
+    python -m benchmarks.logging_overhead --calls 100000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import nullcontext
+
+from logger import LOG_FORMAT_TEXT, SAMPLED, LogPipeline
+from utils.correlation import CorrelationIdMiddleware
+
+logger = logging.getLogger("benchmarks.logging")
+
+
+def per_call_us(log, calls: int) -> float:
+    start = time.perf_counter()
+    for task_id in range(calls):
+        log(task_id)
+    return round((time.perf_counter() - start) / calls * 1e6, 3)
+
+
+def eager(task_id):
+    logger.info(f"Task with id: {task_id} updated")
+
+
+def lazy(task_id):
+    logger.info("Task with id: %s updated", task_id)
+
+
+def lazy_sampled(task_id):
+    logger.info("Task with id: %s updated", task_id, extra=SAMPLED)
+
+
+class SlowStream:
+    def __init__(self, delay_seconds: float):
+        self.delay_seconds = delay_seconds
+
+    def write(self, data: str):
+        time.sleep(self.delay_seconds)
+
+    def flush(self):
+        pass
+
+
+def run_sync(path: str, level: int, log, calls: int, stream=None) -> float:
+    handler = logging.FileHandler(path) if stream is None else logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT_TEXT.replace(" [%(correlation_id)s]", "")))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level)
+    try:
+        return per_call_us(log, calls)
+    finally:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def run_pipeline(
+    path: str, level: str, log, calls: int, sample_rate: float = 1.0, stream=None
+) -> dict:
+    with open(path, "a") if stream is None else nullcontext(stream) as stream:
+        pipeline = LogPipeline()
+        pipeline.start(level, fmt="json", stream=stream, queue_size=0, sample_rate=sample_rate)
+        caller_us = per_call_us(log, calls)
+        # Includes waiting for the writer thread to drain the queue
+        start = time.perf_counter()
+        pipeline.stop()
+        drain_ms = round((time.perf_counter() - start) * 1000, 1)
+    return {"caller_us_per_call": caller_us, "drain_ms": drain_ms}
+
+
+async def middleware_us(requests: int) -> dict:
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "headers": [(b"x-request-id", b"bench-request-id")]}
+    results = {}
+    for name, wrapped in (("bare", app), ("correlation_id", CorrelationIdMiddleware(app))):
+        start = time.perf_counter()
+        for _ in range(requests):
+            await wrapped(scope, receive, send)
+        results[name] = round((time.perf_counter() - start) / requests * 1e6, 3)
+    results["overhead_us_per_request"] = round(results["correlation_id"] - results["bare"], 3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    parser.add_argument("--sink-delay-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.log")
+        delay = args.sink_delay_ms / 1000
+        # Few enough calls for the stalled writes to finish in seconds
+        slow_calls = max(args.calls // 1000, 10)
+        results = {
+            "params": vars(args),
+            "info_enabled": {
+                "sync_fstring_us_per_call": run_sync(path, logging.INFO, eager, args.calls),
+                "queue_json_lazy": run_pipeline(path, "INFO", lazy, args.calls),
+                "queue_json_sampled": run_pipeline(
+                    path, "INFO", lazy_sampled, args.calls, args.sample_rate
+                ),
+            },
+            "info_disabled": {
+                "fstring_us_per_call": run_sync(path, logging.ERROR, eager, args.calls),
+                "lazy_us_per_call": run_sync(path, logging.ERROR, lazy, args.calls),
+            },
+            "slow_sink": {
+                "sync_fstring_us_per_call": run_sync(
+                    path, logging.INFO, eager, slow_calls, SlowStream(delay)
+                ),
+                "queue_json_lazy": run_pipeline(
+                    path, "INFO", lazy, slow_calls, stream=SlowStream(delay)
+                ),
+            },
+            "middleware": asyncio.run(middleware_us(args.calls)),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
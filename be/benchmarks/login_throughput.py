@@ -0,0 +1,138 @@
+"""
+Login throughput benchmark
+
+Drives concurrent `AuthService.authenticate_user` calls against a seeded
+SQLite database with bcrypt running inline on the event loop and in the
+password hashing pool at several worker counts. While logins run, a probe
+coroutine measures event loop lag, which is what other requests such as
+task reads would experience.
+
+Run from the `be` directory:
+
+    python -m benchmarks.login_throughput --logins 200 --workers 1,2,4,8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import percentiles
+from models.user import User
+from service import auth_service
+from service.auth_service import AuthService
+from utils.exception import PasswordHasherOverloadedException
+from utils.password_hasher import PasswordHasher
+from utils.security import get_password_hash, verify_password
+
+EMAIL = "bench@example.com"
+PASSWORD = "password123"
+
+
+class InlineHasher:
+    """The previous behaviour: bcrypt called directly inside the coroutine."""
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return verify_password(plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {}
+
+
+async def seed(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add(User(email=EMAIL, password=get_password_hash(PASSWORD), name="Bench"))
+        await session.commit()
+
+
+async def probe_loop_lag(stop: asyncio.Event, samples: list[float], interval=0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def bench(engine, hasher, args) -> dict:
+    auth_service.password_hasher = hasher
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, rejected = [], 0
+
+    async def login():
+        nonlocal rejected
+        async with semaphore:
+            start = time.perf_counter()
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                try:
+                    await AuthService(session=session).authenticate_user(EMAIL, PASSWORD)
+                except PasswordHasherOverloadedException:
+                    rejected += 1
+                    return
+            latencies.append(time.perf_counter() - start)
+
+    stop, lag = asyncio.Event(), []
+    probe = asyncio.create_task(probe_loop_lag(stop, lag))
+    wall = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(args.logins)))
+    wall = time.perf_counter() - wall
+    stop.set()
+    await probe
+
+    return {
+        "logins_per_second": round(len(latencies) / wall, 1),
+        "rejected": rejected,
+        "latency": percentiles(latencies) if len(latencies) > 1 else None,
+        "event_loop_lag": percentiles(lag) if len(lag) > 1 else None,
+        "hasher": hasher.stats(),
+    }
+
+
+async def run(args) -> dict:
+    results = {"params": vars(args), "cpu_count": os.cpu_count()}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        await seed(engine)
+
+        results["inline"] = await bench(engine, InlineHasher(), args)
+        for workers in args.workers:
+            hasher = PasswordHasher(
+                workers=workers,
+                max_pending=args.max_pending or args.logins,
+                executor=args.executor,
+            )
+            results[f"pool_{args.executor}_{workers}"] = await bench(engine, hasher, args)
+            hasher.shutdown()
+
+        await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--workers",
+        type=lambda value: [int(w) for w in value.split(",")],
+        default=[1, 2, os.cpu_count() or 1],
+    )
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=0,
+        help="Queue bound of the pool, 0 admits every login",
+    )
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Task list serialization benchmark
+
+Compares building a page of --tasks tasks the previous way, ORM objects with
+a joinedload of the whole assignee validated through the `TaskPageDTO`
+response_model (assignee embedded as the `User` table model) and rendered
+by JSONResponse, against the column projection of `TaskService.find_all`
+encoded with ORJSONResponse. Query and serialization CPU time are reported
+separately.
+
+Run from the `be` directory:
+
+    python -m benchmarks.serialization --tasks 10000 --repeat 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List, Optional
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import joinedload
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.suite import seed
+from models.task import Task
+from models.user import User
+from service.task_service import TaskService
+
+
+class LegacyTaskWithAssigneeDTO(SQLModel):
+    id: int
+    title: str
+    description: str
+    assignee_id: int | None = None
+    is_complete: Optional[bool] = None
+    assignee: Optional[User]
+
+
+class LegacyTaskPageDTO(SQLModel):
+    items: List[LegacyTaskWithAssigneeDTO]
+    next_cursor: Optional[str] = None
+
+
+LEGACY_FIELD = create_model_field("Response_legacy", LegacyTaskPageDTO, mode="serialization")
+
+
+async def legacy_query(session: AsyncSession, limit: int):
+    query = select(Task).options(joinedload(Task.assignee)).order_by(Task.id).limit(limit)
+    return (await session.exec(query)).all()
+
+
+async def legacy_serialize(tasks) -> bytes:
+    content = await serialize_response(
+        field=LEGACY_FIELD, response_content={"items": tasks, "next_cursor": None}
+    )
+    return JSONResponse(content).body
+
+
+async def projected_query(session: AsyncSession, limit: int):
+    tasks, _ = await TaskService(session).find_all(limit=limit)
+    return tasks
+
+
+async def projected_serialize(tasks) -> bytes:
+    return ORJSONResponse({"items": tasks, "next_cursor": None}).body
+
+
+async def measure(engine, query, serialize, args) -> dict:
+    query_ms, serialize_ms, size = [], [], 0
+    for _ in range(args.repeat):
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            start = time.process_time()
+            tasks = await query(session, args.tasks)
+            query_ms.append((time.process_time() - start) * 1000)
+
+            start = time.process_time()
+            size = len(await serialize(tasks))
+            serialize_ms.append((time.process_time() - start) * 1000)
+    return {
+        "query_cpu_ms": round(statistics.median(query_ms), 2),
+        "serialize_cpu_ms": round(statistics.median(serialize_ms), 2),
+        "body_bytes": size,
+    }
+
+
+async def run(db_url: str, args) -> dict:
+    await seed(db_url, args.users, args.tasks, random.Random(args.seed))
+    engine = create_async_engine(db_url)
+    legacy = await measure(engine, legacy_query, legacy_serialize, args)
+    projected = await measure(engine, projected_query, projected_serialize, args)
+    await engine.dispose()
+    return {
+        "legacy": legacy,
+        "projected": projected,
+        "serialize_speedup": round(legacy["serialize_cpu_ms"] / projected["serialize_cpu_ms"], 1),
+        "total_speedup": round(
+            (legacy["query_cpu_ms"] + legacy["serialize_cpu_ms"])
+            / (projected["query_cpu_ms"] + projected["serialize_cpu_ms"]),
+            1,
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'serialization.db')}"
+        results = {"params": vars(args), **asyncio.run(run(db_url, args))}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
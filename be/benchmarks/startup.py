@@ -0,0 +1,103 @@
+"""
+Server startup and worker memory benchmark
+
+Starts --workers workers with `python -m serve` (app preloaded, workers
+forked from it) and with `uvicorn --workers` (every worker imports the app
+itself), and reports how long each takes until every worker is ready and
+what a worker costs in memory. RSS counts the pages a worker shares with
+the others, PSS splits them: the PSS total is what the server takes.
+
+No database is needed, schema handling is skipped. Run from the `be`
+directory:
+
+    python -m benchmarks.startup --workers 4 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+from utils.process_stats import memory_usage
+
+READY_LINE = re.compile(r"Worker (\d+) ready in ([\d.]+)s")
+
+COMMANDS = {
+    "serve": ["-m", "serve", "--workers", "{workers}", "--bind", "127.0.0.1:{port}"],
+    "uvicorn": ["-m", "uvicorn", "main:app", "--workers", "{workers}", "--port", "{port}"],
+}
+
+
+def start_server(mode: str, workers: int, port: int, timeout: float) -> dict:
+    args = [arg.format(workers=workers, port=port) for arg in COMMANDS[mode]]
+    env = {**os.environ, "DB_STARTUP_MODE": "skip", "PYTHONUNBUFFERED": "1"}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, *args],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    ready = {}
+    try:
+        for line in process.stdout:
+            match = READY_LINE.search(line)
+            if match:
+                ready[int(match[1])] = float(match[2])
+            if len(ready) == workers or time.perf_counter() - started > timeout:
+                break
+        ready_seconds = time.perf_counter() - started
+        if len(ready) < workers:
+            raise RuntimeError(f"{mode}: {len(ready)} of {workers} workers ready")
+
+        memory = {pid: memory_usage(pid) for pid in ready}
+        master = memory_usage(process.pid)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.communicate(timeout=timeout)
+
+    mib = 2**20
+    return {
+        "ready_seconds": ready_seconds,
+        "worker_startup_seconds": statistics.median(ready.values()),
+        "worker_rss_mib": statistics.median(m["rss_bytes"] for m in memory.values()) / mib,
+        "worker_pss_mib": statistics.median(m["pss_bytes"] for m in memory.values()) / mib,
+        "total_pss_mib": (
+            sum(m["pss_bytes"] for m in memory.values()) + master.get("pss_bytes", 0)
+        ) / mib,
+    }
+
+
+def run(args) -> dict:
+    results = {}
+    for mode in COMMANDS:
+        runs = [
+            start_server(mode, args.workers, args.port, args.timeout)
+            for _ in range(args.repeat)
+        ]
+        results[mode] = {
+            key: round(statistics.median(run[key] for run in runs), 3) for key in runs[0]
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    results = {"params": vars(args), **run(args)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+"""
+Service and HTTP benchmark suite
+
+Seeds a database per size (10k, 100k and 1M tasks by default, spread over a
+few thousand users), then
+
+- times `TaskService`/`UserService` methods directly, one session per call
+  like a request would use,
+- drives the FastAPI `app` in-process through an ASGI client at each
+  configured concurrency, covering list, auth and write endpoints.
+
+Results are printed (or written with --output) as JSON, compare two runs with
+`python -m benchmarks.compare before.json after.json`.
+
+Run from the `be` directory:
+
+    python -m benchmarks.suite --sizes 10000,100000 --concurrency 1,10,50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+import httpx
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import percentiles
+from database import get_session, get_session_maker
+from main import app
+from models.task import Task, TaskCreateDTO, TaskFilterDTO, TaskUpdateDTO
+from models.task_change import TaskChangeSequence
+from models.user import User
+from service.task_service import TaskService
+from service.task_stats_service import TaskStatsService
+from service.user_service import UserService
+from utils.clock import utc_now
+from utils.pagination import encode_cursor
+from utils.principal_cache import principal_cache
+from utils.shared_state import DatabaseStateBackend, shared_state
+from utils.rate_limit import rate_limiter
+from utils.security import create_access_token, get_password_hash
+
+PASSWORD = "password123"
+SEED_BATCH_SIZE = 10_000
+
+
+def _fast_sqlite_writes(dbapi_connection, connection_record):
+    # Seeding only, durability does not matter for a throwaway file
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+def user_email(user_id: int) -> str:
+    return f"user{user_id}@example.com"
+
+
+async def seed(db_url: str, users: int, tasks: int, rnd: random.Random) -> float:
+    start = time.perf_counter()
+    engine = create_async_engine(db_url)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _fast_sqlite_writes)
+
+    # One bcrypt hash for everybody, hashing thousands of passwords would
+    # dominate the seeding time
+    password = get_password_hash(PASSWORD)
+    now = utc_now()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.execute(
+            insert(User),
+            [
+                {
+                    "id": i,
+                    "email": user_email(i),
+                    "password": password,
+                    "name": f"User {i}",
+                    "is_admin": i == 1,
+                    "is_active": True,
+                    "updated_at": now,
+                }
+                for i in range(1, users + 1)
+            ],
+        )
+        for offset in range(0, tasks, SEED_BATCH_SIZE):
+            await conn.execute(
+                insert(Task),
+                [
+                    {
+                        "id": i,
+                        "title": f"Task {i}",
+                        "description": f"Benchmark task number {i}",
+                        "is_complete": rnd.random() < 0.3,
+                        "assignee_id": rnd.randint(1, users),
+                        "creator_id": rnd.randint(1, users),
+                        "updated_at": now,
+                        "change_seq": i,
+                    }
+                    for i in range(offset + 1, min(offset + SEED_BATCH_SIZE, tasks) + 1)
+                ],
+            )
+        await conn.execute(insert(TaskChangeSequence), [{"id": 1, "value": tasks}])
+    # The rows went around TaskService, the stats are computed once instead
+    async with AsyncSession(engine) as session:
+        await TaskStatsService(session).rebuild()
+
+    await engine.dispose()
+    return round(time.perf_counter() - start, 2)
+
+
+def service_operations(
+    size: int, users: int, args, rnd: random.Random
+) -> dict[str, Callable[[AsyncSession], Awaitable]]:
+    created_ids: list[int] = []
+
+    def task_id() -> int:
+        return rnd.randint(1, size)
+
+    def user_id() -> int:
+        return rnd.randint(1, users)
+
+    async def create_task(session: AsyncSession):
+        task = await TaskService(session).create_task(
+            TaskCreateDTO(title="Bench", description="Created", assignee_id=user_id()),
+            creator_id=user_id(),
+        )
+        created_ids.append(task.id)
+
+    async def delete_task(session: AsyncSession):
+        # Only deletes tasks created above, the seeded data stays intact
+        if created_ids:
+            await TaskService(session).delete_task(created_ids.pop())
+
+    bulk_items = [
+        TaskCreateDTO(title=f"Bulk {i}", description="Created", assignee_id=(i % users) + 1)
+        for i in range(args.bulk_size)
+    ]
+
+    # Reads first, then writes, delete relies on the ids created before it
+    return {
+        "task.get_task_by_id": lambda s: TaskService(s).get_task_by_id(task_id()),
+        "task.find_all": lambda s: TaskService(s).find_all(limit=args.page_size),
+        "task.find_all.deep_cursor": lambda s: TaskService(s).find_all(
+            limit=args.page_size, cursor=encode_cursor(task_id())
+        ),
+        "task.find_all.filtered": lambda s: TaskService(s).find_all(
+            limit=args.page_size,
+            filters=TaskFilterDTO(is_complete=False, assignee_id=user_id()),
+        ),
+        "task.find_all_for_user": lambda s: TaskService(s).find_all_for_user(
+            user_id(), limit=args.page_size
+        ),
+        # Seeded texts are numbered, a number prefix matches one to a few
+        # hundred tasks through the full-text index
+        "task.search": lambda s: TaskService(s).search(str(task_id()), limit=args.page_size),
+        "task_stats.get_stats": lambda s: TaskStatsService(s).get_stats(limit=args.page_size),
+        "task.get_changes": lambda s: TaskService(s).get_changes(
+            user_id(), limit=args.page_size
+        ),
+        "task.get_list_etag": lambda s: TaskService(s).get_list_etag(limit=args.page_size),
+        "user.get_all_users": lambda s: UserService(s).get_all_users(limit=args.page_size),
+        "user.get_user_by_email": lambda s: UserService(s).get_user_by_email(
+            user_email(user_id())
+        ),
+        "task.create_task": create_task,
+        "task.update_task": lambda s: TaskService(s).update_task(
+            task_id(), TaskUpdateDTO(is_complete=rnd.random() < 0.5)
+        ),
+        "task.bulk_create_tasks": lambda s: TaskService(s).bulk_create_tasks(
+            bulk_items, creator_id=user_id()
+        ),
+        "task.delete_task": delete_task,
+    }
+
+
+async def bench_services(engine, size: int, users: int, args, rnd: random.Random) -> dict:
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    results = {}
+    for name, operation in service_operations(size, users, args, rnd).items():
+        samples = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            async with session_maker() as session:
+                await operation(session)
+            samples.append(time.perf_counter() - start)
+        results[name] = percentiles(samples)
+    return results
+
+
+def http_requests(size: int, users: int, args, rnd: random.Random, tokens: dict):
+    """Request factories per endpoint, each returns (method, url, kwargs)."""
+
+    def auth(user_id: int) -> dict:
+        return {"Authorization": f"Bearer {tokens[user_id]}"}
+
+    def token_user() -> int:
+        return rnd.choice(list(tokens))
+
+    return {
+        "GET /tasks/": lambda: (
+            "GET", "/tasks/", {"params": {"limit": args.page_size}, "headers": auth(1)}
+        ),
+        "GET /tasks/?cursor": lambda: (
+            "GET",
+            "/tasks/",
+            {
+                "params": {"limit": args.page_size, "cursor": encode_cursor(rnd.randint(1, size))},
+                "headers": auth(1),
+            },
+        ),
+        "GET /tasks/my": lambda: (
+            "GET", "/tasks/my", {"params": {"limit": args.page_size}, "headers": auth(token_user())}
+        ),
+        "GET /tasks/{task_id}": lambda: (
+            "GET", f"/tasks/{rnd.randint(1, size)}", {"headers": auth(token_user())}
+        ),
+        "GET /tasks/search": lambda: (
+            "GET",
+            "/tasks/search",
+            {
+                "params": {"q": str(rnd.randint(1, size)), "limit": args.page_size},
+                "headers": auth(token_user()),
+            },
+        ),
+        "GET /tasks/stats": lambda: (
+            "GET", "/tasks/stats", {"params": {"limit": args.page_size}, "headers": auth(1)}
+        ),
+        "GET /tasks/changes": lambda: (
+            "GET", "/tasks/changes", {"params": {"limit": args.page_size}, "headers": auth(1)}
+        ),
+        "GET /users/all": lambda: (
+            "GET", "/users/all", {"params": {"limit": args.page_size}, "headers": auth(1)}
+        ),
+        "POST /tasks": lambda: (
+            "POST",
+            "/tasks",
+            {
+                "json": {"title": "Bench", "description": "HTTP", "assignee_id": rnd.randint(1, users)},
+                "headers": auth(token_user()),
+            },
+        ),
+        "PATCH /tasks/{task_id}": lambda: (
+            "PATCH",
+            f"/tasks/{rnd.randint(1, size)}",
+            {"json": {"is_complete": rnd.random() < 0.5}, "headers": auth(token_user())},
+        ),
+    }
+
+
+async def run_http(client: httpx.AsyncClient, make_request, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        method, url, kwargs = make_request()
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            samples.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors += 1
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    wall = time.perf_counter() - wall
+    return {
+        "throughput_rps": round(total / wall, 1),
+        "errors": errors,
+        **percentiles(samples),
+    }
+
+
+async def bench_http(engine, size: int, users: int, args, rnd: random.Random) -> dict:
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_session():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_session
+    app.dependency_overrides[get_session_maker] = lambda: session_maker
+    principal_cache.clear()
+    # Revocations are checked in the benchmark database, as they would be in MySQL
+    state_backend, shared_state.backend = shared_state.backend, DatabaseStateBackend(session_maker)
+    # A handful of simulated clients send every request, per client limits
+    # would turn most of them into 429s
+    limiter_backend, rate_limiter.backend = rate_limiter.backend, None
+
+    # Tokens are minted directly, the login endpoint is measured on its own
+    token_users = rnd.sample(range(1, users + 1), min(args.token_users, users))
+    tokens = {
+        user_id: create_access_token(
+            data={
+                "sub": user_email(user_id),
+                "id": user_id,
+                "name": f"User {user_id}",
+                "is_admin": user_id == 1,
+            }
+        )
+        for user_id in {1, *token_users}
+    }
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for concurrency in args.concurrency:
+            level = {}
+            for name, make_request in http_requests(size, users, args, rnd, tokens).items():
+                level[name] = await run_http(client, make_request, args.requests, concurrency)
+
+            def login():
+                return (
+                    "POST",
+                    "/users/login",
+                    {"data": {"username": user_email(rnd.randint(1, users)), "password": PASSWORD}},
+                )
+
+            level["POST /users/login"] = await run_http(
+                client, login, args.login_requests, concurrency
+            )
+            results[f"concurrency_{concurrency}"] = level
+
+    app.dependency_overrides.clear()
+    rate_limiter.backend = limiter_backend
+    shared_state.backend = state_backend
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def bench_size(db_url: str, size: int, args) -> dict:
+    rnd = random.Random(args.seed)
+    users = min(args.users, size)
+    seed_seconds = await seed(db_url, users, size, rnd)
+
+    engine = create_async_engine(db_url, pool_size=max(args.concurrency))
+    result = {"users": users, "seed_seconds": seed_seconds}
+    if not args.skip_services:
+        result["service"] = await bench_services(engine, size, users, args, rnd)
+    if not args.skip_http:
+        result["http"] = await bench_http(engine, size, users, args, rnd)
+    await engine.dispose()
+    return result
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int_list, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int_list, default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--login-requests", type=int, default=20)
+    parser.add_argument("--token-users", type=int, default=1_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--bulk-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-services", action="store_true")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument(
+        "--db-url",
+        help="Async URL of an empty database to use instead of a temporary SQLite file, "
+        "its tables are dropped and recreated for every size",
+    )
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = {"revision": git_revision(), "params": vars(args), "sizes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            db_url = args.db_url or f"sqlite+aiosqlite:///{os.path.join(tmp, f'bench_{size}.db')}"
+            results["sizes"][str(size)] = asyncio.run(bench_size(db_url, size, args))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
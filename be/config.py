@@ -0,0 +1,146 @@
+import os
+from dataclasses import MISSING, dataclass, fields
+from typing import Mapping, Optional, Union, get_args, get_origin
+
+from dotenv import load_dotenv
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Every environment setting of the app, read once at import. A field is
+    set by the variable of the same name in upper case (`.env` included);
+    empty values count as unset. Modules keep their own constants, taken
+    from here, see example.env for what each one does.
+    """
+
+    # JWT tokens, required
+    secret_key: str
+    algorithm: str
+    token_expire_minutes: int
+
+    # Primary database, and an optional read replica of it
+    mysql_host: Optional[str] = None
+    mysql_port: Optional[int] = None
+    mysql_db: Optional[str] = None
+    mysql_user: Optional[str] = None
+    mysql_password: Optional[str] = None
+    mysql_replica_host: Optional[str] = None
+    mysql_replica_port: Optional[int] = None
+    mysql_pool_size: int = 10
+    mysql_max_overflow: int = 20
+    mysql_pool_timeout: float = 10
+    mysql_pool_recycle: int = 1800
+    mysql_pool_pre_ping: bool = True
+    db_startup_mode: str = "check"
+    read_your_writes_seconds: float = 5
+
+    # Production server, see serve.py; 0 workers means one per CPU
+    web_host: str = "0.0.0.0"
+    web_port: int = 8000
+    web_workers: int = 0
+    web_graceful_timeout_seconds: float = 30
+
+    # State every worker must see, revoked users and the read-your-writes
+    # window: database, redis or local
+    shared_state_backend: str = "database"
+    shared_state_redis_url: str = "redis://localhost:6379/0"
+
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: float = 60
+    principal_cache_trust_token_claims: bool = False
+
+    task_cache_backend: str = "local"
+    task_cache_size: int = 10000
+    task_cache_ttl_seconds: float = 30
+    task_cache_redis_url: str = "redis://localhost:6379/0"
+
+    task_events_backend: str = "local"
+    task_events_redis_url: str = "redis://localhost:6379/0"
+    task_events_queue_size: int = 256
+    task_events_heartbeat_seconds: float = 15
+    task_events_token_seconds: int = 60
+
+    rate_limit_backend: str = "local"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_max_keys: int = 100000
+    rate_limit_default: str = "600/minute"
+    rate_limit_routes: str = (
+        "POST /users/login=10/minute,POST /users/register=5/minute,"
+        "POST /users/register/admin=5/minute"
+    )
+    max_in_flight_requests: int = 200
+    request_coalescing: bool = True
+
+    task_archive_after_days: float = 30
+    task_archive_batch_size: int = 500
+    task_archive_interval_seconds: float = 3600
+
+    # No worker count means one per CPU, no pending limit four per worker
+    password_hash_executor: str = "thread"
+    password_hash_workers: Optional[int] = None
+    password_hash_max_pending: Optional[int] = None
+
+    log_level: str = "ERROR"
+    log_format: str = "json"
+    log_queue_size: int = 10000
+    log_sample_rate: float = 1.0
+
+    slow_query_ms: float = 200
+    slow_query_explain: bool = True
+    slow_query_log_params: bool = False
+    query_budget_strict: bool = False
+    debug: bool = False
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        environ = os.environ if environ is None else environ
+        values = {}
+        for field in fields(cls):
+            name = field.name.upper()
+            value = environ.get(name)
+            if value is None or value.strip() == "":
+                if field.default is MISSING:
+                    raise ValueError(f"{name} is not set")
+                continue
+            try:
+                values[field.name] = _parse(value.strip(), field.type)
+            except ValueError:
+                kind = _kind(field.type).__name__
+                raise ValueError(f"{name} is not a valid {kind}: {value!r}") from None
+        return cls(**values)
+
+    @property
+    def database_url(self) -> str:
+        return self._mysql_url(self.mysql_host, self.mysql_port)
+
+    @property
+    def replica_database_url(self) -> Optional[str]:
+        if not self.mysql_replica_host:
+            return None
+        return self._mysql_url(self.mysql_replica_host, self.mysql_replica_port or self.mysql_port)
+
+    def _mysql_url(self, host, port) -> str:
+        return (
+            f"mysql+aiomysql://{self.mysql_user}:{self.mysql_password}"
+            f"@{host}:{port}/{self.mysql_db}"
+        )
+
+
+def _kind(annotation) -> type:
+    # Optional[X] -> X
+    if get_origin(annotation) is Union:
+        return next(arg for arg in get_args(annotation) if arg is not type(None))
+    return annotation
+
+
+def _parse(value: str, annotation):
+    kind = _kind(annotation)
+    if kind is bool:
+        return value.lower() == "true"
+    return kind(value)
+
+
+load_dotenv()
+
+settings = Settings.from_env()
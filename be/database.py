@@ -1,25 +1,178 @@
-import os
-from sqlmodel import SQLModel, Session, create_engine
-from dotenv import load_dotenv
+from enum import StrEnum
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from config import settings
+from migrate import check_schema_version, upgrade
+from utils.db_pool import (
+    InstrumentedAsyncQueuePool,
+    PoolMetrics,
+    instrumented_pool_class,
+    pool_metrics,
+)
+from utils.metrics import request_metrics
+from utils.read_routing import read_routing, request_writer
+from utils.slow_query import slow_query_log
 
 # Models are imported here to have them initialized
 from models.user import User
 from models.task import Task
+from models.task_stats import TaskTotals, TaskUserStats
+from models.task_change import TaskChangeSequence, TaskTombstone
+from models.task_archive import TaskArchive
+from models.shared_state import SharedStateKey
+
+DATABASE_URL = settings.database_url
+
+# Optional read replica of the same database, the listings read from it
+MYSQL_REPLICA_HOST = settings.mysql_replica_host
+REPLICA_DATABASE_URL = settings.replica_database_url
+
+# Recycle well below MySQL's wait_timeout (8h by default) and pre-ping so
+# that connections dropped by the server are never handed out
+MYSQL_POOL_SIZE = settings.mysql_pool_size
+MYSQL_MAX_OVERFLOW = settings.mysql_max_overflow
+MYSQL_POOL_TIMEOUT = settings.mysql_pool_timeout
+MYSQL_POOL_RECYCLE = settings.mysql_pool_recycle
+MYSQL_POOL_PRE_PING = settings.mysql_pool_pre_ping
+
+
+class DBStartupMode(StrEnum):
+    check = "check"
+    migrate = "migrate"
+    skip = "skip"
+
+
+DB_STARTUP_MODE = DBStartupMode(settings.db_startup_mode)
 
-load_dotenv()
 
-DATABASE_URL = (
-    f"mysql+pymysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}"
-    f"@{os.getenv('MYSQL_HOST')}:{os.getenv('MYSQL_PORT')}/{os.getenv('MYSQL_DB')}"
+def create_engine(url: str, metrics: PoolMetrics, poolclass=InstrumentedAsyncQueuePool):
+    engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=poolclass,
+        pool_size=MYSQL_POOL_SIZE,
+        max_overflow=MYSQL_MAX_OVERFLOW,
+        pool_timeout=MYSQL_POOL_TIMEOUT,
+        pool_recycle=MYSQL_POOL_RECYCLE,
+        pool_pre_ping=MYSQL_POOL_PRE_PING,
+    )
+    metrics.attach(engine.sync_engine)
+    request_metrics.attach(engine.sync_engine)
+    slow_query_log.attach(engine.sync_engine)
+    return engine
+
+
+engine = create_engine(DATABASE_URL, pool_metrics)
+
+replica_pool_metrics = PoolMetrics()
+replica_engine = (
+    create_engine(
+        REPLICA_DATABASE_URL,
+        replica_pool_metrics,
+        poolclass=instrumented_pool_class(replica_pool_metrics),
+    )
+    if REPLICA_DATABASE_URL
+    else None
+)
+
+# Objects stay usable after commit, attribute access must never trigger
+# implicit IO on an async session
+async_session_maker = async_sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+# Sessions on the replica refuse writes
+replica_session_maker = (
+    async_sessionmaker(
+        replica_engine, class_=AsyncSession, expire_on_commit=False, info={"read_only": True}
+    )
+    if replica_engine is not None
+    else None
 )
 
-engine = create_engine(DATABASE_URL, echo=False)
 
+# Set once the schema is handled; workers forked after serve.py prepared it
+# inherit it and skip the work
+_schema_prepared = False
 
-def create_tables():
-    SQLModel.metadata.create_all(engine)
 
+async def prepare_schema() -> bool:
+    """
+    Startup schema handling, by default the app only verifies that the
+    database is at the latest migration; `python -m migrate upgrade` applies them.
+    False when this process (or the one it was forked from) already did.
+    """
+    global _schema_prepared
+    if _schema_prepared:
+        return False
+    if DB_STARTUP_MODE == DBStartupMode.migrate:
+        await upgrade(engine)
+    elif DB_STARTUP_MODE == DBStartupMode.check:
+        await check_schema_version(engine)
+    _schema_prepared = True
+    return True
 
-def get_session():
-    with Session(engine) as session:
+
+async def get_session():
+    async with async_session_maker() as session:
         yield session
+
+
+def get_replica_session_maker():
+    return replica_session_maker
+
+
+async def get_write_session(request: Request, session: AsyncSession = Depends(get_session)):
+    """
+    The request's primary session. When the request is done with it, and
+    before the response is sent, a commit that wrote opens the
+    read-your-writes window of the requesting user.
+    """
+    writer = request_writer(request)
+    try:
+        yield session
+    finally:
+        if writer is not None and session.info.get("committed_write"):
+            await read_routing.mark_write(writer)
+
+
+async def get_read_session(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    replica_maker: async_sessionmaker | None = Depends(get_replica_session_maker),
+):
+    """
+    A session on the replica, or the request's primary session when there
+    is no replica or the user wrote within the read-your-writes window.
+    """
+    if replica_maker is None or not await read_routing.use_replica(request_writer(request)):
+        yield session
+        return
+    async with replica_maker() as read_session:
+        yield read_session
+
+
+def get_session_maker():
+    # For responses that outlive the request scoped session, e.g. streaming
+    return async_session_maker
+
+
+async def get_read_session_maker(
+    request: Request,
+    primary_maker: async_sessionmaker = Depends(get_session_maker),
+    replica_maker: async_sessionmaker | None = Depends(get_replica_session_maker),
+):
+    """Like get_read_session, for responses that outlive the request."""
+    if replica_maker is None or not await read_routing.use_replica(request_writer(request)):
+        return primary_maker
+    return replica_maker
+
+
+def get_pool_stats() -> dict:
+    return pool_metrics.snapshot(engine.sync_engine.pool)
+
+
+def get_replica_pool_stats() -> dict | None:
+    if replica_engine is None:
+        return None
+    return replica_pool_metrics.snapshot(replica_engine.sync_engine.pool)
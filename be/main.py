@@ -1,12 +1,38 @@
 import logging
+import os
 from fastapi import FastAPI, status, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from database import create_tables
-from logger import configure_logging
+from database import (
+    DB_STARTUP_MODE,
+    engine,
+    get_pool_stats,
+    get_replica_pool_stats,
+    prepare_schema,
+    replica_engine,
+)
+from logger import configure_logging, log_pipeline
 from router.task_router import router as task_router
 from router.user_router import router as user_router
+from service.task_archive_service import task_archiver
+from utils.correlation import CorrelationIdMiddleware
+from utils.exception import (
+    ChangeCursorExpiredException,
+    InvalidCursorException,
+    PasswordHasherOverloadedException,
+)
+from utils.metrics import MetricsMiddleware, request_metrics
+from utils.password_hasher import password_hasher
+from utils.principal_cache import principal_cache
+from utils.shared_state import shared_state
+from utils.process_stats import process_stats
+from utils.rate_limit import RateLimitMiddleware, rate_limiter
+from utils.read_routing import read_routing
+from utils.single_flight import single_flight
+from utils.slow_query import slow_query_log
+from utils.task_cache import task_cache
+from utils.task_events import task_events
 
 logger = logging.getLogger(__name__)
 
@@ -14,18 +40,35 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
-    # Initialization of the DB schema
-    print("Syncing database schema ...")
-    create_tables()
-    print("Database schema synced.")
+    # Schema changes go through migrations, see migrate.py. Workers of
+    # serve.py find the schema prepared before they were forked.
+    if await prepare_schema():
+        print(f"Database schema ready (mode: {DB_STARTUP_MODE}).")
 
     configure_logging()
     print("Logger configured.")
+    await task_events.start()
+    await task_archiver.start()
+    startup_seconds = process_stats.ready()
+    print(
+        f"Worker {os.getpid()} ready in {startup_seconds:.2f}s, "
+        f"{process_stats.stats().get('rss_bytes', 0) / 2**20:.0f} MiB resident."
+    )
     yield
     # Shutdown logic
+    await task_archiver.stop()
+    await task_events.stop()
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+    password_hasher.shutdown()
+    # Last, writes out what the shutdown logged
+    log_pipeline.stop()
 
 
 app = FastAPI(lifespan=lifespan)
+# Inside CORS, so that 429 and 503 responses are readable by browsers
+app.add_middleware(RateLimitMiddleware, router=app.router)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -33,6 +76,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outside the other middleware, so the recorded latency covers all of them
+app.add_middleware(MetricsMiddleware)
+# Outermost, every log record of a request carries its id
+app.add_middleware(CorrelationIdMiddleware)
 
 
 # Health probe endpoint
@@ -44,13 +91,98 @@ def health() -> bool:
     return True
 
 
+@app.get("/health/db-pool", status_code=status.HTTP_200_OK, summary="Database pool stats")
+def db_pool_health() -> dict:
+    """
+    Connection pool occupancy and checkout wait times, of the replica too
+    when one is configured
+    """
+    stats = get_pool_stats()
+    replica = get_replica_pool_stats()
+    if replica is not None:
+        stats["replica"] = replica
+    return stats
+
+
+@app.get("/health/task-cache", status_code=status.HTTP_200_OK, summary="Task cache stats")
+def task_cache_health() -> dict:
+    """
+    Task cache hit ratio, size and evictions
+    """
+    return task_cache.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, summary="Prometheus metrics")
+def metrics() -> PlainTextResponse:
+    """
+    Per route latency, status counts, in-flight requests, DB queries per
+    request and query budget overruns, plus pool, slow query, replica
+    routing, rate limiter, request coalescing, principal cache, shared
+    state, task cache, task events, task archiver, password hasher and
+    logging stats, and this worker's startup time and memory
+    """
+    gauges = {"db_pool": get_pool_stats()}
+    replica = get_replica_pool_stats()
+    if replica is not None:
+        gauges["db_replica_pool"] = replica
+    return PlainTextResponse(
+        request_metrics.render(
+            {
+                **gauges,
+                "read_routing": read_routing.stats(),
+                "slow_queries": slow_query_log.stats(),
+                "rate_limit": rate_limiter.stats(),
+                "single_flight": single_flight.stats(),
+                "principal_cache": principal_cache.stats(),
+                "shared_state": shared_state.stats(),
+                "task_cache": task_cache.stats(),
+                "task_events": task_events.stats(),
+                "task_archiver": task_archiver.stats(),
+                "password_hasher": password_hasher.stats(),
+                "logging": log_pipeline.stats(),
+                "process": process_stats.stats(),
+            }
+        ),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 app.include_router(task_router)
 app.include_router(user_router)
 
 
+@app.exception_handler(InvalidCursorException)
+async def invalid_cursor_exception_handler(request: Request, exc: InvalidCursorException):
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": "Invalid pagination cursor"},
+    )
+
+
+@app.exception_handler(ChangeCursorExpiredException)
+async def change_cursor_expired_exception_handler(
+    request: Request, exc: ChangeCursorExpiredException
+):
+    return JSONResponse(
+        status_code=status.HTTP_410_GONE,
+        content={"detail": "Change cursor expired, sync again without since"},
+    )
+
+
+@app.exception_handler(PasswordHasherOverloadedException)
+async def password_hasher_overloaded_exception_handler(
+    request: Request, exc: PasswordHasherOverloadedException
+):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many concurrent logins, try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unhandled error: {exc}", exc_info=True)
+    logger.error("Unhandled error: %s", exc, exc_info=True)
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal Server Error"},
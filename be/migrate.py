@@ -0,0 +1,128 @@
+"""
+Schema migrations
+
+Run from the `be` directory:
+
+    python -m migrate upgrade [revision]    # defaults to head
+    python -m migrate upgrade --sql         # print the SQL instead
+    python -m migrate downgrade <revision>
+    python -m migrate current
+    python -m migrate check                 # exits 1 unless at head
+    python -m migrate revision -m "message" --autogenerate
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+# Created by raw DDL in the migrations, not models (the SQLite FTS5 table of
+# task search and its shadow tables)
+UNMANAGED_TABLE_PREFIX = "task_fts"
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.attributes["connection"] = connection
+    return config
+
+
+def head_revisions() -> set[str]:
+    return set(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+
+def include_object_for(dialect_name: str):
+    """
+    Autogenerate filter skipping model items created on other dialects only
+    (`ddl_if(dialect=...)`), such as the MySQL FULLTEXT index of task, and
+    the unmanaged tables.
+    """
+
+    def include_object(obj, name, type_, reflected, compare_to) -> bool:
+        if type_ == "table" and reflected and name.startswith(UNMANAGED_TABLE_PREFIX):
+            return False
+        ddl_if = getattr(obj, "_ddl_if", None)
+        if ddl_if is None or ddl_if.dialect is None:
+            return True
+        dialects = (ddl_if.dialect,) if isinstance(ddl_if.dialect, str) else ddl_if.dialect
+        return dialect_name in dialects
+
+    return include_object
+
+
+async def current_revisions(engine: AsyncEngine) -> set[str]:
+    async with engine.connect() as conn:
+        return set(
+            await conn.run_sync(
+                lambda sync_conn: MigrationContext.configure(sync_conn).get_current_heads()
+            )
+        )
+
+
+async def upgrade(engine: AsyncEngine, revision: str = "head"):
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: command.upgrade(alembic_config(sync_conn), revision)
+        )
+
+
+async def check_schema_version(engine: AsyncEngine):
+    """Raises unless the database is migrated to the revision the code expects."""
+    current, head = await current_revisions(engine), head_revisions()
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at {sorted(current) or 'no revision'}, "
+            f"expected {sorted(head)}. Run `python -m migrate upgrade`."
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade")
+    upgrade_parser.add_argument("revision", nargs="?", default="head")
+    upgrade_parser.add_argument("--sql", action="store_true")
+    commands.add_parser("downgrade").add_argument("revision")
+    commands.add_parser("current")
+    commands.add_parser("check")
+    revision_parser = commands.add_parser("revision")
+    revision_parser.add_argument("-m", "--message", required=True)
+    revision_parser.add_argument("--autogenerate", action="store_true")
+    args = parser.parse_args()
+
+    config = alembic_config()
+    if args.command == "upgrade":
+        command.upgrade(config, args.revision, sql=args.sql)
+    elif args.command == "downgrade":
+        command.downgrade(config, args.revision)
+    elif args.command == "current":
+        command.current(config, verbose=True)
+    elif args.command == "revision":
+        command.revision(config, message=args.message, autogenerate=args.autogenerate)
+    elif args.command == "check":
+        from database import engine
+
+        async def check():
+            try:
+                await check_schema_version(engine)
+            finally:
+                await engine.dispose()
+
+        try:
+            asyncio.run(check())
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        print("Database schema is up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""add updated_at columns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:05:00.000000
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("user", "task")
+TIMESTAMP_TYPE = sa.DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    as_sql = op.get_context().as_sql
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    for table in TABLES:
+        # Tables created by create_all after updated_at was added have it already
+        if not as_sql and "updated_at" in {
+            c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)
+        }:
+            continue
+
+        # Added nullable, backfilled, then made NOT NULL, so that existing
+        # rows get a value without a dialect specific server default
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column("updated_at", TIMESTAMP_TYPE, nullable=True))
+        op.execute(
+            sa.table(table, sa.column("updated_at", TIMESTAMP_TYPE)).update().values(updated_at=now)
+        )
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column("updated_at", existing_type=TIMESTAMP_TYPE, nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("updated_at")
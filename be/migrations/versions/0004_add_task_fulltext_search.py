@@ -0,0 +1,74 @@
+"""add task full-text search
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 11:30:00.000000
+
+GET /tasks/search matches title and description through an index rather
+than a LIKE scan of every task:
+
+- MySQL: FULLTEXT index ix_task_title_description_fulltext, queried with
+  MATCH ... AGAINST in boolean mode.
+- SQLite: FTS5 table task_fts over the task rows (external content), kept
+  in sync by triggers and filled from the existing tasks here.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Copy of models.task.TASK_FTS_DDL as of this revision
+TASK_FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS task_fts
+    USING fts5(title, description, content='task', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_insert AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_delete AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts (task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_update AFTER UPDATE OF title, description
+    ON task BEGIN
+        INSERT INTO task_fts (task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO task_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_context().dialect.name
+    if dialect == "mysql":
+        op.create_index(
+            "ix_task_title_description_fulltext",
+            "task",
+            ["title", "description"],
+            mysql_prefix="FULLTEXT",
+        )
+    elif dialect == "sqlite":
+        for statement in TASK_FTS_DDL:
+            op.execute(statement)
+        # Index the tasks that already exist
+        op.execute("INSERT INTO task_fts (task_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_context().dialect.name
+    if dialect == "mysql":
+        op.drop_index("ix_task_title_description_fulltext", table_name="task")
+    elif dialect == "sqlite":
+        for trigger in ("task_fts_insert", "task_fts_delete", "task_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS task_fts")
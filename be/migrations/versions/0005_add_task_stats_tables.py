@@ -0,0 +1,87 @@
+"""add task stats tables
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00.000000
+
+Summary tables behind GET /tasks/stats, maintained by TaskService in the
+transaction of each task write. They are filled here from the existing
+tasks; `python -m task_stats rebuild` recomputes them later if needed.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    stats = op.create_table(
+        "task_user_stats",
+        sa.Column("user_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("assigned_open", sa.Integer(), nullable=False),
+        sa.Column("assigned_completed", sa.Integer(), nullable=False),
+        sa.Column("created", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    totals = op.create_table(
+        "task_totals",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("open", sa.Integer(), nullable=False),
+        sa.Column("completed", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    user = sa.table("user", sa.column("id"))
+    task = sa.table(
+        "task",
+        sa.column("assignee_id"),
+        sa.column("creator_id"),
+        sa.column("is_complete", sa.Boolean),
+    )
+
+    def count(*conditions):
+        # Correlated to the user row, each served by a task listing index
+        return (
+            sa.select(sa.func.count()).select_from(task).where(*conditions).scalar_subquery()
+        )
+
+    assigned = task.c.assignee_id == user.c.id
+    created = task.c.creator_id == user.c.id
+    op.execute(
+        stats.insert().from_select(
+            ["user_id", "assigned_open", "assigned_completed", "created"],
+            sa.select(
+                user.c.id,
+                count(assigned, task.c.is_complete == sa.false()),
+                count(assigned, task.c.is_complete == sa.true()),
+                count(created),
+            ).where(
+                sa.or_(sa.exists().where(assigned), sa.exists().where(created))
+            ),
+        )
+    )
+    op.execute(
+        totals.insert().from_select(
+            ["id", "open", "completed"],
+            sa.select(
+                sa.literal(1),
+                count(task.c.is_complete == sa.false()),
+                count(task.c.is_complete == sa.true()),
+            ),
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("task_totals")
+    op.drop_table("task_user_stats")
@@ -0,0 +1,61 @@
+"""add task archive
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:00:00.000000
+
+task_archive holds the completed tasks the archiver moved out of the task
+table, under their original ids. The index on task (is_complete,
+updated_at) serves the archiver's scan for the next batch.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMESTAMP_TYPE = sa.DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "task_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("title", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("is_complete", sa.Boolean(), nullable=False),
+        sa.Column("assignee_id", sa.Integer(), nullable=True),
+        sa.Column("creator_id", sa.Integer(), nullable=True),
+        sa.Column("updated_at", TIMESTAMP_TYPE, nullable=False),
+        sa.Column("change_seq", sa.BigInteger(), nullable=False),
+        sa.Column("archived_at", TIMESTAMP_TYPE, nullable=False),
+        sa.ForeignKeyConstraint(["assignee_id"], ["user.id"]),
+        sa.ForeignKeyConstraint(["creator_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_task_archive_assignee_id_id", "task_archive", ["assignee_id", "id"], unique=False
+    )
+    op.create_index(
+        "ix_task_archive_creator_id_id", "task_archive", ["creator_id", "id"], unique=False
+    )
+    op.create_index(
+        "ix_task_is_complete_updated_at", "task", ["is_complete", "updated_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_task_is_complete_updated_at", table_name="task")
+    op.drop_index("ix_task_archive_creator_id_id", table_name="task_archive")
+    op.drop_index("ix_task_archive_assignee_id_id", table_name="task_archive")
+    op.drop_table("task_archive")
@@ -0,0 +1,44 @@
+"""add shared state
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 10:00:00.000000
+
+shared_state holds the expiring keys that every worker must see, such as
+revoked users, when SHARED_STATE_BACKEND=database. The index on expires_at
+serves the periodic deletion of expired keys.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMESTAMP_TYPE = sa.DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "shared_state",
+        sa.Column("key", sqlmodel.sql.sqltypes.AutoString(length=191), nullable=False),
+        sa.Column("expires_at", TIMESTAMP_TYPE, nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(
+        "ix_shared_state_expires_at", "shared_state", ["expires_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_shared_state_expires_at", table_name="shared_state")
+    op.drop_table("shared_state")
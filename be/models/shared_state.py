@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+from models.user import TIMESTAMP_TYPE
+
+
+class SharedStateKey(SQLModel, table=True):
+    """
+    A key of the database backend of utils/shared_state.py, set until
+    expires_at. Expired rows are ignored until a later write deletes them.
+    """
+
+    __tablename__ = "shared_state"
+    __table_args__ = (Index("ix_shared_state_expires_at", "expires_at"),)
+
+    # 191 characters keep the primary key within InnoDB's limit on utf8mb4
+    key: str = Field(primary_key=True, max_length=191)
+    expires_at: datetime = Field(sa_type=TIMESTAMP_TYPE)
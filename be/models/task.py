@@ -1,14 +1,44 @@
-from typing import Optional
+from datetime import datetime
+from enum import StrEnum
+from typing import List, Optional
+from pydantic import field_validator
+from sqlalchemy import DDL, BigInteger, Index, event
 from sqlmodel import SQLModel, Field, Relationship
-from models.user import User
+from models.user import TIMESTAMP_TYPE, User
+from utils.clock import utc_now
 
 class Task(SQLModel, table=True):
+    # Keyset listings filtered by assignee/status or creator, see migration 0003
+    __table_args__ = (
+        Index("ix_task_assignee_id_is_complete_id", "assignee_id", "is_complete", "id"),
+        Index("ix_task_creator_id_id", "creator_id", "id"),
+        # GET /tasks/changes, the changes of one assignee in sequence order
+        Index("ix_task_assignee_id_change_seq", "assignee_id", "change_seq"),
+        # GET /tasks/search on MySQL, SQLite uses the task_fts table below
+        Index(
+            "ix_task_title_description_fulltext",
+            "title",
+            "description",
+            mysql_prefix="FULLTEXT",
+        ).ddl_if(dialect="mysql"),
+        # The archiver's scan for tasks completed long ago, see migration 0007
+        Index("ix_task_is_complete_updated_at", "is_complete", "updated_at"),
+        # Ids are never reused once the newest task is archived (SQLite;
+        # InnoDB keeps its auto increment counter anyway)
+        {"sqlite_autoincrement": True},
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     title: str
     description: str
     is_complete: bool = False
     assignee_id: int | None = Field(default=None, foreign_key="user.id")
     creator_id: int | None = Field(default=None, foreign_key="user.id")
+    # Bumped by TaskService on every write, drives ETags
+    updated_at: datetime = Field(default_factory=utc_now, sa_type=TIMESTAMP_TYPE)
+    # Position of the task's last write in the global change sequence, see
+    # service/task_change_service.py
+    change_seq: int = Field(default=0, sa_type=BigInteger)
 
     assignee: User | None = Relationship(
         back_populates="assigned_tasks",
@@ -19,6 +49,42 @@ class Task(SQLModel, table=True):
         sa_relationship_kwargs={"foreign_keys": "Task.creator_id"},
     )
 
+
+# SQLite has no FULLTEXT indexes, an FTS5 table indexes the task text instead.
+# It is external content (the text itself stays in task only) and kept in sync
+# by triggers, see migration 0004.
+TASK_FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS task_fts
+    USING fts5(title, description, content='task', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_insert AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_delete AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts (task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_update AFTER UPDATE OF title, description
+    ON task BEGIN
+        INSERT INTO task_fts (task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO task_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+)
+
+for statement in TASK_FTS_DDL:
+    event.listen(
+        Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+# The triggers go with the task table, the FTS table has to be dropped with it
+event.listen(
+    Task.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS task_fts").execute_if(dialect="sqlite"),
+)
+
+
 class TaskCreateDTO(SQLModel):
     title: str
     description: str
@@ -31,10 +97,87 @@ class TaskUpdateDTO(SQLModel):
     assignee_id: Optional[int] = None
     is_complete: Optional[bool] = None
 
+class TaskAssigneeDTO(SQLModel):
+    id: int
+    name: str
+    email: str
+
+
 class TaskWithAssigneeDTO(SQLModel):
     id: int
     title: str
     description: str
     assignee_id: int | None = None
     is_complete: Optional[bool] = None
-    assignee: Optional[User]
+    assignee: Optional[TaskAssigneeDTO]
+
+
+class TaskFilterDTO(SQLModel):
+    is_complete: Optional[bool] = None
+    assignee_id: Optional[int] = None
+    creator_id: Optional[int] = None
+
+
+class TaskPageDTO(SQLModel):
+    items: List[TaskWithAssigneeDTO]
+    next_cursor: Optional[str] = None
+
+
+class TaskSearchResultDTO(TaskWithAssigneeDTO):
+    # Relevance of the match, higher ranks first
+    score: float
+
+
+class TaskSearchPageDTO(SQLModel):
+    items: List[TaskSearchResultDTO]
+    next_cursor: Optional[str] = None
+
+
+class ExportFormat(StrEnum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+BULK_MAX_ITEMS = 5000
+
+
+class TaskBulkCreateDTO(SQLModel):
+    tasks: List[TaskCreateDTO] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class TaskBulkUpdateItemDTO(TaskUpdateDTO):
+    id: int
+
+
+class TaskBulkUpdateDTO(SQLModel):
+    tasks: List[TaskBulkUpdateItemDTO] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+    @field_validator("tasks")
+    @classmethod
+    def ids_are_unique(cls, tasks: List[TaskBulkUpdateItemDTO]) -> List[TaskBulkUpdateItemDTO]:
+        # Every item is applied to the task as it was before the request
+        ids = [task.id for task in tasks]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Each task id may appear only once")
+        return tasks
+
+
+class TaskBulkDeleteDTO(SQLModel):
+    ids: List[int] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class BulkItemStatus(StrEnum):
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+    not_found = "not_found"
+    assignee_not_found = "assignee_not_found"
+
+
+class TaskBulkResultDTO(SQLModel):
+    id: Optional[int] = None
+    status: BulkItemStatus
+
+
+class TaskBulkResponseDTO(SQLModel):
+    results: List[TaskBulkResultDTO]
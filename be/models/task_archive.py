@@ -0,0 +1,45 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Index
+from sqlmodel import SQLModel, Field, Relationship
+from models.user import TIMESTAMP_TYPE, User
+from utils.clock import utc_now
+
+# Columns moved between task and task_archive, in this order
+ARCHIVED_COLUMNS = (
+    "id",
+    "title",
+    "description",
+    "is_complete",
+    "assignee_id",
+    "creator_id",
+    "updated_at",
+    "change_seq",
+)
+
+
+class TaskArchive(SQLModel, table=True):
+    """
+    Completed tasks moved out of the task table by the archiver, with the
+    id they had there. Read-only: a write to an archived task moves it
+    back first.
+    """
+
+    __tablename__ = "task_archive"
+    __table_args__ = (
+        Index("ix_task_archive_assignee_id_id", "assignee_id", "id"),
+        Index("ix_task_archive_creator_id_id", "creator_id", "id"),
+    )
+
+    id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    title: str
+    description: str
+    is_complete: bool = True
+    assignee_id: int | None = Field(default=None, foreign_key="user.id")
+    creator_id: int | None = Field(default=None, foreign_key="user.id")
+    updated_at: datetime = Field(sa_type=TIMESTAMP_TYPE)
+    change_seq: int = Field(default=0, sa_type=BigInteger)
+    archived_at: datetime = Field(default_factory=utc_now, sa_type=TIMESTAMP_TYPE)
+
+    assignee: User | None = Relationship(
+        sa_relationship_kwargs={"foreign_keys": "TaskArchive.assignee_id", "viewonly": True}
+    )
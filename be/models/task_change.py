@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import List
+from sqlalchemy import BigInteger, Index
+from sqlmodel import SQLModel, Field
+from models.task import TaskWithAssigneeDTO
+from models.user import TIMESTAMP_TYPE
+from utils.clock import utc_now
+
+
+class TaskChangeSequence(SQLModel, table=True):
+    """
+    Single row (id 1) holding the last change sequence number handed out,
+    and the sequence below which tombstones have been pruned.
+    """
+
+    __tablename__ = "task_change_sequence"
+
+    id: int = Field(default=1, primary_key=True, sa_column_kwargs={"autoincrement": False})
+    value: int = Field(default=0, sa_type=BigInteger)
+    pruned_seq: int = Field(default=0, sa_type=BigInteger)
+
+
+class TaskTombstone(SQLModel, table=True):
+    """
+    A task that left an assignee's scope at change_seq: it was deleted, or
+    reassigned to somebody else. Deletions of unassigned tasks are recorded
+    with a null assignee.
+    """
+
+    __tablename__ = "task_tombstone"
+    __table_args__ = (
+        Index("ix_task_tombstone_assignee_id_change_seq", "assignee_id", "change_seq"),
+        Index("ix_task_tombstone_created_at", "created_at"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    task_id: int
+    assignee_id: int | None = None
+    change_seq: int = Field(sa_type=BigInteger)
+    created_at: datetime = Field(default_factory=utc_now, sa_type=TIMESTAMP_TYPE)
+
+
+class TaskChangesDTO(SQLModel):
+    # Tasks currently assigned to the user that changed after the cursor
+    items: List[TaskWithAssigneeDTO]
+    # Ids of tasks that left the user's scope after the cursor
+    removed: List[int]
+    next_cursor: str
+    has_more: bool
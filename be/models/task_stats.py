@@ -0,0 +1,47 @@
+from typing import List, Optional
+from sqlmodel import SQLModel, Field
+
+
+class TaskUserStats(SQLModel, table=True):
+    """
+    Task counts of one user, maintained by TaskService in the transaction of
+    every task write. Rows only exist for users with at least one task.
+    """
+
+    __tablename__ = "task_user_stats"
+
+    user_id: int = Field(
+        primary_key=True, foreign_key="user.id", sa_column_kwargs={"autoincrement": False}
+    )
+    assigned_open: int = 0
+    assigned_completed: int = 0
+    created: int = 0
+
+
+class TaskTotals(SQLModel, table=True):
+    """Single row (id 1) of counts over all tasks, unassigned ones included."""
+
+    __tablename__ = "task_totals"
+
+    id: int = Field(default=1, primary_key=True, sa_column_kwargs={"autoincrement": False})
+    open: int = 0
+    completed: int = 0
+
+
+class TaskTotalsDTO(SQLModel):
+    open: int
+    completed: int
+    total: int
+
+
+class TaskUserStatsDTO(SQLModel):
+    user_id: int
+    assigned_open: int
+    assigned_completed: int
+    created: int
+
+
+class TaskStatsDTO(SQLModel):
+    totals: TaskTotalsDTO
+    users: List[TaskUserStatsDTO]
+    next_cursor: Optional[str] = None
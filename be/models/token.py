@@ -4,3 +4,8 @@ from sqlmodel import SQLModel
 class TokenDTO(SQLModel):
     access_token: str
     token_type: str
+
+
+class EventsTokenDTO(SQLModel):
+    access_token: str
+    expires_in: int
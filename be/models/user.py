@@ -1,5 +1,12 @@
+from datetime import datetime
 from typing import Optional, List
+from sqlalchemy import DateTime
+from sqlalchemy.dialects import mysql
 from sqlmodel import SQLModel, Field, Relationship
+from utils.clock import utc_now
+
+# Microsecond precision so that consecutive writes get distinct timestamps
+TIMESTAMP_TYPE = DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
 
 
 class User(SQLModel, table=True):
@@ -9,6 +16,8 @@ class User(SQLModel, table=True):
     name: str
     is_admin: bool = Field(default=False)
     is_active: bool = Field(default=True)
+    # Bumped by UserService on every write, drives ETags
+    updated_at: datetime = Field(default_factory=utc_now, sa_type=TIMESTAMP_TYPE)
 
     assigned_tasks: List["Task"] = Relationship(
         back_populates="assignee",
@@ -36,3 +45,8 @@ class UserOutDTO(SQLModel):
     name: str
     is_admin: bool
     is_active: bool
+
+
+class UserPageDTO(SQLModel):
+    items: List[UserOutDTO]
+    next_cursor: Optional[str] = None
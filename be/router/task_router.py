@@ -1,41 +1,275 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, status, Depends
-from fastapi.responses import JSONResponse
+from typing import Annotated, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status, Depends
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from database import get_read_session_maker
+from models.task_change import TaskChangesDTO
+from models.task_stats import TaskStatsDTO
+from models.token import EventsTokenDTO
 from models.user import UserOutDTO
-from models.task import TaskCreateDTO, Task, TaskUpdateDTO, TaskWithAssigneeDTO
-from service.task_service import TaskServiceDep
-from utils.dependencies import get_current_user
+from models.task import (
+    ExportFormat,
+    TaskBulkCreateDTO,
+    TaskBulkDeleteDTO,
+    TaskBulkResponseDTO,
+    TaskBulkUpdateDTO,
+    TaskCreateDTO,
+    Task,
+    TaskFilterDTO,
+    TaskPageDTO,
+    TaskSearchPageDTO,
+    TaskUpdateDTO,
+    TaskWithAssigneeDTO,
+)
+from service.task_service import TaskService, TaskServiceDep
+from service.task_stats_service import TaskStatsServiceDep
+from utils.dependencies import (
+    TASK_EVENTS_TOKEN_SECONDS,
+    create_events_token,
+    get_current_user,
+    get_event_stream_user,
+)
+from utils.etag import is_not_modified, not_modified, set_etag
 from utils.exception import UserNotFoundException
+from utils.export import encode_csv, encode_ndjson
+from utils.metrics import query_budget
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.read_routing import request_writer
+from utils.search import SEARCH_MAX_QUERY_LENGTH
+from utils.single_flight import flight_key, single_flight
+from utils.task_events import event_stream, task_events
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+# DB queries per request, authentication without a cached principal included:
+# the ETag and the page, whatever the page size
+LIST_QUERY_BUDGET = Depends(query_budget(3))
 
-@router.get("/", response_model=List[TaskWithAssigneeDTO])
+
+def _page_body(tasks: list[dict], next_cursor: Optional[str]) -> bytes:
+    # Pages are plain dicts already shaped like TaskPageDTO, they are encoded
+    # directly instead of being validated again through response_model
+    return ORJSONResponse({"items": tasks, "next_cursor": next_cursor}).body
+
+
+def _page_response(body: bytes, etag: str) -> Response:
+    response = Response(body, media_type="application/json")
+    set_etag(response, etag)
+    return response
+
+
+@router.get("/", response_model=TaskPageDTO, dependencies=[LIST_QUERY_BUDGET])
 async def get_all_tasks(
-    task_service: TaskServiceDep, current_user: UserOutDTO = Depends(get_current_user)
+    task_service: TaskServiceDep,
+    request: Request,
+    filters: Annotated[TaskFilterDTO, Depends()],
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+    current_user: UserOutDTO = Depends(get_current_user),
 ):
-    tasks = task_service.find_all()
-    return tasks
+    if include_archived:
+        # Read from both tables, without an ETag
+        tasks, next_cursor = await task_service.find_all(
+            limit=limit, cursor=cursor, filters=filters, include_archived=True
+        )
+        return ORJSONResponse({"items": tasks, "next_cursor": next_cursor})
 
+    # Identical requests arriving together share the ETag query, then the
+    # page query and its encoding
+    params = (limit, cursor, *filters.model_dump().values())
+    etag = await single_flight.do(
+        flight_key(request, current_user, "etag", *params),
+        lambda: task_service.get_list_etag(limit=limit, cursor=cursor, filters=filters),
+        writer=request_writer(request),
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
 
-@router.get("/my", response_model=List[TaskWithAssigneeDTO])
+    async def page_body() -> bytes:
+        tasks, next_cursor = await task_service.find_all(
+            limit=limit, cursor=cursor, filters=filters
+        )
+        return _page_body(tasks, next_cursor)
+
+    body = await single_flight.do(
+        flight_key(request, current_user, etag, *params),
+        page_body,
+        writer=request_writer(request),
+    )
+    return _page_response(body, etag)
+
+
+@router.get("/my", response_model=TaskPageDTO, dependencies=[LIST_QUERY_BUDGET])
 async def get_my_tasks(
-    task_service: TaskServiceDep, current_user: UserOutDTO = Depends(get_current_user)
-) -> List[Task]:
-    return task_service.find_all_for_user(user_id=current_user.id)
+    task_service: TaskServiceDep,
+    request: Request,
+    filters: Annotated[TaskFilterDTO, Depends()],
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+    current_user: UserOutDTO = Depends(get_current_user),
+):
+    if include_archived:
+        tasks, next_cursor = await task_service.find_all_for_user(
+            user_id=current_user.id,
+            limit=limit,
+            cursor=cursor,
+            filters=filters,
+            include_archived=True,
+        )
+        return ORJSONResponse({"items": tasks, "next_cursor": next_cursor})
+
+    etag = await task_service.get_list_etag_for_user(
+        user_id=current_user.id, limit=limit, cursor=cursor, filters=filters
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    tasks, next_cursor = await task_service.find_all_for_user(
+        user_id=current_user.id, limit=limit, cursor=cursor, filters=filters
+    )
+    return _page_response(_page_body(tasks, next_cursor), etag)
+
+
+@router.get("/archive", response_model=TaskPageDTO, dependencies=[Depends(query_budget(2))])
+async def get_archived_tasks(
+    task_service: TaskServiceDep,
+    filters: Annotated[TaskFilterDTO, Depends()],
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: UserOutDTO = Depends(get_current_user),
+):
+    """
+    Completed tasks moved out of the working table by the archiver. They
+    are still served by GET /tasks/{task_id}, and writing one restores it.
+    """
+    tasks, next_cursor = await task_service.find_archived(
+        limit=limit, cursor=cursor, filters=filters
+    )
+    return ORJSONResponse({"items": tasks, "next_cursor": next_cursor})
+
+
+@router.get("/search", response_model=TaskSearchPageDTO, dependencies=[Depends(query_budget(2))])
+async def search_tasks(
+    task_service: TaskServiceDep,
+    filters: Annotated[TaskFilterDTO, Depends()],
+    q: str = Query(min_length=1, max_length=SEARCH_MAX_QUERY_LENGTH),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: UserOutDTO = Depends(get_current_user),
+):
+    tasks, next_cursor = await task_service.search(
+        q, limit=limit, cursor=cursor, filters=filters
+    )
+    return ORJSONResponse({"items": tasks, "next_cursor": next_cursor})
+
+
+@router.get("/stats", response_model=TaskStatsDTO, dependencies=[Depends(query_budget(3))])
+async def get_task_stats(
+    stats_service: TaskStatsServiceDep,
+    user_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: UserOutDTO = Depends(get_current_user),
+):
+    return await stats_service.get_stats(limit=limit, cursor=cursor, user_id=user_id)
+
+
+@router.get("/changes", response_model=TaskChangesDTO, dependencies=[Depends(query_budget(4))])
+async def get_task_changes(
+    task_service: TaskServiceDep,
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: UserOutDTO = Depends(get_current_user),
+):
+    """
+    Changes of the current user's tasks since the `since` cursor of the
+    previous sync, or all of them without one. Follow `next_cursor` while
+    `has_more`, then keep it for the next sync.
+    """
+    changes = await task_service.get_changes(current_user.id, since=since, limit=limit)
+    return ORJSONResponse(changes)
+
+
+@router.get("/events")
+async def task_events_stream(
+    current_user: UserOutDTO = Depends(get_event_stream_user),
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of task changes (created, updated, deleted).
+    Admins receive every change, other users those of tasks assigned to them
+    before or after the change. Authenticated with the Authorization header,
+    or for EventSource with `access_token` from POST /tasks/events/token.
+    """
+    subscription = task_events.subscribe(current_user.id, current_user.is_admin)
+    return StreamingResponse(
+        event_stream(task_events, subscription),
+        media_type="text/event-stream",
+        # No caching or proxy buffering, frames must reach the client as sent
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
-@router.get("/{task_id}", response_model=TaskWithAssigneeDTO)
+@router.post("/events/token", response_model=EventsTokenDTO)
+async def get_events_token(current_user: UserOutDTO = Depends(get_current_user)):
+    """
+    A token for `GET /tasks/events?access_token=...`, valid for
+    TASK_EVENTS_TOKEN_SECONDS and for that stream only. It is checked when
+    the stream opens: once it expired, a reconnecting client needs a new one.
+    """
+    return {
+        "access_token": create_events_token(current_user),
+        "expires_in": TASK_EVENTS_TOKEN_SECONDS,
+    }
+
+
+@router.get("/export")
+async def export_tasks(
+    filters: Annotated[TaskFilterDTO, Depends()],
+    format: ExportFormat = ExportFormat.ndjson,
+    session_maker: async_sessionmaker = Depends(get_read_session_maker),
+    current_user: UserOutDTO = Depends(get_current_user),
+) -> StreamingResponse:
+    async def rows():
+        # The request scoped session is closed before the body is streamed
+        async with session_maker() as session:
+            async for batch in TaskService(session=session).stream_export_rows(filters):
+                yield batch
+
+    if format == ExportFormat.csv:
+        body, media_type = encode_csv(rows()), "text/csv"
+    else:
+        body, media_type = encode_ndjson(rows()), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
+
+
+# Two more when the task is archived
+@router.get(
+    "/{task_id}", response_model=TaskWithAssigneeDTO, dependencies=[Depends(query_budget(5))]
+)
 async def get_task(
     task_service: TaskServiceDep,
     task_id: int,
+    request: Request,
+    response: Response,
     current_user: UserOutDTO = Depends(get_current_user),
 ) -> Task:
-    task = task_service.get_task_by_id(task_id=task_id)
+    etag = await task_service.get_task_etag(task_id=task_id)
+    if etag is not None and is_not_modified(request, etag):
+        return not_modified(etag)
+
+    task = await task_service.get_task_by_id(task_id=task_id)
     if task is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Task not found"
         )
+    set_etag(response, etag)
     return task
 
 @router.post("", response_model=Task)
@@ -45,7 +279,7 @@ async def create_task(
     current_user: UserOutDTO = Depends(get_current_user),
 ):
     try:
-        task = task_service.create_task(task=task, creator_id=current_user.id)
+        task = await task_service.create_task(task=task, creator_id=current_user.id)
         return task
     except UserNotFoundException:
         raise HTTPException(
@@ -53,6 +287,40 @@ async def create_task(
         )
 
 
+# Bulk routes are registered before the /{task_id} routes so that "bulk"
+# is not matched as a task id
+@router.post("/bulk", response_model=TaskBulkResponseDTO)
+async def bulk_create_tasks(
+    task_service: TaskServiceDep,
+    payload: TaskBulkCreateDTO,
+    current_user: UserOutDTO = Depends(get_current_user),
+):
+    results = await task_service.bulk_create_tasks(
+        tasks=payload.tasks, creator_id=current_user.id
+    )
+    return {"results": results}
+
+
+@router.patch("/bulk", response_model=TaskBulkResponseDTO)
+async def bulk_update_tasks(
+    task_service: TaskServiceDep,
+    payload: TaskBulkUpdateDTO,
+    current_user: UserOutDTO = Depends(get_current_user),
+):
+    results = await task_service.bulk_update_tasks(tasks=payload.tasks)
+    return {"results": results}
+
+
+@router.delete("/bulk", response_model=TaskBulkResponseDTO)
+async def bulk_delete_tasks(
+    task_service: TaskServiceDep,
+    payload: TaskBulkDeleteDTO,
+    current_user: UserOutDTO = Depends(get_current_user),
+):
+    results = await task_service.bulk_delete_tasks(task_ids=payload.ids)
+    return {"results": results}
+
+
 @router.patch("/{task_id}", response_model=Task)
 async def update_task(
     task_service: TaskServiceDep,
@@ -61,7 +329,7 @@ async def update_task(
     current_user: UserOutDTO = Depends(get_current_user),
 ) -> Task:
     try:
-        updated_task = task_service.update_task(task_id=task_id, task_update=task_update)
+        updated_task = await task_service.update_task(task_id=task_id, task_update=task_update)
         return updated_task
     except UserNotFoundException:
         raise HTTPException(
@@ -70,6 +338,6 @@ async def update_task(
 
 
 @router.delete("/{task_id}")
-async def delete_task(task_service: TaskServiceDep, task_id):
-    task_service.delete_task(task_id=task_id)
+async def delete_task(task_service: TaskServiceDep, task_id: int):
+    await task_service.delete_task(task_id=task_id)
     return JSONResponse(status_code=200, content={"message": "Successfully deleted"})
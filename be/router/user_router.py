@@ -1,44 +1,97 @@
-from fastapi import APIRouter, Depends, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 from starlette.responses import JSONResponse
-from models.user import UserCreateDTO, UserOutDTO
+from models.user import UserCreateDTO, UserOutDTO, UserPageDTO
 from models.token import TokenDTO
-from service.user_service import UserServiceDep
+from service.user_service import UserService, UserServiceDep
 from service.auth_service import AuthServiceDep
 from fastapi.security import OAuth2PasswordRequestForm
 from utils.dependencies import get_current_user, admin_required
+from utils.etag import is_not_modified, not_modified, set_etag
+from utils.metrics import query_budget
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.read_routing import request_writer
+from utils.single_flight import flight_key, single_flight
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# DB queries per request, authentication without a cached principal included
+LIST_QUERY_BUDGET = Depends(query_budget(3))
+
+
+async def _user_page(
+    user_service: UserService,
+    request: Request,
+    current_user: UserOutDTO,
+    only_active: bool,
+    limit: int,
+    cursor: Optional[str],
+) -> Response:
+    """
+    A page of users whose ETag query, page query and encoding are shared by
+    the identical requests that arrive while they run.
+    """
+    params = (only_active, limit, cursor)
+    etag = await single_flight.do(
+        flight_key(request, current_user, "etag", *params),
+        lambda: user_service.get_list_etag(only_active=only_active, limit=limit, cursor=cursor),
+        writer=request_writer(request),
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    async def page_body() -> bytes:
+        users, next_cursor = await user_service.get_all_users(
+            only_active=only_active, limit=limit, cursor=cursor
+        )
+        # Validated once per flight, the DTO leaves the password hashes out
+        return UserPageDTO(items=users, next_cursor=next_cursor).model_dump_json().encode()
+
+    body = await single_flight.do(
+        flight_key(request, current_user, etag, *params),
+        page_body,
+        writer=request_writer(request),
+    )
+    response = Response(body, media_type="application/json")
+    set_etag(response, etag)
+    return response
+
 
-@router.get("/all/active", response_model=list[UserOutDTO])
+@router.get("/all/active", response_model=UserPageDTO, dependencies=[LIST_QUERY_BUDGET])
 async def get_all_active_users(
-    user_service: UserServiceDep, current_user: UserOutDTO = Depends(get_current_user)
-) -> list[UserOutDTO]:
-    users = user_service.get_all_active_users()
-    return users
+    user_service: UserServiceDep,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: UserOutDTO = Depends(get_current_user),
+):
+    return await _user_page(user_service, request, current_user, True, limit, cursor)
 
 
-@router.get("/all", response_model=list[UserOutDTO])
+@router.get("/all", response_model=UserPageDTO, dependencies=[LIST_QUERY_BUDGET])
 async def get_all_users(
-    user_service: UserServiceDep, current_user: UserOutDTO = Depends(get_current_user)
-) -> list[UserOutDTO]:
-    users = user_service.get_all_users(only_active=False)
-    return users
+    user_service: UserServiceDep,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: UserOutDTO = Depends(get_current_user),
+):
+    return await _user_page(user_service, request, current_user, False, limit, cursor)
 
 
 @router.post("/register", response_model=UserOutDTO, status_code=201)
 async def create_user(user: UserCreateDTO, user_service: UserServiceDep):
-    new_user = user_service.register_user(user)
+    new_user = await user_service.register_user(user)
     return new_user
 
 
 @router.post("/register/admin", response_model=UserOutDTO, status_code=201)
 async def create_admin_user(user: UserCreateDTO, user_service: UserServiceDep):
-    new_user = user_service.register_user(user, is_admin=True)
+    new_user = await user_service.register_user(user, is_admin=True)
     return new_user
 
 
-@router.get("/me", response_model=UserOutDTO)
+@router.get("/me", response_model=UserOutDTO, dependencies=[Depends(query_budget(1))])
 async def read_users_me(
     current_user: UserOutDTO = Depends(get_current_user),
 ):
@@ -49,13 +102,13 @@ async def read_users_me(
 async def login_for_access_token(
     auth_service: AuthServiceDep, form_data: OAuth2PasswordRequestForm = Depends()
 ):
-    return auth_service.authenticate_user(form_data.username, form_data.password)
+    return await auth_service.authenticate_user(form_data.username, form_data.password)
 
 @router.post("/admin/login", response_model=TokenDTO)
 async def admin_login_for_access_token(
     auth_service: AuthServiceDep, form_data: OAuth2PasswordRequestForm = Depends()
 ):
-    return auth_service.authenticate_user(form_data.username, form_data.password, admin_login=True)
+    return await auth_service.authenticate_user(form_data.username, form_data.password, admin_login=True)
 
 @router.patch("/deactivate/{user_id}")
 async def deactivate_user(
@@ -63,7 +116,7 @@ async def deactivate_user(
     user_id: int,
     current_admin: UserOutDTO = Depends(admin_required),
 ) -> JSONResponse:
-    user_service.deactivate_user(user_id)
+    await user_service.deactivate_user(user_id)
     return JSONResponse(
         status_code=status.HTTP_200_OK,
         content={"message": f"User with id: {user_id} -> deactivated"},
@@ -76,7 +129,7 @@ async def activate_user(
     user_id: int,
     current_admin: UserOutDTO = Depends(admin_required),
 ) -> JSONResponse:
-    user_service.activate_user(user_id)
+    await user_service.activate_user(user_id)
     return JSONResponse(
         status_code=status.HTTP_200_OK,
         content={"message": f"User with id: {user_id} -> activated"},
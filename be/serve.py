@@ -0,0 +1,145 @@
+"""
+Production server
+
+Runs the API under gunicorn with uvicorn workers, on uvloop and httptools
+when they are installed. One worker per CPU unless --workers (WEB_WORKERS)
+says otherwise. The app is imported and the database schema prepared
+once, here, before the workers are forked: they start without importing
+anything and share the loaded code copy-on-write.
+
+SIGTERM (or Ctrl+C) drains the workers: they stop accepting connections,
+give the requests in flight WEB_GRACEFUL_TIMEOUT_SECONDS to finish, cancel
+what is left (event streams) and run the app's shutdown, which disposes
+the connection pools. Run from the `be` directory:
+
+    python -m serve [--workers 4] [--bind 0.0.0.0:8000]
+
+`uvicorn main:app --reload` stays the way to develop. Workers share only
+what lives in MySQL or Redis, see "Workers" in the README.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import time
+
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+
+from config import settings
+from utils.shared_state import SHARED_STATE_BACKEND
+from utils.process_stats import memory_usage
+
+# For the app's own shutdown once the drain is over, before gunicorn kills
+# the worker
+SHUTDOWN_GRACE_SECONDS = 10
+
+# Guarantees that only hold within one worker with SHARED_STATE_BACKEND=local,
+# other workers do not see the state they rely on
+PER_WORKER_STATE = (
+    "a deactivated user stays authenticated on other workers for up to "
+    "PRINCIPAL_CACHE_TTL_SECONDS (the token lifetime with "
+    "PRINCIPAL_CACHE_TRUST_TOKEN_CLAIMS=true)",
+    "a read on another worker right after a write may go to the replica "
+    "and miss the write",
+)
+
+
+def default_workers() -> int:
+    # The CPUs this process may run on, a container's cpuset included
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(requested: int) -> int:
+    return requested if requested > 0 else default_workers()
+
+
+def per_worker_warnings(
+    workers: int, shared_state_backend: str = SHARED_STATE_BACKEND
+) -> list[str]:
+    if workers <= 1 or shared_state_backend != "local":
+        return []
+    return [f"Warning: with {workers} workers, {caveat}." for caveat in PER_WORKER_STATE]
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+class ProductionWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        # A failed startup stops the worker rather than serving without it
+        "lifespan": "on",
+        "timeout_graceful_shutdown": settings.web_graceful_timeout_seconds,
+    }
+
+
+class Server(BaseApplication):
+    """Gunicorn serving an app object that is already loaded."""
+
+    def __init__(self, app, options: dict):
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def server_options(workers: int, bind: str) -> dict:
+    return {
+        "bind": bind,
+        "workers": workers,
+        "worker_class": ProductionWorker,
+        "preload_app": True,
+        "graceful_timeout": settings.web_graceful_timeout_seconds + SHUTDOWN_GRACE_SECONDS,
+    }
+
+
+async def prepare_database():
+    from database import engine, prepare_schema
+
+    try:
+        await prepare_schema()
+    finally:
+        # Forked workers must not inherit open connections
+        await engine.dispose()
+
+
+def run(workers: int, bind: str):
+    started = time.perf_counter()
+    from main import app
+
+    # Once, instead of every worker running the migrations
+    asyncio.run(prepare_database())
+    print(
+        f"App loaded in {time.perf_counter() - started:.2f}s, "
+        f"{memory_usage().get('rss_bytes', 0) / 2**20:.0f} MiB resident; starting "
+        f"{workers} workers ({ProductionWorker.CONFIG_KWARGS['loop']}, "
+        f"{ProductionWorker.CONFIG_KWARGS['http']}) on {bind}."
+    )
+    for warning in per_worker_warnings(workers):
+        print(warning)
+    Server(app, server_options(workers, bind)).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=settings.web_workers)
+    parser.add_argument("--bind", default=f"{settings.web_host}:{settings.web_port}")
+    args = parser.parse_args()
+    run(worker_count(args.workers), args.bind)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,23 @@
 from fastapi import HTTPException, status, Depends
 from typing import Annotated
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from models.token import TokenDTO
-from utils.security import verify_password, create_access_token
+from utils.password_hasher import password_hasher
+from utils.security import create_access_token
 from database import get_session
 from models.user import User
 
 
 class AuthService:
-    def __init__(self, session: Session = Depends(get_session)):
+    def __init__(self, session: AsyncSession = Depends(get_session)):
         self.session = session
 
-    def authenticate_user(self, email: str, password: str, admin_login = False) -> TokenDTO:
+    async def authenticate_user(self, email: str, password: str, admin_login = False) -> TokenDTO:
         query = select(User).where(User.email == email)
-        user = self.session.exec(query).first()
-        if not user or not verify_password(password, user.password):
+        user = (await self.session.exec(query)).first()
+        if not user or not await password_hasher.verify(password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -35,7 +37,14 @@ class AuthService:
             )
 
 
-        access_token = create_access_token(data={"sub": user.email, "id": user.id})
+        access_token = create_access_token(
+            data={
+                "sub": user.email,
+                "id": user.id,
+                "name": user.name,
+                "is_admin": user.is_admin,
+            }
+        )
         return TokenDTO.model_validate(
             {"access_token": access_token, "token_type": "bearer"}
         )
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from fastapi import Depends
+from sqlalchemy import delete, insert, literal
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from config import settings
+from database import async_session_maker, get_session
+from models.task import Task
+from models.task_archive import ARCHIVED_COLUMNS, TaskArchive
+from service.task_change_service import next_change_seq, record_removals
+from utils.clock import utc_now
+from utils.task_cache import task_cache
+
+logger = logging.getLogger(__name__)
+
+# Completed tasks untouched for this long move to task_archive
+TASK_ARCHIVE_AFTER_DAYS = settings.task_archive_after_days
+# Tasks moved per transaction, bounds how long their rows stay locked
+TASK_ARCHIVE_BATCH_SIZE = settings.task_archive_batch_size
+# Pause between archiver runs of this process, 0 disables the background archiver
+TASK_ARCHIVE_INTERVAL_SECONDS = settings.task_archive_interval_seconds
+
+
+async def restore_archived(session: AsyncSession, task_ids: Iterable[int]) -> int:
+    """
+    Moves the archived tasks among task_ids back to the task table, in the
+    write's transaction, so that updates and deletes find them there. Call
+    before reserving the write's change sequence numbers.
+    """
+    archived = (
+        await session.exec(
+            select(TaskArchive.id)
+            .where(TaskArchive.id.in_(set(task_ids)))
+            .with_for_update()
+        )
+    ).all()
+    if not archived:
+        return 0
+    archive = TaskArchive.__table__
+    await session.exec(
+        insert(Task).from_select(
+            ARCHIVED_COLUMNS,
+            select(*(archive.c[name] for name in ARCHIVED_COLUMNS)).where(
+                archive.c.id.in_(archived)
+            ),
+        )
+    )
+    await session.exec(delete(TaskArchive).where(TaskArchive.id.in_(archived)))
+    logger.info("Restored %d archived tasks", len(archived))
+    return len(archived)
+
+
+class TaskArchiveService:
+    def __init__(self, session: AsyncSession = Depends(get_session)):
+        self.session = session
+
+    async def archive_batch(
+        self, cutoff: datetime, batch_size: int = TASK_ARCHIVE_BATCH_SIZE
+    ) -> int:
+        """
+        Moves up to batch_size tasks completed before the cutoff (by their
+        last write) to task_archive in one transaction. They leave their
+        assignee's changes feed with a tombstone; the task stats keep
+        counting them.
+        """
+        candidates = (
+            await self.session.exec(
+                select(Task.id)
+                .where(Task.is_complete, Task.updated_at < cutoff)
+                .order_by(Task.updated_at, Task.id)
+                .limit(batch_size)
+            )
+        ).all()
+        # Locked by primary key, with the condition checked again: a locking
+        # range scan would also lock gaps that task writes may insert into
+        # while they hold the change sequence row this batch takes last
+        rows = (
+            await self.session.exec(
+                select(Task.id, Task.assignee_id)
+                .where(Task.id.in_(candidates), Task.is_complete, Task.updated_at < cutoff)
+                .order_by(Task.id)
+                .with_for_update()
+            )
+        ).all() if candidates else []
+        if not rows:
+            await self.session.commit()
+            return 0
+
+        task_ids = [row.id for row in rows]
+        task = Task.__table__
+        await self.session.exec(
+            insert(TaskArchive).from_select(
+                (*ARCHIVED_COLUMNS, "archived_at"),
+                select(*(task.c[name] for name in ARCHIVED_COLUMNS), literal(utc_now())).where(
+                    task.c.id.in_(task_ids)
+                ),
+            )
+        )
+        await self.session.exec(delete(Task).where(Task.id.in_(task_ids)))
+        first_seq = await next_change_seq(self.session, len(rows))
+        await record_removals(
+            self.session,
+            [(row.id, row.assignee_id, first_seq + i) for i, row in enumerate(rows)],
+        )
+        await self.session.commit()
+
+        # Cached tasks stay valid, get_task_by_id reads the archive too
+        await task_cache.invalidate(assignee_ids=[row.assignee_id for row in rows])
+        return len(rows)
+
+    async def archive(
+        self,
+        after_days: float = TASK_ARCHIVE_AFTER_DAYS,
+        batch_size: int = TASK_ARCHIVE_BATCH_SIZE,
+    ) -> int:
+        """Archives every task completed more than after_days ago, batch by batch."""
+        cutoff = utc_now() - timedelta(days=after_days)
+        archived = 0
+        while True:
+            moved = await self.archive_batch(cutoff, batch_size)
+            archived += moved
+            if moved < batch_size:
+                break
+        if archived:
+            logger.info("Archived %d tasks completed before %s", archived, cutoff)
+        return archived
+
+
+class TaskArchiver:
+    """
+    Background task of each worker running TaskArchiveService.archive every
+    interval. Workers archiving at the same time wait for each other on the
+    tasks of the batch, the later one leaves out those already moved.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = TASK_ARCHIVE_INTERVAL_SECONDS,
+        after_days: float = TASK_ARCHIVE_AFTER_DAYS,
+        batch_size: int = TASK_ARCHIVE_BATCH_SIZE,
+        session_maker=async_session_maker,
+    ):
+        self.interval_seconds = interval_seconds
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.session_maker = session_maker
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.archived = 0
+        self.errors = 0
+
+    async def start(self):
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> int:
+        async with self.session_maker() as session:
+            archived = await TaskArchiveService(session=session).archive(
+                self.after_days, self.batch_size
+            )
+        self.runs += 1
+        self.archived += archived
+        return archived
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("Task archiver run failed")
+
+    def clear(self):
+        self.runs = self.archived = self.errors = 0
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "runs": self.runs,
+            "archived": self.archived,
+            "errors": self.errors,
+        }
+
+
+task_archiver = TaskArchiver()
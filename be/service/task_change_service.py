@@ -0,0 +1,100 @@
+import logging
+from datetime import timedelta
+from typing import Iterable, Optional, Tuple
+from fastapi import Depends
+from sqlalchemy import delete, func, insert, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_session
+from models.task_change import TaskChangeSequence, TaskTombstone
+from utils.clock import utc_now
+from utils.upsert import counter_statement
+
+logger = logging.getLogger(__name__)
+
+TOMBSTONE_RETENTION_DAYS = 30
+
+
+async def next_change_seq(session: AsyncSession, count: int = 1) -> int:
+    """
+    Reserves `count` consecutive change sequence numbers and returns the
+    first, in one statement. The sequence row stays locked until the
+    transaction ends, so writers commit in sequence order and a reader that
+    saw a number never misses a smaller one committed later.
+
+    Writes call it last, once every task, archive and stats row they change
+    is locked, and only stamp those rows and insert tombstones afterwards.
+    The row is then held for the end of the write and its commit only, and
+    taking it last for everyone keeps the lock order free of deadlocks. See
+    benchmarks/change_sequence.py for how long it is held.
+    """
+    statement = counter_statement(
+        session, TaskChangeSequence.__table__, {"id": 1}, "value", count
+    )
+    result = await session.exec(statement)
+    if session.bind.dialect.name == "mysql":
+        value = result.lastrowid
+    else:
+        value = result.scalar_one()
+    return value - count + 1
+
+
+async def record_removals(
+    session: AsyncSession, removals: Iterable[Tuple[int, Optional[int], int]]
+):
+    """Tombstones of (task_id, assignee_id, change_seq), in the write's transaction."""
+    params = [
+        {"task_id": task_id, "assignee_id": assignee_id, "change_seq": seq, "created_at": utc_now()}
+        for task_id, assignee_id, seq in removals
+    ]
+    if params:
+        await session.exec(insert(TaskTombstone), params=params)
+
+
+class TaskChangeService:
+    def __init__(self, session: AsyncSession = Depends(get_session)):
+        self.session = session
+
+    async def get_sequence(self) -> Tuple[int, int]:
+        """(last sequence number handed out, sequence pruned up to)"""
+        query = select(TaskChangeSequence.value, TaskChangeSequence.pruned_seq).where(
+            TaskChangeSequence.id == 1
+        )
+        row = (await self.session.exec(query)).first()
+        return tuple(row) if row else (0, 0)
+
+    async def prune_tombstones(self, retention_days: float = TOMBSTONE_RETENTION_DAYS) -> int:
+        """
+        Deletes tombstones older than the retention period. Change cursors
+        from before them are answered with 410 Gone afterwards, those
+        clients start over with a full sync.
+        """
+        cutoff = utc_now() - timedelta(days=retention_days)
+        pruned_seq = (
+            await self.session.exec(
+                select(func.max(TaskTombstone.change_seq)).where(
+                    TaskTombstone.created_at < cutoff
+                )
+            )
+        ).one()
+        if pruned_seq is None:
+            return 0
+
+        # Committed on its own first: writes lock the sequence row last, so
+        # it must not wait for it while holding tombstone locks they need
+        await self.session.exec(
+            update(TaskChangeSequence)
+            .where(TaskChangeSequence.id == 1, TaskChangeSequence.pruned_seq < pruned_seq)
+            .values(pruned_seq=pruned_seq)
+        )
+        await self.session.commit()
+        result = await self.session.exec(
+            delete(TaskTombstone).where(TaskTombstone.change_seq <= pruned_seq)
+        )
+        await self.session.commit()
+
+        logger.info(
+            "Pruned %d task tombstones up to sequence %d", result.rowcount, pruned_seq
+        )
+        return result.rowcount
+
@@ -1,93 +1,842 @@
 import logging
-from typing import Annotated
+from typing import Annotated, AsyncIterator, Iterable, List, Optional, Set, Tuple
 from fastapi import Depends, HTTPException, status
+from sqlalchemy import and_, column, delete, func, literal_column, or_, table, update
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
-from sqlmodel import Session, select
-from database import get_session
-from models.task import TaskCreateDTO, Task, TaskUpdateDTO
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_read_session, get_write_session
+from logger import SAMPLED
+from models.task import (
+    BulkItemStatus,
+    TaskBulkResultDTO,
+    TaskBulkUpdateItemDTO,
+    TaskCreateDTO,
+    Task,
+    TaskFilterDTO,
+    TaskUpdateDTO,
+)
+from models.task_archive import TaskArchive
+from models.task_change import TaskTombstone
 from models.user import User
-from utils.exception import UserNotFoundException
+from service.task_archive_service import restore_archived
+from service.task_change_service import TaskChangeService, next_change_seq, record_removals
+from service.task_stats_service import STATS_COLUMNS, TaskStatsDelta, TaskStatsState
+from utils.clock import utc_now
+from utils.etag import make_etag
+from utils.exception import ChangeCursorExpiredException, UserNotFoundException
+from utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    decode_ranked_cursor,
+    decode_sequence_cursor,
+    encode_ranked_cursor,
+    encode_sequence_cursor,
+    keyset_paginate,
+    split_page,
+)
+from utils.search import boolean_mode_query, fts5_query, search_terms
+from utils.task_cache import task_cache
+from utils.task_events import TaskEventType, task_events
 
 logger = logging.getLogger(__name__)
 
+EXPORT_BATCH_SIZE = 1000
+
+LIST_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.assignee_id,
+    Task.is_complete,
+    User.name,
+    User.email,
+)
+
+ARCHIVE_LIST_COLUMNS = (
+    TaskArchive.id,
+    TaskArchive.title,
+    TaskArchive.description,
+    TaskArchive.assignee_id,
+    TaskArchive.is_complete,
+    User.name,
+    User.email,
+)
+
+# Task fields carried by change events
+EVENT_FIELDS = ("id", "title", "description", "assignee_id", "is_complete")
+
+# bm25 column weights of the SQLite index, a title match outranks the same
+# match in the description
+SEARCH_TITLE_WEIGHT = 2.0
+SEARCH_DESCRIPTION_WEIGHT = 1.0
+
+task_fts = table("task_fts", column("rowid"))
+
 class TaskService:
-    def __init__(self, session: Session = Depends(get_session)):
+    def __init__(
+        self,
+        session: AsyncSession = Depends(get_write_session),
+        read_session: Annotated[Optional[AsyncSession], Depends(get_read_session)] = None,
+    ):
         self.session = session
+        # Replica session, or the primary one when there is no replica
+        self.read_session = read_session
+        # Cache lookups of this request, routes ask for the ETag before the body
+        self._cached_tasks: dict = {}
+        self._page_lookups: dict = {}
+
+    async def get_task_by_id(self, task_id: int):
+        cached = await self._cached_task(task_id)
+        if cached is not None:
+            return cached[1]
 
-    def get_task_by_id(self, task_id: int):
         statement = (
             select(Task)
             .where(Task.id == task_id)
             .options(joinedload(Task.assignee))
         )
-        task = self.session.exec(statement).one_or_none()
+        session = self._cached_read_session()
+        task = (await session.exec(statement)).one_or_none()
+        if task is None:
+            # Archived tasks keep their id and are served the same way
+            statement = (
+                select(TaskArchive)
+                .where(TaskArchive.id == task_id)
+                .options(joinedload(TaskArchive.assignee))
+            )
+            task = (await session.exec(statement)).one_or_none()
+        if task is not None:
+            await task_cache.set_task(self._cached_tasks[task_id]["key"], task)
         return task
 
-    def find_all(self):
-        query = select(Task).options(joinedload(Task.assignee))
-        return self.session.exec(query).all()
+    async def find_all(
+        self,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        filters: Optional[TaskFilterDTO] = None,
+        include_archived: bool = False,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Page of plain dicts shaped like TaskWithAssigneeDTO. Only the listed
+        columns are read, no ORM objects or pydantic models are built per task.
+        Archived tasks are left out unless include_archived.
+        """
+        if include_archived:
+            return await self._find_all_with_archived(
+                self._read_session(), limit, cursor, filters
+            )
+        return await self._find_all(self._read_session(), limit, cursor, filters)
+
+    async def find_archived(
+        self,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        filters: Optional[TaskFilterDTO] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Page of archived tasks only, shaped like find_all's."""
+        rows = await self._archived_rows(self._read_session(), limit, cursor, filters)
+        rows, next_cursor = split_page(rows, limit)
+        return [_list_item(row) for row in rows], next_cursor
 
-    def find_all_for_user(self, user_id: int):
-        query = select(Task).where(Task.assignee_id == user_id)
-        return self.session.exec(query).all()
+    async def _find_all(
+        self,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str],
+        filters: Optional[TaskFilterDTO],
+    ) -> Tuple[List[dict], Optional[str]]:
+        query = select(*LIST_COLUMNS).outerjoin(User, Task.assignee_id == User.id)
+        if filters is not None:
+            query = self._apply_filters(query, filters)
+        query = keyset_paginate(query, Task.id, limit, cursor)
+        rows, next_cursor = split_page((await session.exec(query)).all(), limit)
+        return [_list_item(row) for row in rows], next_cursor
 
-    def create_task(self, task: TaskCreateDTO, creator_id: int):
-        db_task = Task.model_validate(task)
+    async def _find_all_with_archived(
+        self,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str],
+        filters: Optional[TaskFilterDTO],
+    ) -> Tuple[List[dict], Optional[str]]:
+        # Both tables are read with the same keyset and merged by id, each
+        # id lives in only one of them
+        query = select(*LIST_COLUMNS).outerjoin(User, Task.assignee_id == User.id)
+        if filters is not None:
+            query = self._apply_filters(query, filters)
+        query = keyset_paginate(query, Task.id, limit, cursor)
+        rows = (await session.exec(query)).all()
+        rows += await self._archived_rows(session, limit, cursor, filters)
+        rows, next_cursor = split_page(sorted(rows, key=lambda row: row.id)[: limit + 1], limit)
+        return [_list_item(row) for row in rows], next_cursor
+
+    async def _archived_rows(
+        self,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str],
+        filters: Optional[TaskFilterDTO],
+    ) -> list:
+        query = select(*ARCHIVE_LIST_COLUMNS).outerjoin(
+            User, TaskArchive.assignee_id == User.id
+        )
+        if filters is not None:
+            query = self._apply_filters(query, filters, TaskArchive)
+        query = keyset_paginate(query, TaskArchive.id, limit, cursor)
+        return list((await session.exec(query)).all())
+
+    async def search(
+        self,
+        q: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        filters: Optional[TaskFilterDTO] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Page of tasks whose title or description contain every word of q
+        (as a prefix), most relevant first. Matching goes through the FULLTEXT
+        index on MySQL and the task_fts table on SQLite, only the matching
+        rows are scored and sorted.
+        """
+        terms = search_terms(q)
+        if not terms:
+            return [], None
+
+        session = self._read_session()
+        if session.bind.dialect.name == "sqlite":
+            # bm25 is lower for better matches, negated to rank like MySQL
+            score = -func.bm25(
+                literal_column("task_fts"), SEARCH_TITLE_WEIGHT, SEARCH_DESCRIPTION_WEIGHT
+            )
+            query = (
+                select(*LIST_COLUMNS, score.label("score"))
+                .select_from(Task)
+                .join(task_fts, task_fts.c.rowid == Task.id)
+                .where(literal_column("task_fts").op("MATCH")(fts5_query(terms)))
+            )
+        else:
+            score = match(
+                Task.title, Task.description, against=boolean_mode_query(terms)
+            ).in_boolean_mode()
+            query = select(*LIST_COLUMNS, score.label("score")).where(score > 0)
+        query = query.outerjoin(User, Task.assignee_id == User.id)
+        if filters is not None:
+            query = self._apply_filters(query, filters)
+
+        after = decode_ranked_cursor(cursor)
+        if after is not None:
+            last_score, last_id = after
+            query = query.where(
+                or_(score < last_score, and_(score == last_score, Task.id > last_id))
+            )
+        query = query.order_by(score.desc(), Task.id).limit(limit + 1)
+
+        rows = (await session.exec(query)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_ranked_cursor(rows[-1].score, rows[-1].id)
+        return [{**_list_item(row[:-1]), "score": row.score} for row in rows], next_cursor
+
+    async def find_all_for_user(
+        self,
+        user_id: int,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        filters: Optional[TaskFilterDTO] = None,
+        include_archived: bool = False,
+    ):
+        filters = self._filters_for_user(user_id, filters)
+        if include_archived:
+            # Not cached, archived pages are rare and would need their own keys
+            return await self._find_all_with_archived(
+                self._read_session(), limit, cursor, filters
+            )
+        lookup = await self._page_lookup(user_id, limit, cursor, filters)
+        if lookup["cached"] is not None:
+            _, tasks, next_cursor = lookup["cached"]
+            return tasks, next_cursor
+
+        session = self._cached_read_session()
+        tasks, next_cursor = await self._find_all(session, limit, cursor, filters)
+        if task_cache.enabled:
+            if lookup["etag"] is None:
+                lookup["etag"] = await self._list_etag(session, limit, cursor, filters)
+            await task_cache.set_page(lookup["key"], lookup["etag"], tasks, next_cursor)
+        return tasks, next_cursor
+
+    async def get_changes(
+        self, user_id: int, since: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> dict:
+        """
+        Changes of the user's tasks (assigned to them, as in /tasks/my) after
+        the `since` cursor, in change sequence order: tasks written since,
+        and the ids of tasks deleted or reassigned away. Without a cursor
+        every assigned task is returned, a full sync. Clients apply
+        `removed` before `items`.
+        """
+        after = decode_sequence_cursor(since)
+        session = self._read_session()
+        # Read first, a snapshot of the sequence bounds the rest of the reads
+        # to writes that had committed
+        head, pruned_seq = await TaskChangeService(session).get_sequence()
+        if since and after < pruned_seq:
+            raise ChangeCursorExpiredException
+
+        tasks_query = (
+            select(*LIST_COLUMNS, Task.change_seq)
+            .outerjoin(User, Task.assignee_id == User.id)
+            .where(
+                Task.assignee_id == user_id,
+                Task.change_seq > after,
+                Task.change_seq <= head,
+            )
+            .order_by(Task.change_seq)
+            .limit(limit + 1)
+        )
+        removed_query = (
+            select(TaskTombstone.task_id, TaskTombstone.change_seq)
+            .where(
+                TaskTombstone.assignee_id == user_id,
+                TaskTombstone.change_seq > after,
+                TaskTombstone.change_seq <= head,
+            )
+            .order_by(TaskTombstone.change_seq)
+            .limit(limit + 1)
+        )
+        tasks = (await session.exec(tasks_query)).all()
+        removed = (await session.exec(removed_query)).all()
+        changes = sorted(
+            [(row.change_seq, _list_item(row[:-1])) for row in tasks]
+            + [(row.change_seq, row.task_id) for row in removed],
+            key=lambda change: change[0],
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        return {
+            "items": [change for _, change in changes if isinstance(change, dict)],
+            "removed": [change for _, change in changes if isinstance(change, int)],
+            "next_cursor": encode_sequence_cursor(changes[-1][0] if has_more else head),
+            "has_more": has_more,
+        }
+
+    async def get_task_etag(self, task_id: int) -> Optional[str]:
+        """
+        ETag of a single task response, which embeds the assignee.
+        Returns None when the task does not exist.
+        """
+        cached = await self._cached_task(task_id)
+        if cached is not None:
+            return cached[0]
+
+        query = (
+            select(Task.updated_at, User.updated_at)
+            .outerjoin(User, Task.assignee_id == User.id)
+            .where(Task.id == task_id)
+        )
+        session = self._cached_read_session()
+        row = (await session.exec(query)).first()
+        if row is None:
+            query = (
+                select(TaskArchive.updated_at, User.updated_at)
+                .outerjoin(User, TaskArchive.assignee_id == User.id)
+                .where(TaskArchive.id == task_id)
+            )
+            row = (await session.exec(query)).first()
+        if row is None:
+            return None
+        return make_etag("task", task_id, *row)
+
+    async def get_list_etag(
+        self,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        filters: Optional[TaskFilterDTO] = None,
+    ) -> str:
+        """
+        ETag of a find_all page from the ids and last writes of the page rows
+        and their assignees, without loading the rows themselves.
+        """
+        return await self._list_etag(self._read_session(), limit, cursor, filters)
+
+    async def _list_etag(
+        self,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str],
+        filters: Optional[TaskFilterDTO],
+    ) -> str:
+        page = select(Task.id, Task.updated_at, Task.assignee_id)
+        if filters is not None:
+            page = self._apply_filters(page, filters)
+        page = keyset_paginate(page, Task.id, limit, cursor).subquery()
+        # The ids, not a count and max: a deleted row lets an older one
+        # slide into a full page without changing either
+        query = (
+            select(page.c.id, page.c.updated_at, User.updated_at)
+            .select_from(page.outerjoin(User, page.c.assignee_id == User.id))
+            .order_by(page.c.id)
+        )
+        rows = (await session.exec(query)).all()
+        return make_etag(
+            "tasks", limit, cursor, filters.model_dump() if filters else None, *map(tuple, rows)
+        )
+
+    async def get_list_etag_for_user(
+        self,
+        user_id: int,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        filters: Optional[TaskFilterDTO] = None,
+    ) -> str:
+        filters = self._filters_for_user(user_id, filters)
+        lookup = await self._page_lookup(user_id, limit, cursor, filters)
+        if lookup["cached"] is not None:
+            return lookup["cached"][0]
+
+        lookup["etag"] = await self._list_etag(
+            self._cached_read_session(), limit, cursor, filters
+        )
+        return lookup["etag"]
+
+    def _read_session(self) -> AsyncSession:
+        # Once this request has written, its reads go to the primary that has the write
+        if self.read_session is None or self.session.info.get("wrote"):
+            return self.session
+        return self.read_session
+
+    def _cached_read_session(self) -> AsyncSession:
+        # Cache entries are filled from the primary, a lagging replica could
+        # put back rows that a write has just invalidated
+        return self.session if task_cache.enabled else self._read_session()
+
+    async def _cached_task(self, task_id: int):
+        # The key is read before the task is loaded, see TaskCache.task_key
+        if task_id not in self._cached_tasks:
+            key = await task_cache.task_key(task_id)
+            self._cached_tasks[task_id] = {"key": key, "cached": await task_cache.get_task(key)}
+        return self._cached_tasks[task_id]["cached"]
+
+    async def _page_lookup(
+        self, user_id: int, limit: int, cursor: Optional[str], filters: TaskFilterDTO
+    ) -> dict:
+        params = (user_id, limit, cursor, filters.model_dump_json())
+        if params not in self._page_lookups:
+            key = await task_cache.page_key(user_id, limit, cursor, filters)
+            self._page_lookups[params] = {
+                "key": key,
+                "cached": await task_cache.get_page(key),
+                "etag": None,
+            }
+        return self._page_lookups[params]
+
+    async def _invalidate_cache(
+        self, task_ids: Iterable[int] = (), assignee_ids: Iterable[int | None] = ()
+    ):
+        self._cached_tasks.clear()
+        self._page_lookups.clear()
+        await task_cache.invalidate(task_ids=task_ids, assignee_ids=assignee_ids)
+
+    @staticmethod
+    def _filters_for_user(user_id: int, filters: Optional[TaskFilterDTO]) -> TaskFilterDTO:
+        return (filters or TaskFilterDTO()).model_copy(update={"assignee_id": user_id})
 
-        if db_task.assignee_id is not None:
-            user = self.session.get(User, db_task.assignee_id)
-            if not user:
-                raise UserNotFoundException
+    async def stream_export_rows(
+        self,
+        filters: Optional[TaskFilterDTO] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Yields batches of plain task rows read through a server-side cursor,
+        so memory stays bounded by batch_size whatever the table size.
+        """
+        query = select(
+            Task.id,
+            Task.title,
+            Task.description,
+            Task.is_complete,
+            Task.assignee_id,
+            Task.creator_id,
+            User.name.label("assignee_name"),
+            User.email.label("assignee_email"),
+        ).outerjoin(User, Task.assignee_id == User.id)
+        if filters is not None:
+            query = self._apply_filters(query, filters)
+        query = query.order_by(Task.id).execution_options(yield_per=batch_size)
 
+        result = await self.session.stream(query)
+        async for partition in result.partitions():
+            yield [row._asdict() for row in partition]
+
+    @staticmethod
+    def _apply_filters(query, filters: TaskFilterDTO, model=Task):
+        if filters.is_complete is not None:
+            query = query.where(model.is_complete == filters.is_complete)
+        if filters.assignee_id is not None:
+            query = query.where(model.assignee_id == filters.assignee_id)
+        if filters.creator_id is not None:
+            query = query.where(model.creator_id == filters.creator_id)
+        return query
+
+    async def create_task(self, task: TaskCreateDTO, creator_id: int):
+        db_task = Task.model_validate(task)
         db_task.creator_id = creator_id
 
+        stats = TaskStatsDelta()
+        stats.add(db_task.assignee_id, db_task.is_complete, creator_id)
+
+        # The assignee is validated by the foreign key, not by a pre-read
         self.session.add(db_task)
-        self.session.commit()
-        self.session.refresh(db_task)
+        try:
+            await self.session.flush()
+            await stats.apply(self.session)
+            # Reserved last, the commit stamps it on the inserted row
+            db_task.change_seq = await next_change_seq(self.session)
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise UserNotFoundException
 
-        logger.info(f"Task with id: {db_task.id} created")
+        await self._invalidate_cache(assignee_ids=[db_task.assignee_id])
+        await task_events.publish(
+            TaskEventType.created, [_event_task(db_task)], [[db_task.assignee_id]]
+        )
+        logger.info("Task with id: %s created", db_task.id, extra=SAMPLED)
         return db_task
 
-    def update_task(self, task_id: int, task_update: TaskUpdateDTO):
-        task_for_update = self.get_task_by_id(task_id)
+    async def update_task(self, task_id: int, task_update: TaskUpdateDTO):
+        values = task_update.model_dump(exclude_defaults=True)
+        # Unassign task for assignee_id value of -1
+        if values.get("assignee_id") == -1:
+            values["assignee_id"] = None
+
+        if not values:
+            task = await self.session.get(Task, task_id) or await self.session.get(
+                TaskArchive, task_id
+            )
+            if task is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Task not found"
+                )
+            return task
 
-        if not task_for_update:
+        # Locks the row before the change sequence is reserved, RETURNING
+        # would only give the new values. Reassignment and completion move
+        # counts in the task stats, and a reassignment also changes the
+        # cached pages of the previous assignee
+        old = (await self._current_states([task_id])).get(task_id)
+        if old is None:
+            # Nothing was written, unlike a rollback this keeps loaded objects
+            await self.session.commit()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Task not found"
             )
 
-        update_fields = task_update.model_dump(exclude_defaults=True)
-        for key, value in update_fields.items():
-            if key == "assignee_id" and value is not None:
-                # Unassign task for assignee_id value of -1
-                if value == -1:
-                    value = None
-                else:
-                    user = self.session.get(User, value)
-                    if not user:
-                        raise UserNotFoundException
-            setattr(task_for_update, key, value)
+        values["updated_at"] = utc_now()
+        assignee_id = values.get("assignee_id", old.assignee_id)
+        stats = TaskStatsDelta()
+        stats.remove(*old)
+        stats.add(assignee_id, values.get("is_complete", old.is_complete), old.creator_id)
+        statement = update(Task).where(Task.id == task_id)
+        use_returning = self.session.bind.dialect.update_returning
+        if use_returning:
+            statement = statement.returning(Task)
+
+        try:
+            await stats.apply(self.session)
+            values["change_seq"] = await next_change_seq(self.session)
+            result = await self.session.exec(statement.values(**values))
+            if use_returning:
+                updated_task = result.scalars().one()
+            if assignee_id != old.assignee_id:
+                # Left the previous assignee's changes feed
+                await record_removals(
+                    self.session, [(task_id, old.assignee_id, values["change_seq"])]
+                )
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise UserNotFoundException
 
-        self.session.add(task_for_update)
-        self.session.commit()
-        self.session.refresh(task_for_update)
+        if not use_returning:
+            # No RETURNING on MySQL, read back just the updated row
+            updated_task = await self.session.get(
+                Task, task_id, populate_existing=True
+            )
 
-        logger.info(f"Task with id: {task_id} updated")
+        await self._invalidate_cache(
+            task_ids=[task_id], assignee_ids=[old.assignee_id, updated_task.assignee_id]
+        )
+        await task_events.publish(
+            TaskEventType.updated,
+            [_event_task(updated_task)],
+            [[old.assignee_id, updated_task.assignee_id]],
+        )
+        logger.info("Task with id: %s updated", task_id, extra=SAMPLED)
 
-        return task_for_update
+        return updated_task
 
-    def delete_task(self, task_id: int):
-        task_for_deletion = self.get_task_by_id(task_id)
+    async def delete_task(self, task_id: int):
+        deleted = await self._delete_returning_states(task_id)
+        # Archived tasks are deleted from the task table, only looked for
+        # when the task is missing
+        if not deleted and await restore_archived(self.session, [task_id]):
+            deleted = await self._delete_returning_states(task_id)
 
-        if not task_for_deletion:
+        if not deleted:
+            await self.session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Task not found"
             )
-        
-        self.session.delete(task_for_deletion)
-        self.session.commit()
-        logger.info(f"Task with id: {task_id} updated")
+        stats = TaskStatsDelta()
+        for row in deleted:
+            stats.remove(*row)
+        await stats.apply(self.session)
+        seq = await next_change_seq(self.session)
+        await record_removals(self.session, [(task_id, row.assignee_id, seq) for row in deleted])
+        await self.session.commit()
+
+        assignee_ids = [row.assignee_id for row in deleted]
+        await self._invalidate_cache(task_ids=[task_id], assignee_ids=assignee_ids)
+        await task_events.publish(
+            TaskEventType.deleted,
+            [{"id": task_id, "assignee_id": row.assignee_id} for row in deleted],
+            [[row.assignee_id] for row in deleted],
+        )
+        logger.info("Task with id: %s deleted", task_id, extra=SAMPLED)
+
+    async def bulk_create_tasks(
+        self, tasks: List[TaskCreateDTO], creator_id: int
+    ) -> List[TaskBulkResultDTO]:
+        known_assignees = await self._existing_user_ids(
+            task.assignee_id for task in tasks
+        )
+
+        results: List[TaskBulkResultDTO | Task] = []
+        for task in tasks:
+            if task.assignee_id is not None and task.assignee_id not in known_assignees:
+                results.append(
+                    TaskBulkResultDTO(status=BulkItemStatus.assignee_not_found)
+                )
+                continue
+            db_task = Task.model_validate(task)
+            db_task.creator_id = creator_id
+            results.append(db_task)
+
+        stats = TaskStatsDelta()
+        created = [r for r in results if isinstance(r, Task)]
+        for task in created:
+            stats.add(task.assignee_id, task.is_complete, creator_id)
+
+        # Flushed in a single unit of work, batched into multi-row INSERTs
+        # where the driver supports RETURNING
+        self.session.add_all(created)
+        await self.session.flush()
+        await stats.apply(self.session)
+        if created:
+            # Reserved last, the commit stamps them in one executemany UPDATE
+            first_seq = await next_change_seq(self.session, len(created))
+            for i, task in enumerate(created):
+                task.change_seq = first_seq + i
+        await self.session.commit()
+        await self._invalidate_cache(assignee_ids=[task.assignee_id for task in created])
+        await task_events.publish(
+            TaskEventType.created,
+            [_event_task(task) for task in created],
+            [[task.assignee_id] for task in created],
+        )
+
+        logger.info("Bulk created %d tasks", len(created))
+        return [
+            TaskBulkResultDTO(id=r.id, status=BulkItemStatus.created)
+            if isinstance(r, Task)
+            else r
+            for r in results
+        ]
+
+    async def bulk_update_tasks(
+        self, tasks: List[TaskBulkUpdateItemDTO]
+    ) -> List[TaskBulkResultDTO]:
+        # Current state, the stats move from it and the current assignees'
+        # pages change along with the new assignees'
+        current = await self._current_states(task.id for task in tasks)
+        known_assignees = await self._existing_user_ids(
+            task.assignee_id for task in tasks if task.assignee_id != -1
+        )
+
+        results, params = [], []
+        now = utc_now()
+        for task in tasks:
+            if task.id not in current:
+                results.append(
+                    TaskBulkResultDTO(id=task.id, status=BulkItemStatus.not_found)
+                )
+                continue
+
+            values = task.model_dump(exclude_defaults=True)
+            assignee_id = values.get("assignee_id")
+            if assignee_id == -1:
+                # Unassign task for assignee_id value of -1
+                values["assignee_id"] = None
+            elif assignee_id is not None and assignee_id not in known_assignees:
+                results.append(
+                    TaskBulkResultDTO(
+                        id=task.id, status=BulkItemStatus.assignee_not_found
+                    )
+                )
+                continue
+
+            if len(values) > 1:
+                params.append({**values, "updated_at": now})
+            results.append(TaskBulkResultDTO(id=task.id, status=BulkItemStatus.updated))
+
+        stats = TaskStatsDelta()
+        for p in params:
+            old = current[p["id"]]
+            stats.remove(*old)
+            stats.add(
+                p.get("assignee_id", old.assignee_id),
+                p.get("is_complete", old.is_complete),
+                old.creator_id,
+            )
+
+        if params:
+            await stats.apply(self.session)
+            # A sequence number per item, reserved once the rows are locked
+            first_seq = await next_change_seq(self.session, len(params))
+            removals = []
+            for i, p in enumerate(params):
+                old = current[p["id"]]
+                p["change_seq"] = first_seq + i
+                if p.get("assignee_id", old.assignee_id) != old.assignee_id:
+                    removals.append((p["id"], old.assignee_id, p["change_seq"]))
+            # ORM bulk UPDATE by primary key, sent as executemany
+            await self.session.exec(update(Task), params=params)
+            await record_removals(self.session, removals)
+        await self.session.commit()
+        await self._invalidate_cache(
+            task_ids=[p["id"] for p in params],
+            assignee_ids=[current[p["id"]].assignee_id for p in params]
+            + [p.get("assignee_id") for p in params],
+        )
+        # Bulk updates are not read back, their events carry the changed
+        # fields and the resulting assignee only
+        changes = [
+            {
+                **{k: v for k, v in p.items() if k in EVENT_FIELDS},
+                "assignee_id": p.get("assignee_id", current[p["id"]].assignee_id),
+            }
+            for p in params
+        ]
+        await task_events.publish(
+            TaskEventType.updated,
+            changes,
+            [[current[c["id"]].assignee_id, c["assignee_id"]] for c in changes],
+        )
+
+        logger.info("Bulk updated %d tasks", len(params))
+        return results
+
+    async def bulk_delete_tasks(self, task_ids: List[int]) -> List[TaskBulkResultDTO]:
+        current = await self._current_states(task_ids)
+        existing_ids = set(current)
+        if existing_ids:
+            stats = TaskStatsDelta()
+            for old in current.values():
+                stats.remove(*old)
+            await self.session.exec(delete(Task).where(Task.id.in_(existing_ids)))
+            await stats.apply(self.session)
+            first_seq = await next_change_seq(self.session, len(existing_ids))
+            await record_removals(
+                self.session,
+                [
+                    (task_id, old.assignee_id, first_seq + i)
+                    for i, (task_id, old) in enumerate(sorted(current.items()))
+                ],
+            )
+        await self.session.commit()
+        await self._invalidate_cache(
+            task_ids=existing_ids, assignee_ids=[old.assignee_id for old in current.values()]
+        )
+        await task_events.publish(
+            TaskEventType.deleted,
+            [{"id": task_id, "assignee_id": old.assignee_id} for task_id, old in current.items()],
+            [[old.assignee_id] for old in current.values()],
+        )
+
+        logger.info("Bulk deleted %d tasks", len(existing_ids))
+        return [
+            TaskBulkResultDTO(
+                id=task_id,
+                status=BulkItemStatus.deleted
+                if task_id in existing_ids
+                else BulkItemStatus.not_found,
+            )
+            for task_id in task_ids
+        ]
+
+    async def _current_states(self, task_ids: Iterable[int]) -> dict:
+        """
+        Stats columns of the given tasks by id, locked until the commit.
+        Archived tasks are written in the task table again, they are only
+        looked for among the ids the task table does not have.
+        """
+        task_ids = set(task_ids)
+        current = await self._locked_states(task_ids)
+        missing = task_ids - current.keys()
+        if missing and await restore_archived(self.session, missing):
+            current.update(await self._locked_states(missing))
+        return current
+
+    async def _locked_states(self, task_ids: Set[int]) -> dict:
+        query = select(Task.id, *STATS_COLUMNS).where(Task.id.in_(task_ids)).with_for_update()
+        rows = (await self.session.exec(query)).all()
+        return {row.id: TaskStatsState(*row[1:]) for row in rows}
+
+    async def _delete_returning_states(self, task_id: int) -> list:
+        """
+        Deletes the task and returns the stats columns it had, read back with
+        the DELETE where the dialect supports RETURNING: its counts leave
+        the stats and its assignee's pages are invalidated.
+        """
+        statement = delete(Task).where(Task.id == task_id)
+        if self.session.bind.dialect.delete_returning:
+            return (await self.session.exec(statement.returning(*STATS_COLUMNS))).all()
+        deleted = (
+            await self.session.exec(
+                select(*STATS_COLUMNS).where(Task.id == task_id).with_for_update()
+            )
+        ).all()
+        if deleted:
+            await self.session.exec(statement)
+        return deleted
+
+    async def _existing_user_ids(self, user_ids: Iterable[int | None]) -> Set[int]:
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return set()
+        query = select(User.id).where(User.id.in_(user_ids))
+        return set((await self.session.exec(query)).all())
+
+
+def _event_task(task: Task) -> dict:
+    return {field: getattr(task, field) for field in EVENT_FIELDS}
+
 
+def _list_item(row) -> dict:
+    task_id, title, description, assignee_id, is_complete, name, email = row
+    return {
+        "id": task_id,
+        "title": title,
+        "description": description,
+        "assignee_id": assignee_id,
+        "is_complete": is_complete,
+        "assignee": None
+        if assignee_id is None
+        else {"id": assignee_id, "name": name, "email": email},
+    }
 
 
 TaskServiceDep = Annotated[TaskService, Depends()]
@@ -0,0 +1,209 @@
+import logging
+from collections import Counter, defaultdict
+from typing import Annotated, NamedTuple, Optional
+from fastapi import Depends
+from sqlalchemy import delete, func, insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_session
+from models.task import Task
+from models.task_archive import TaskArchive
+from models.task_stats import TaskStatsDTO, TaskTotals, TaskUserStats
+from utils.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from utils.upsert import increment_statement
+
+logger = logging.getLogger(__name__)
+
+USER_COUNTS = ("assigned_open", "assigned_completed", "created")
+TOTAL_COUNTS = ("open", "completed")
+
+USER_COLUMNS = (
+    TaskUserStats.user_id,
+    TaskUserStats.assigned_open,
+    TaskUserStats.assigned_completed,
+    TaskUserStats.created,
+)
+
+# What a task contributes to the counts, read before it changes
+STATS_COLUMNS = (Task.assignee_id, Task.is_complete, Task.creator_id)
+
+
+class TaskStatsState(NamedTuple):
+    assignee_id: Optional[int]
+    is_complete: bool
+    creator_id: Optional[int]
+
+
+class TaskStatsDelta:
+    """
+    Count changes of the tasks written in one transaction. A write removes
+    the old state of a task and adds the new one; apply() then issues one
+    upsert per table, before the transaction commits.
+    """
+
+    def __init__(self):
+        self.users: dict[int, Counter] = defaultdict(Counter)
+        self.totals: Counter = Counter()
+
+    def add(
+        self,
+        assignee_id: Optional[int],
+        is_complete: bool,
+        creator_id: Optional[int],
+        sign: int = 1,
+    ):
+        state = "completed" if is_complete else "open"
+        self.totals[state] += sign
+        if assignee_id is not None:
+            self.users[assignee_id][f"assigned_{state}"] += sign
+        if creator_id is not None:
+            self.users[creator_id]["created"] += sign
+
+    def remove(self, assignee_id: Optional[int], is_complete: bool, creator_id: Optional[int]):
+        self.add(assignee_id, is_complete, creator_id, sign=-1)
+
+    async def apply(self, session: AsyncSession):
+        # Sorted by key so that concurrent transactions lock rows in one order
+        user_rows = [
+            {"user_id": user_id, **{name: counts[name] for name in USER_COUNTS}}
+            for user_id, counts in sorted(self.users.items())
+            if any(counts.values())
+        ]
+        if user_rows:
+            await session.exec(
+                increment_statement(session, TaskUserStats.__table__, USER_COUNTS),
+                params=user_rows,
+            )
+        if any(self.totals.values()):
+            await session.exec(
+                increment_statement(session, TaskTotals.__table__, TOTAL_COUNTS),
+                params=[{"id": 1, **{name: self.totals[name] for name in TOTAL_COUNTS}}],
+            )
+        self.users.clear()
+        self.totals.clear()
+
+
+class TaskStatsService:
+    def __init__(self, session: AsyncSession = Depends(get_session)):
+        self.session = session
+
+    async def get_stats(
+        self,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+    ) -> TaskStatsDTO:
+        """
+        Totals and a page of per-user counts ordered by user id, read from the
+        summary tables: the cost depends on the page size, not on the tasks.
+        """
+        open_count, completed_count = await self._totals()
+
+        # Columns rather than entities, the session's identity map would
+        # hand back rows as this session last saw them
+        query = select(*USER_COLUMNS)
+        if user_id is not None:
+            query = query.where(TaskUserStats.user_id == user_id)
+        last_id = decode_cursor(cursor)
+        if last_id is not None:
+            query = query.where(TaskUserStats.user_id > last_id)
+        query = query.order_by(TaskUserStats.user_id).limit(limit + 1)
+        users = (await self.session.exec(query)).all()
+
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = encode_cursor(users[-1].user_id)
+        return TaskStatsDTO(
+            totals={
+                "open": open_count,
+                "completed": completed_count,
+                "total": open_count + completed_count,
+            },
+            users=[user._asdict() for user in users],
+            next_cursor=next_cursor,
+        )
+
+    async def _totals(self) -> tuple[int, int]:
+        query = select(TaskTotals.open, TaskTotals.completed).where(TaskTotals.id == 1)
+        row = (await self.session.exec(query)).first()
+        return tuple(row) if row else (0, 0)
+
+    async def compute(self, lock: bool = False) -> tuple[dict, dict]:
+        """
+        Counts recomputed from the task and task_archive tables, (per user,
+        totals). This scans every task, it backs the rebuild command and
+        drift checks only.
+        """
+        users: dict[int, dict] = defaultdict(lambda: dict.fromkeys(USER_COUNTS, 0))
+        totals = dict.fromkeys(TOTAL_COUNTS, 0)
+
+        # Archived tasks still count, archiving moves rows without a delta
+        for model in (Task, TaskArchive):
+            queries = (
+                select(model.assignee_id, model.is_complete, func.count())
+                .where(model.assignee_id.is_not(None))
+                .group_by(model.assignee_id, model.is_complete),
+                select(model.creator_id, func.count())
+                .where(model.creator_id.is_not(None))
+                .group_by(model.creator_id),
+                select(model.is_complete, func.count()).group_by(model.is_complete),
+            )
+            if lock:
+                # Shared locks make task writers wait for the rebuild to commit,
+                # their deltas then apply on top of the rebuilt counts (MySQL)
+                queries = tuple(query.with_for_update(read=True) for query in queries)
+            assigned, created, by_state = [
+                (await self.session.exec(query)).all() for query in queries
+            ]
+
+            for assignee_id, is_complete, count in assigned:
+                state = "assigned_completed" if is_complete else "assigned_open"
+                users[assignee_id][state] += count
+            for creator_id, count in created:
+                users[creator_id]["created"] += count
+            for is_complete, count in by_state:
+                totals["completed" if is_complete else "open"] += count
+        return dict(users), totals
+
+    async def stored(self) -> tuple[dict, dict]:
+        """Counts as maintained in the summary tables, shaped like compute()."""
+        rows = (await self.session.exec(select(*USER_COLUMNS))).all()
+        users = {
+            user_id: dict(zip(USER_COUNTS, counts))
+            for user_id, *counts in rows
+            # Users whose tasks all went away keep a row of zeros
+            if any(counts)
+        }
+        return users, dict(zip(TOTAL_COUNTS, await self._totals()))
+
+    async def check(self) -> list[str]:
+        """Descriptions of the counts that drifted from the task table."""
+        (users, totals), (stored_users, stored_totals) = await self.compute(), await self.stored()
+        drift = [
+            f"user {user_id}: stored {stored_users.get(user_id)}, actual {users.get(user_id)}"
+            for user_id in sorted(users.keys() | stored_users.keys())
+            if users.get(user_id) != stored_users.get(user_id)
+        ]
+        if totals != stored_totals:
+            drift.append(f"totals: stored {stored_totals}, actual {totals}")
+        return drift
+
+    async def rebuild(self) -> dict:
+        """Replaces the summary tables with counts recomputed from the tasks."""
+        users, totals = await self.compute(lock=True)
+        await self.session.exec(delete(TaskUserStats))
+        await self.session.exec(delete(TaskTotals))
+        if users:
+            await self.session.exec(
+                insert(TaskUserStats),
+                params=[{"user_id": user_id, **counts} for user_id, counts in users.items()],
+            )
+        await self.session.exec(insert(TaskTotals), params=[{"id": 1, **totals}])
+        await self.session.commit()
+
+        logger.info("Task stats rebuilt for %d users", len(users))
+        return totals
+
+
+TaskStatsServiceDep = Annotated[TaskStatsService, Depends()]
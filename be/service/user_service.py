@@ -1,29 +1,69 @@
 import logging
-from sqlmodel import Session, select
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import Depends, HTTPException, status
-from typing import Annotated, List
-from database import get_session
+from typing import Annotated, List, Optional, Tuple
+from database import get_read_session, get_write_session
 from models.user import User, UserCreateDTO
-from utils.security import get_password_hash
+from utils.clock import utc_now
+from utils.etag import make_etag
 from utils.exception import UserNotFoundException
+from utils.password_hasher import password_hasher
+from utils.pagination import DEFAULT_PAGE_SIZE, keyset_paginate, split_page
+from utils.principal_cache import principal_cache
+from utils.task_cache import task_cache
+from utils.task_events import task_events
 
 logger = logging.getLogger(__name__)
 
 
 class UserService:
-    def __init__(self, session: Session = Depends(get_session)):
+    def __init__(
+        self,
+        session: AsyncSession = Depends(get_write_session),
+        read_session: Annotated[Optional[AsyncSession], Depends(get_read_session)] = None,
+    ):
         self.session = session
+        # Replica session, or the primary one when there is no replica
+        self.read_session = read_session
 
-    def get_all_users(self, only_active: bool = True) -> List[User]:
+    async def get_all_users(
+        self,
+        only_active: bool = True,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[User], Optional[str]]:
         query = select(User)
         if only_active:
             query = query.where(User.is_active == True)
-        users = self.session.exec(query).all()
-        return users
+        query = keyset_paginate(query, User.id, limit, cursor)
+        users = (await self._read_session().exec(query)).all()
+        return split_page(users, limit)
 
-    def register_user(self, user_data: UserCreateDTO, is_admin: bool = False) -> User:
+    async def get_list_etag(
+        self,
+        only_active: bool = True,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> str:
+        page = select(User.id, User.updated_at)
+        if only_active:
+            page = page.where(User.is_active == True)
+        page = keyset_paginate(page, User.id, limit, cursor)
+        # The ids too, a deactivated user lets an older one slide into a full page
+        rows = (await self._read_session().exec(page)).all()
+        return make_etag("users", only_active, limit, cursor, *map(tuple, rows))
+
+    def _read_session(self) -> AsyncSession:
+        # Once this request has written, its reads go to the primary that has the write
+        if self.read_session is None or self.session.info.get("wrote"):
+            return self.session
+        return self.read_session
+
+    async def register_user(self, user_data: UserCreateDTO, is_admin: bool = False) -> User:
         try:
-            self.get_user_by_email(user_data.email)
+            await self.get_user_by_email(user_data.email)
             # Exception will be raised only if there is a user with the same email
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT, detail="Email already registered"
@@ -31,7 +71,7 @@ class UserService:
         except UserNotFoundException:
             pass
 
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await password_hasher.hash(user_data.password)
         new_user = User(
             email=user_data.email,
             password=hashed_password,
@@ -40,50 +80,50 @@ class UserService:
         )
 
         self.session.add(new_user)
-        self.session.commit()
-        self.session.refresh(new_user)
-        logger.info(f"User created with email: {user_data.email}")
+        await self.session.commit()
+        await self.session.refresh(new_user)
+        logger.info("User created with email: %s", user_data.email)
         return new_user
 
-    def get_user_by_email(self, email: str) -> User:
+    async def get_user_by_email(self, email: str) -> User:
         statement = select(User).where(User.email == email)
-        user = self.session.exec(statement).first()
+        user = (await self.session.exec(statement)).first()
         if user is None:
             raise UserNotFoundException
         return user
 
-    def get_user_by_id(self, id: int) -> User:
+    async def get_user_by_id(self, id: int) -> User:
         statement = select(User).where(User.id == id)
-        user = self.session.exec(statement).first()
+        user = (await self.session.exec(statement)).first()
         if user is None:
             raise UserNotFoundException
         return user
 
-    def deactivate_user(self, user_id):
-        try:
-            user = self.get_user_by_id(user_id)
-            if user.is_active:
-                user.is_active = False
-                self.session.add(user)
-                self.session.commit()
-                logger.info(f"User with email: {user.email} deactivated")
-        except UserNotFoundException:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-            )
+    async def deactivate_user(self, user_id):
+        await self._set_active(user_id, is_active=False)
+        await principal_cache.mark_deactivated(user_id)
+        await task_events.close_user(user_id)
+        logger.info("User with id: %s deactivated", user_id)
 
-    def activate_user(self, user_id):
-        try:
-            user = self.get_user_by_id(user_id)
-            if not user.is_active:
-                user.is_active = True
-                self.session.add(user)
-                self.session.commit()
-                logger.info(f"User with email: {user.email} activated")
-        except UserNotFoundException:
+    async def activate_user(self, user_id):
+        await self._set_active(user_id, is_active=True)
+        await principal_cache.mark_activated(user_id)
+        logger.info("User with id: %s activated", user_id)
+
+    async def _set_active(self, user_id: int, is_active: bool):
+        statement = (
+            update(User)
+            .where(User.id == user_id)
+            .values(is_active=is_active, updated_at=utc_now())
+        )
+        result = await self.session.exec(statement)
+        await self.session.commit()
+        if result.rowcount == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
+        # Cached pages of the user's tasks embed the user
+        await task_cache.invalidate(assignee_ids=[user_id])
 
 
 UserServiceDep = Annotated[UserService, Depends()]
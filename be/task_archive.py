@@ -0,0 +1,44 @@
+"""
+Task archiving
+
+Moves tasks completed more than --days ago (by their last write) from the
+task table to task_archive, in batches. The API workers do the same every
+TASK_ARCHIVE_INTERVAL_SECONDS; run from the `be` directory to archive on
+demand, e.g. after lowering the threshold:
+
+    python -m task_archive run --days 30
+"""
+
+import argparse
+import asyncio
+import sys
+
+from database import async_session_maker, engine
+from service.task_archive_service import (
+    TASK_ARCHIVE_AFTER_DAYS,
+    TASK_ARCHIVE_BATCH_SIZE,
+    TaskArchiveService,
+)
+
+
+async def run(days: float, batch_size: int) -> int:
+    try:
+        async with async_session_maker() as session:
+            archived = await TaskArchiveService(session=session).archive(days, batch_size)
+            print(f"Archived {archived} tasks completed more than {days:g} days ago.")
+            return 0
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("--days", type=float, default=TASK_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=TASK_ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.days, args.batch_size)))
+
+
+if __name__ == "__main__":
+    main()
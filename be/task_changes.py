@@ -0,0 +1,39 @@
+"""
+Task change tombstone pruning
+
+GET /tasks/changes keeps a tombstone for every task that was deleted or
+reassigned away. Run from the `be` directory, e.g. daily, to delete the old
+ones; clients whose cursor predates the pruned tombstones get 410 Gone and
+sync again from scratch:
+
+    python -m task_changes prune --days 30
+"""
+
+import argparse
+import asyncio
+import sys
+
+from database import async_session_maker, engine
+from service.task_change_service import TOMBSTONE_RETENTION_DAYS, TaskChangeService
+
+
+async def run(days: float) -> int:
+    try:
+        async with async_session_maker() as session:
+            pruned = await TaskChangeService(session=session).prune_tombstones(days)
+            print(f"Pruned {pruned} task tombstones older than {days:g} days.")
+            return 0
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["prune"])
+    parser.add_argument("--days", type=float, default=TOMBSTONE_RETENTION_DAYS)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.days)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Task statistics maintenance
+
+The counts behind GET /tasks/stats are maintained by every task write. Run
+from the `be` directory to verify or repair them:
+
+    python -m task_stats check      # exits 1 when the counts drifted
+    python -m task_stats rebuild    # recompute them from the task table
+"""
+
+import argparse
+import asyncio
+import sys
+
+from database import async_session_maker, engine
+from service.task_stats_service import TaskStatsService
+
+
+async def run(command: str) -> int:
+    try:
+        async with async_session_maker() as session:
+            service = TaskStatsService(session=session)
+            if command == "rebuild":
+                totals = await service.rebuild()
+                print(f"Task stats rebuilt: {totals}")
+                return 0
+
+            drift = await service.check()
+            for line in drift:
+                print(line, file=sys.stderr)
+            if drift:
+                print("Task stats drifted, run `python -m task_stats rebuild`.", file=sys.stderr)
+                return 1
+            print("Task stats are up to date.")
+            return 0
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.command)))
+
+
+if __name__ == "__main__":
+    main()
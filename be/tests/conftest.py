@@ -1,36 +1,236 @@
+import asyncio
+from contextlib import contextmanager
+
+import httpx
 import pytest
-from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_session, get_session_maker
+from main import app
 from models.task import Task
 from models.user import User
 from service.task_service import TaskService
 from service.user_service import UserService
+from utils.metrics import request_metrics
+from utils.principal_cache import principal_cache
+from utils.rate_limit import RateLimit, rate_limiter, take_token
+from utils.read_routing import read_routing
+from utils.security import create_access_token
+from utils.shared_state import DatabaseStateBackend, LocalStateBackend, shared_state
+from utils.single_flight import single_flight
+from utils.task_cache import task_cache
+from utils.task_events import task_events
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    # The cache is process wide, ids are reused by every fresh test DB
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def local_shared_state(monkeypatch):
+    # Revocations of a test must not outlive it; the client fixture keeps
+    # them in the test database as the default backend does
+    monkeypatch.setattr(shared_state, "backend", LocalStateBackend())
+
+
+@pytest.fixture(autouse=True)
+def clear_task_cache():
+    # Same for tasks, every test starts from an empty DB
+    task_cache.clear()
+    yield
+    task_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_read_routing():
+    read_routing.clear()
+    yield
+    read_routing.clear()
+
 
-# In-memory SQLite engine
-test_engine = create_engine("sqlite://", echo=False)
+@pytest.fixture(autouse=True)
+def clear_rate_limiter():
+    rate_limiter.clear()
+    yield
+    rate_limiter.clear()
 
 
-# Set up test DB schema
-@pytest.fixture(scope="session", autouse=True)
-def create_test_db():
-    SQLModel.metadata.create_all(test_engine)
+@pytest.fixture(autouse=True)
+def clear_task_events():
+    task_events.clear()
+    yield
+    task_events.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_single_flight():
+    single_flight.clear()
+    yield
+    single_flight.clear()
+
+
+@pytest.fixture(autouse=True)
+def strict_query_budgets(monkeypatch):
+    # A request over its route's query budget fails the test
+    monkeypatch.setattr(request_metrics, "strict_budgets", True)
+
+
+def enable_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
 
 
 @pytest.fixture
-def session():
-    # New in-memory DB per test
-    engine = create_engine(
-        "sqlite:///:memory:", connect_args={"check_same_thread": False}
+async def session():
+    # New in-memory DB per test, StaticPool keeps the single connection alive
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
     )
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
+    # Writes rely on foreign keys for assignee validation, as MySQL enforces them
+    event.listen(engine.sync_engine, "connect", enable_foreign_keys)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
+    await engine.dispose()
 
 
 @pytest.fixture
-def task_service(session: Session):
+def task_service(session: AsyncSession):
     return TaskService(session=session)
 
 
 @pytest.fixture
-def user_service(session: Session):
+def user_service(session: AsyncSession):
     return UserService(session=session)
+
+
+@pytest.fixture
+async def client(session: AsyncSession, monkeypatch):
+    # The app over HTTP, each request on a session of its own over the test database
+    maker = async_sessionmaker(session.bind, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(shared_state, "backend", DatabaseStateBackend(maker))
+
+    async def test_session():
+        async with maker() as request_session:
+            yield request_session
+
+    app.dependency_overrides[get_session] = test_session
+    app.dependency_overrides[get_session_maker] = lambda: maker
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+async def add_users(session: AsyncSession, user_ids, admin_ids=()):
+    # Creators and assignees must exist, the foreign keys are enforced
+    session.add_all(
+        User(
+            id=i,
+            email=f"user{i}@example.com",
+            password="hashed_password",
+            name=f"user{i}",
+            is_admin=i in admin_ids,
+        )
+        for i in user_ids
+    )
+    await session.commit()
+
+
+@pytest.fixture
+async def users(session: AsyncSession):
+    await add_users(session, (1, 2, 3))
+
+
+@contextmanager
+def recorded_statements(session: AsyncSession):
+    """SQL of the statements the session's engine runs inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(session.bind.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(session.bind.sync_engine, "before_cursor_execute", record)
+
+
+def auth(user_id: int) -> dict:
+    token = create_access_token({"sub": f"user{user_id}@example.com", "id": user_id})
+    return {"Authorization": f"Bearer {token}"}
+
+
+class FakePubSub:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.redis.subscribers.append(self.queue)
+        self.queue.put_nowait({"type": "subscribe", "data": 1})
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def unsubscribe(self, channel):
+        self.redis.subscribers.remove(self.queue)
+
+    async def aclose(self):
+        pass
+
+
+class FakeRedis:
+    """
+    The subset of redis.asyncio.Redis the shared backends use: the task
+    cache's get/set/delete, the events' pub/sub and the rate limit script,
+    whose logic runs on a dict as Redis would run it atomically.
+    """
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.ttls: dict[str, int] = {}
+        self.subscribers: list[asyncio.Queue] = []
+        self.buckets: dict[str, tuple[float, float]] = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value.encode()
+        self.ttls[key] = ex
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def publish(self, channel, message):
+        for queue in self.subscribers:
+            queue.put_nowait({"type": "message", "data": message.encode()})
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def eval(self, script, numkeys, key, capacity, rate, now):
+        limit = RateLimit(capacity=capacity, period_seconds=capacity / rate)
+        allowed, self.buckets[key], retry_after = take_token(self.buckets.get(key), limit, now)
+        return [int(allowed), str(retry_after).encode()]
@@ -0,0 +1,73 @@
+import pytest
+
+from config import Settings
+
+REQUIRED = {"SECRET_KEY": "secret", "ALGORITHM": "HS256", "TOKEN_EXPIRE_MINUTES": "60"}
+
+
+def test_values_are_parsed_by_field_type():
+    settings = Settings.from_env(
+        {
+            **REQUIRED,
+            "MYSQL_PORT": "3307",
+            "MYSQL_POOL_TIMEOUT": "2.5",
+            "MYSQL_POOL_PRE_PING": "False",
+            "QUERY_BUDGET_STRICT": "true",
+            "WEB_WORKERS": " 8 ",
+        }
+    )
+
+    assert settings.token_expire_minutes == 60
+    assert settings.mysql_port == 3307
+    assert settings.mysql_pool_timeout == 2.5
+    assert settings.mysql_pool_pre_ping is False
+    assert settings.query_budget_strict is True
+    assert settings.web_workers == 8
+
+
+def test_unset_and_empty_values_take_the_defaults():
+    settings = Settings.from_env({**REQUIRED, "MYSQL_REPLICA_HOST": "", "LOG_LEVEL": " "})
+
+    assert settings.mysql_replica_host is None
+    assert settings.replica_database_url is None
+    assert settings.log_level == "ERROR"
+    assert settings.password_hash_workers is None
+    assert settings.web_workers == 0
+    assert settings.mysql_pool_size == 10
+
+
+def test_replica_url_falls_back_to_the_primary_port():
+    env = {
+        **REQUIRED,
+        "MYSQL_USER": "tm_user",
+        "MYSQL_PASSWORD": "pw",
+        "MYSQL_HOST": "primary",
+        "MYSQL_PORT": "3306",
+        "MYSQL_DB": "tasks",
+        "MYSQL_REPLICA_HOST": "replica",
+    }
+
+    settings = Settings.from_env(env)
+
+    assert settings.database_url == "mysql+aiomysql://tm_user:pw@primary:3306/tasks"
+    assert settings.replica_database_url == "mysql+aiomysql://tm_user:pw@replica:3306/tasks"
+    assert Settings.from_env({**env, "MYSQL_REPLICA_PORT": "3307"}).replica_database_url.endswith(
+        "@replica:3307/tasks"
+    )
+
+
+def test_missing_required_value_is_named():
+    with pytest.raises(ValueError, match="SECRET_KEY is not set"):
+        Settings.from_env({"ALGORITHM": "HS256", "TOKEN_EXPIRE_MINUTES": "60"})
+
+
+def test_invalid_value_is_named():
+    with pytest.raises(ValueError, match="MYSQL_POOL_SIZE is not a valid int: 'ten'"):
+        Settings.from_env({**REQUIRED, "MYSQL_POOL_SIZE": "ten"})
+
+
+def test_settings_are_frozen():
+    settings = Settings.from_env(REQUIRED)
+
+    with pytest.raises(AttributeError):
+        settings.debug = True
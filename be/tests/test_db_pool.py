@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from utils.db_pool import InstrumentedAsyncQueuePool, pool_metrics
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    pool_metrics.reset()
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.db",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    pool_metrics.attach(engine.sync_engine)
+    yield engine
+    await engine.dispose()
+    pool_metrics.reset()
+
+
+async def test_snapshot_tracks_checked_out_and_overflow(engine):
+    async with engine.connect() as first:
+        await first.execute(text("SELECT 1"))
+        async with engine.connect() as second:
+            await second.execute(text("SELECT 1"))
+            stats = pool_metrics.snapshot(engine.sync_engine.pool)
+            assert stats["checked_out"] == 2
+            assert stats["overflow"] == 1
+
+    stats = pool_metrics.snapshot(engine.sync_engine.pool)
+    assert stats["checked_out"] == 0
+    assert stats["idle"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["connects"] == 2
+    assert stats["wait_count"] == 2
+
+
+async def test_pool_timeout_is_counted(engine):
+    async with engine.connect() as first, engine.connect() as second:
+        await first.execute(text("SELECT 1"))
+        await second.execute(text("SELECT 1"))
+        with pytest.raises(exc.TimeoutError):
+            async with engine.connect() as third:
+                await third.execute(text("SELECT 1"))
+
+    assert pool_metrics.timeouts == 1
@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+
+import httpx
+import pytest
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.task import Task
+from models.user import User
+from tests.conftest import auth
+from utils.export import EXPORT_COLUMNS
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+async def tasks(session: AsyncSession):
+    session.add(User(id=1, email="user1@example.com", password="hashed_password", name="@admin"))
+    await session.commit()
+    session.add_all(
+        [
+            Task(id=1, title="Plain", description="D", assignee_id=1, creator_id=1),
+            Task(id=2, title="=HYPERLINK(\"http://evil\")", description="-2+3", creator_id=1),
+        ]
+    )
+    await session.commit()
+
+
+async def test_ndjson_export(client: httpx.AsyncClient):
+    response = await client.get("/tasks/export", headers=auth(1))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="tasks.ndjson"'
+    assert response.text.endswith("\n")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [1, 2]
+    # JSON consumers get the values as they are
+    assert rows[1]["title"] == '=HYPERLINK("http://evil")'
+    assert rows[0]["assignee_name"] == "@admin"
+
+
+async def test_csv_export_quotes_formulas(client: httpx.AsyncClient):
+    response = await client.get("/tasks/export?format=csv", headers=auth(1))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="tasks.csv"'
+    reader = csv.DictReader(io.StringIO(response.text))
+    assert reader.fieldnames == EXPORT_COLUMNS
+    plain, formula = list(reader)
+    assert (plain["title"], plain["assignee_name"]) == ("Plain", "'@admin")
+    assert formula["title"] == "'=HYPERLINK(\"http://evil\")"
+    assert formula["description"] == "'-2+3"
+    assert formula["assignee_id"] == ""
+
+
+async def test_export_accepts_the_listing_filters(client: httpx.AsyncClient):
+    response = await client.get("/tasks/export?assignee_id=1", headers=auth(1))
+
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [1]
+
+
+async def test_export_requires_authentication(client: httpx.AsyncClient):
+    assert (await client.get("/tasks/export")).status_code == 401
@@ -0,0 +1,152 @@
+import io
+import json
+import logging
+import queue
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from logger import SAMPLED, BoundedQueueHandler, LogPipeline, configure_logging, log_pipeline
+from utils.correlation import CorrelationIdMiddleware, correlation_id
+
+pytestmark = pytest.mark.anyio
+
+logger = logging.getLogger("tests.logging")
+
+
+@pytest.fixture
+def pipeline():
+    root = logging.getLogger()
+    level = root.level
+    pipeline = LogPipeline()
+    yield pipeline
+    pipeline.stop()
+    root.setLevel(level)
+
+
+def records(stream: io.StringIO) -> list[dict]:
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_records_are_written_as_json_by_the_listener(pipeline):
+    stream = io.StringIO()
+    pipeline.start("INFO", stream=stream)
+
+    token = correlation_id.set("req-1")
+    try:
+        logger.info("Task with id: %s created", 7)
+    finally:
+        correlation_id.reset(token)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed")
+    pipeline.stop()
+
+    created, failed = records(stream)
+    assert created["message"] == "Task with id: 7 created"
+    assert (created["level"], created["logger"]) == ("INFO", "tests.logging")
+    assert created["correlation_id"] == "req-1"
+    assert failed["correlation_id"] is None
+    assert "ValueError: boom" in failed["exc_info"]
+
+
+def test_disabled_levels_do_not_format(pipeline):
+    class Expensive:
+        formatted = 0
+
+        def __str__(self):
+            Expensive.formatted += 1
+            return "expensive"
+
+    stream = io.StringIO()
+    pipeline.start("ERROR", stream=stream)
+
+    logger.info("Value: %s", Expensive())
+    assert Expensive.formatted == 0
+    logger.error("Value: %s", Expensive())
+    pipeline.stop()
+
+    assert [r["message"] for r in records(stream)] == ["Value: expensive"]
+
+
+def test_sampled_info_records_are_thinned(pipeline):
+    stream = io.StringIO()
+    pipeline.start("INFO", stream=stream, sample_rate=0)
+
+    for i in range(10):
+        logger.info("Task with id: %s updated", i, extra=SAMPLED)
+    logger.info("Bulk updated %d tasks", 10)
+    logger.warning("Sampled warnings are kept", extra=SAMPLED)
+    pipeline.stop()
+
+    assert [r["message"] for r in records(stream)] == [
+        "Bulk updated 10 tasks",
+        "Sampled warnings are kept",
+    ]
+    assert pipeline.stats()["sampled_out"] == 10
+
+
+def test_sampled_records_carry_the_rate(pipeline):
+    stream = io.StringIO()
+    pipeline.start("INFO", stream=stream, sample_rate=1)
+
+    logger.info("Task with id: %s deleted", 1, extra=SAMPLED)
+    pipeline.stop()
+
+    assert records(stream)[0]["sample_rate"] == 1
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = BoundedQueueHandler(queue.Queue(1))
+    record = logging.LogRecord("tests", logging.INFO, __file__, 1, "Task %s", (1,), None)
+
+    handler.handle(record)
+    handler.handle(record)
+
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().msg == "Task 1"
+
+
+def test_stop_drains_a_full_queue(pipeline):
+    stream = io.StringIO()
+    pipeline.start("INFO", stream=stream, queue_size=1)
+
+    for i in range(100):
+        logger.info("Task with id: %s created", i)
+    pipeline.stop()
+
+    assert len(records(stream)) + pipeline.stats()["dropped"] == 100
+
+
+def test_unknown_level_falls_back_to_error(pipeline, monkeypatch):
+    monkeypatch.setattr("logger.log_pipeline", pipeline)
+
+    configure_logging("verbose", stream=io.StringIO())
+
+    assert logging.getLogger().level == logging.ERROR
+    assert log_pipeline is not pipeline
+
+
+async def test_middleware_sets_and_echoes_request_ids():
+    app = FastAPI()
+    app.add_middleware(CorrelationIdMiddleware)
+    seen = []
+
+    @app.get("/")
+    def index():
+        seen.append(correlation_id.get())
+        return {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        given = await client.get("/", headers={"X-Request-ID": "abc-123"})
+        generated = await client.get("/")
+        replaced = await client.get("/", headers={"X-Request-ID": "bad id\n"})
+
+    assert given.headers["x-request-id"] == "abc-123"
+    assert len(generated.headers["x-request-id"]) == 32
+    assert replaced.headers["x-request-id"] != "bad id\n"
+    assert seen == [r.headers["x-request-id"] for r in (given, generated, replaced)]
+    assert correlation_id.get() is None
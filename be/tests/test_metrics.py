@@ -0,0 +1,132 @@
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from utils.metrics import Histogram, MetricsMiddleware, RequestMetrics
+
+pytestmark = pytest.mark.anyio
+
+
+async def call(app, path: str) -> dict:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    return {"status": start["status"], "headers": dict(start["headers"])}
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def metrics(engine):
+    metrics = RequestMetrics()
+    metrics.attach(engine.sync_engine)
+    return metrics
+
+
+def build_app(engine, metrics: RequestMetrics, server_timing: bool = False) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics, server_timing=server_timing)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        async with AsyncSession(engine) as session:
+            for _ in range(item_id):
+                await session.exec(text("SELECT 1"))
+        return {"id": item_id}
+
+    return app
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(("GET",), value)
+
+    lines = histogram.render("latency", "help", ("method",))
+
+    assert 'latency_bucket{method="GET",le="0.1"} 2' in lines
+    assert 'latency_bucket{method="GET",le="1.0"} 3' in lines
+    assert 'latency_bucket{method="GET",le="+Inf"} 4' in lines
+    assert 'latency_count{method="GET"} 4' in lines
+
+
+async def test_queries_are_attributed_to_the_route(engine, metrics):
+    app = build_app(engine, metrics)
+
+    await call(app, "/items/3")
+    await call(app, "/items/1")
+
+    labels = ("GET", "/items/{item_id}")
+    assert metrics.latency.count(labels) == 2
+    assert metrics.db_queries.sum(labels) == 4
+    assert metrics.responses[("GET", "/items/{item_id}", "200")] == 2
+    assert metrics.in_flight == 0
+
+
+async def test_queries_outside_requests_only_count_towards_totals(engine, metrics):
+    async with AsyncSession(engine) as session:
+        await session.exec(text("SELECT 1"))
+
+    assert metrics.queries_total == 1
+    assert metrics.db_queries.count(("GET", "/items/{item_id}")) == 0
+
+
+async def test_unmatched_routes_share_one_label(engine, metrics):
+    app = build_app(engine, metrics)
+
+    await call(app, "/missing/1")
+    await call(app, "/missing/2")
+
+    assert metrics.responses[("GET", "unmatched", "404")] == 2
+
+
+async def test_server_timing_header_only_in_debug(engine, metrics):
+    response = await call(build_app(engine, metrics), "/items/1")
+    assert b"server-timing" not in response["headers"]
+
+    response = await call(build_app(engine, metrics, server_timing=True), "/items/2")
+    assert b'desc="2 queries"' in response["headers"][b"server-timing"]
+
+
+async def test_render_exposes_routes_and_gauges(engine, metrics):
+    await call(build_app(engine, metrics), "/items/1")
+
+    body = metrics.render({"db_pool": {"checked_out": 2, "label": "ignored"}})
+
+    assert 'taskmanager_http_responses_total{method="GET",route="/items/{item_id}",status="200"} 1' in body
+    assert "taskmanager_http_requests_in_flight 0" in body
+    assert "taskmanager_db_pool_checked_out 2" in body
+    assert "label" not in body
@@ -0,0 +1,168 @@
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, MetaData, String, Table, inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from migrate import (
+    check_schema_version,
+    current_revisions,
+    head_revisions,
+    include_object_for,
+    upgrade,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    # A file rather than :memory:, migrations and checks use separate connections
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    await engine.dispose()
+
+
+async def test_upgrade_matches_models(engine):
+    await upgrade(engine)
+
+    async with engine.connect() as conn:
+        diff = await conn.run_sync(
+            lambda sync_conn: compare_metadata(
+                MigrationContext.configure(
+                    sync_conn, opts={"include_object": include_object_for("sqlite")}
+                ),
+                SQLModel.metadata,
+            )
+        )
+    assert diff == []
+    assert await current_revisions(engine) == head_revisions()
+
+
+async def test_upgrade_adopts_tables_created_before_migrations(engine):
+    # Schema as SQLModel.metadata.create_all produced it before updated_at
+    legacy = MetaData()
+    Table(
+        "user", legacy,
+        Column("id", Integer, primary_key=True),
+        Column("email", String, nullable=False, unique=True),
+        Column("password", String, nullable=False),
+        Column("name", String, nullable=False),
+        Column("is_admin", Boolean, nullable=False),
+        Column("is_active", Boolean, nullable=False),
+    )
+    Table(
+        "task", legacy,
+        Column("id", Integer, primary_key=True),
+        Column("title", String, nullable=False),
+        Column("description", String, nullable=False),
+        Column("is_complete", Boolean, nullable=False),
+        Column("assignee_id", Integer, ForeignKey("user.id")),
+        Column("creator_id", Integer, ForeignKey("user.id")),
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(legacy.create_all)
+        await conn.execute(
+            legacy.tables["user"].insert().values(
+                id=1, email="a@a.com", password="x", name="A", is_admin=False, is_active=True
+            )
+        )
+
+    await upgrade(engine)
+
+    async with engine.connect() as conn:
+        columns = await conn.run_sync(
+            lambda sync_conn: {c["name"]: c for c in inspect(sync_conn).get_columns("user")}
+        )
+        indexes = await conn.run_sync(
+            lambda sync_conn: {i["name"] for i in inspect(sync_conn).get_indexes("task")}
+        )
+        updated_at = (await conn.exec_driver_sql("SELECT updated_at FROM user")).scalar()
+    assert columns["updated_at"]["nullable"] is False
+    assert updated_at is not None
+    assert {"ix_task_assignee_id_is_complete_id", "ix_task_creator_id_id"} <= indexes
+
+
+async def test_upgrade_indexes_existing_tasks_for_search(engine):
+    await upgrade(engine, "0003")
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(
+            "INSERT INTO task (id, title, description, is_complete, updated_at) "
+            "VALUES (1, 'Deploy backend', 'Roll out', 0, '2026-01-01 00:00:00')"
+        )
+
+    await upgrade(engine)
+
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(
+            "INSERT INTO task (id, title, description, is_complete, updated_at) "
+            "VALUES (2, 'Write docs', 'Deploy notes', 0, '2026-01-01 00:00:00')"
+        )
+        matches = (
+            await conn.exec_driver_sql(
+                "SELECT rowid FROM task_fts WHERE task_fts MATCH 'deploy' ORDER BY rowid"
+            )
+        ).scalars().all()
+    assert matches == [1, 2]
+
+
+async def test_check_schema_version(engine):
+    with pytest.raises(RuntimeError, match="no revision"):
+        await check_schema_version(engine)
+
+    await upgrade(engine, "0002")
+    with pytest.raises(RuntimeError, match="0002"):
+        await check_schema_version(engine)
+
+    await upgrade(engine)
+    await check_schema_version(engine)
+
+
+async def test_upgrade_fills_task_stats(engine):
+    await upgrade(engine, "0004")
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(
+            "INSERT INTO user (id, email, password, name, is_admin, is_active, updated_at) "
+            "VALUES (1, 'a@a.com', 'x', 'A', 0, 1, '2026-01-01 00:00:00'), "
+            "(2, 'b@b.com', 'x', 'B', 0, 1, '2026-01-01 00:00:00'), "
+            "(3, 'c@c.com', 'x', 'C', 0, 1, '2026-01-01 00:00:00')"
+        )
+        await conn.exec_driver_sql(
+            "INSERT INTO task (title, description, is_complete, assignee_id, creator_id, updated_at) "
+            "VALUES ('A', 'D', 0, 2, 1, '2026-01-01 00:00:00'), "
+            "('B', 'D', 1, 2, 1, '2026-01-01 00:00:00'), "
+            "('C', 'D', 0, NULL, 2, '2026-01-01 00:00:00')"
+        )
+
+    await upgrade(engine)
+
+    async with engine.connect() as conn:
+        users = (
+            await conn.exec_driver_sql(
+                "SELECT user_id, assigned_open, assigned_completed, created "
+                "FROM task_user_stats ORDER BY user_id"
+            )
+        ).all()
+        totals = (await conn.exec_driver_sql("SELECT open, completed FROM task_totals")).all()
+    assert [tuple(row) for row in users] == [(1, 0, 0, 2), (2, 1, 1, 1)]
+    assert [tuple(row) for row in totals] == [(2, 1)]
+
+
+async def test_upgrade_sequences_existing_tasks(engine):
+    await upgrade(engine, "0005")
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(
+            "INSERT INTO task (title, description, is_complete, updated_at) "
+            "VALUES ('A', 'D', 0, '2026-01-01 00:00:00'), ('B', 'D', 0, '2026-01-01 00:00:00')"
+        )
+
+    await upgrade(engine)
+
+    async with engine.connect() as conn:
+        tasks = (await conn.exec_driver_sql("SELECT id, change_seq FROM task ORDER BY id")).all()
+        sequence = (
+            await conn.exec_driver_sql("SELECT value, pruned_seq FROM task_change_sequence")
+        ).all()
+    assert [tuple(row) for row in tasks] == [(1, 1), (2, 2)]
+    assert [tuple(row) for row in sequence] == [(2, 0)]
@@ -0,0 +1,73 @@
+import asyncio
+import httpx
+import pytest
+from sqlmodel.ext.asyncio.session import AsyncSession
+from tests.conftest import add_users
+from utils.exception import PasswordHasherOverloadedException
+from utils.password_hasher import PasswordHasher, password_hasher
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_pending=1, executor="thread")
+    yield hasher
+    hasher.shutdown()
+
+
+async def test_hash_and_verify_run_in_pool(hasher: PasswordHasher):
+    hashed = await hasher.hash("password123")
+    assert await hasher.verify("password123", hashed)
+    assert not await hasher.verify("wrong", hashed)
+    assert hasher.completed == 3
+    assert hasher.failed == 0
+
+
+async def test_failures_are_not_counted_as_completed(hasher: PasswordHasher):
+    with pytest.raises(ValueError):
+        await hasher.verify("password123", "not a bcrypt hash")
+
+    assert (hasher.completed, hasher.failed, hasher.pending) == (0, 1, 0)
+
+
+async def test_rejects_when_queue_is_full(hasher: PasswordHasher):
+    results = await asyncio.gather(
+        hasher.hash("first"), hasher.hash("second"), return_exceptions=True
+    )
+
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], PasswordHasherOverloadedException)
+    assert hasher.rejected == 1
+    assert hasher.pending == 0
+
+
+def test_unknown_executor_raises():
+    with pytest.raises(ValueError):
+        PasswordHasher(executor="fiber")
+
+
+@pytest.mark.parametrize(
+    "path, request_kwargs",
+    [
+        (
+            "/users/register",
+            {"json": {"email": "new@example.com", "password": "password123", "name": "New"}},
+        ),
+        ("/users/login", {"data": {"username": "user1@example.com", "password": "password123"}}),
+    ],
+)
+async def test_overloaded_hasher_sheds_with_503(
+    client: httpx.AsyncClient, session: AsyncSession, monkeypatch, path, request_kwargs
+):
+    await add_users(session, (1,))
+    # Every slot is taken by other logins
+    monkeypatch.setattr(password_hasher, "pending", password_hasher.max_pending)
+    monkeypatch.setattr(password_hasher, "rejected", 0)
+
+    response = await client.post(path, **request_kwargs)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.json() == {"detail": "Too many concurrent logins, try again shortly"}
+    assert password_hasher.rejected == 1
@@ -0,0 +1,133 @@
+import time
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.user import UserCreateDTO, UserOutDTO
+from service.user_service import UserService
+from utils import dependencies
+from utils.dependencies import get_current_user
+from utils.principal_cache import PrincipalCache, principal_cache
+from utils.security import create_access_token
+from utils.shared_state import DatabaseStateBackend, shared_state
+
+pytestmark = pytest.mark.anyio
+
+
+def make_principal(user_id: int) -> UserOutDTO:
+    return UserOutDTO(
+        id=user_id,
+        email=f"user{user_id}@example.com",
+        name=f"User {user_id}",
+        is_admin=False,
+        is_active=True,
+    )
+
+
+def token_for(user, **claims) -> str:
+    return create_access_token(data={"sub": user.email, "id": user.id, **claims})
+
+
+@pytest.fixture
+async def user(user_service: UserService):
+    return await user_service.register_user(
+        UserCreateDTO(email="user@example.com", password="password123", name="Test User")
+    )
+
+
+def test_cache_counts_hits_and_misses():
+    cache = PrincipalCache(max_size=10, ttl_seconds=60)
+    assert cache.get(1) is None
+    cache.set(make_principal(1))
+    assert cache.get(1).id == 1
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PrincipalCache(max_size=2, ttl_seconds=60)
+    cache.set(make_principal(1))
+    cache.set(make_principal(2))
+    cache.get(1)
+    cache.set(make_principal(3))
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+    assert cache.evictions == 1
+
+
+def test_cache_entries_expire():
+    cache = PrincipalCache(max_size=10, ttl_seconds=0.01)
+    cache.set(make_principal(1))
+    time.sleep(0.02)
+    assert cache.get(1) is None
+
+
+async def test_get_current_user_is_served_from_cache(
+    user_service: UserService, user
+):
+    token = token_for(user)
+    first = await get_current_user(user_service, token)
+    second = await get_current_user(user_service, token)
+
+    assert first == second
+    assert principal_cache.stats()["hits"] == 1
+
+
+async def test_deactivate_user_locks_out_cached_principal(
+    user_service: UserService, user
+):
+    token = token_for(user)
+    await get_current_user(user_service, token)
+    await user_service.deactivate_user(user.id)
+
+    with pytest.raises(HTTPException) as e:
+        await get_current_user(user_service, token)
+    assert e.value.status_code == 401
+
+    await user_service.activate_user(user.id)
+    principal = await get_current_user(user_service, token)
+    assert principal.is_active is True
+
+
+async def test_trusted_claims_skip_the_database(
+    user_service: UserService, user, monkeypatch
+):
+    monkeypatch.setattr(dependencies, "PRINCIPAL_CACHE_TRUST_TOKEN_CLAIMS", True)
+    token = token_for(user, name="From Token", is_admin=False)
+
+    principal = await get_current_user(user_service, token)
+    assert principal.name == "From Token"
+
+    await user_service.deactivate_user(user.id)
+    with pytest.raises(HTTPException):
+        await get_current_user(user_service, token)
+
+
+async def test_deactivation_reaches_other_workers(
+    session: AsyncSession, user_service: UserService, user, monkeypatch
+):
+    maker = async_sessionmaker(session.bind, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(shared_state, "backend", DatabaseStateBackend(maker))
+    # The worker serving the user caches them, another one deactivates them
+    serving = PrincipalCache()
+    monkeypatch.setattr(dependencies, "principal_cache", serving)
+    token = token_for(user)
+    await get_current_user(user_service, token)
+
+    await user_service.deactivate_user(user.id)
+
+    assert serving.get(user.id) is not None
+    with pytest.raises(HTTPException) as e:
+        await get_current_user(user_service, token)
+    assert e.value.detail == "User has been deactivated"
+
+
+async def test_revocations_outlive_cache_evictions():
+    cache = PrincipalCache(max_size=1, ttl_seconds=60)
+    for user_id in range(1, 11):
+        cache.set(make_principal(user_id))
+        await cache.mark_deactivated(user_id)
+
+    assert all([await cache.is_deactivated(user_id) for user_id in range(1, 11)])
+    await cache.mark_activated(1)
+    assert not await cache.is_deactivated(1)
@@ -0,0 +1,106 @@
+import logging
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.task import Task
+from models.task_archive import TaskArchive
+from tests.conftest import add_users, auth
+from utils.clock import utc_now
+from utils.exception import QueryBudgetExceededException
+from utils.metrics import MetricsMiddleware, RequestMetrics, query_budget, request_metrics
+from utils.principal_cache import principal_cache
+
+pytestmark = pytest.mark.anyio
+
+USERS = 30
+
+
+@pytest.fixture
+async def tasks(session: AsyncSession):
+    await add_users(session, range(1, USERS + 1))
+    # Every task has another assignee, a lazy load per task would show
+    session.add_all(
+        Task(title=f"Task {i}", description="D", assignee_id=i % USERS + 1, creator_id=1)
+        for i in range(90)
+    )
+    session.add(
+        TaskArchive(
+            id=1000, title="Old", description="D", assignee_id=1, updated_at=utc_now()
+        )
+    )
+    await session.commit()
+    request_metrics.attach(session.bind.sync_engine)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/tasks/",
+        "/tasks/?limit=80",
+        "/tasks/?include_archived=true&limit=80",
+        "/tasks/my",
+        "/tasks/archive",
+        "/tasks/search?q=task",
+        "/tasks/stats",
+        "/tasks/changes",
+        "/tasks/1",
+        "/tasks/1000",
+        "/users/all?limit=30",
+        "/users/all/active",
+        "/users/me",
+    ],
+)
+@pytest.mark.usefixtures("tasks")
+async def test_reads_stay_within_their_query_budget(client: httpx.AsyncClient, path):
+    # Worst case, the principal is looked up too
+    principal_cache.clear()
+
+    response = await client.get(path, headers=auth(1))
+
+    # Over budget, the request would have raised QueryBudgetExceededException
+    assert response.status_code == 200
+
+
+def budget_app(metrics: RequestMetrics, session_maker) -> FastAPI:
+    budget_app = FastAPI()
+    budget_app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @budget_app.get("/n-plus-one", dependencies=[Depends(query_budget(2))])
+    async def n_plus_one():
+        async with session_maker() as session:
+            for _ in range(3):
+                await session.exec(text("SELECT 1"))
+        return {}
+
+    return budget_app
+
+
+async def test_strict_mode_raises_over_budget(session: AsyncSession):
+    metrics = RequestMetrics(strict_budgets=True)
+    metrics.attach(session.bind.sync_engine)
+    transport = httpx.ASGITransport(app=budget_app(metrics, lambda: AsyncSession(session.bind)))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        with pytest.raises(QueryBudgetExceededException, match="3 DB queries, budget 2"):
+            await client.get("/n-plus-one")
+
+
+async def test_overruns_are_logged_and_counted(session: AsyncSession, caplog):
+    metrics = RequestMetrics(strict_budgets=False)
+    metrics.attach(session.bind.sync_engine)
+    transport = httpx.ASGITransport(app=budget_app(metrics, lambda: AsyncSession(session.bind)))
+
+    with caplog.at_level(logging.WARNING, logger="utils.metrics"):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/n-plus-one")
+
+    assert response.status_code == 200
+    assert "GET /n-plus-one issued 3 DB queries, over its budget of 2" in caplog.text
+    assert (
+        'taskmanager_http_requests_over_query_budget_total{method="GET",route="/n-plus-one"} 1'
+        in metrics.render()
+    )
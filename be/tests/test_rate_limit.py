@@ -0,0 +1,173 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from jose import jwt
+
+from tests.conftest import FakeRedis
+from utils.rate_limit import (
+    LocalRateLimitBackend,
+    RateLimit,
+    RateLimiter,
+    RateLimitMiddleware,
+    RedisRateLimitBackend,
+    parse_route_limits,
+    take_token,
+)
+from utils.security import create_access_token
+
+pytestmark = pytest.mark.anyio
+
+
+class FailingBackend:
+    async def take(self, key, limit, now):
+        raise ConnectionError("backend down")
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+def build_app(limiter: RateLimiter, max_in_flight: int = 0, release: asyncio.Event = None):
+    app = FastAPI()
+    app.add_middleware(
+        RateLimitMiddleware, router=app.router, limiter=limiter, max_in_flight=max_in_flight
+    )
+
+    @app.get("/tasks/")
+    async def tasks():
+        if release is not None:
+            await release.wait()
+        return []
+
+    @app.get("/tasks/events")
+    async def events():
+        if release is not None:
+            await release.wait()
+        return []
+
+    @app.post("/users/login")
+    async def login():
+        return {}
+
+    @app.get("/health")
+    async def health():
+        return True
+
+    return app
+
+
+def client_for(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def auth(email: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': email, 'id': 1})}"}
+
+
+def limiter(backend=None, default="2/minute", routes="POST /users/login=1/minute"):
+    return RateLimiter(
+        backend or LocalRateLimitBackend(),
+        default=RateLimit.parse(default),
+        routes=parse_route_limits(routes),
+    )
+
+
+def test_bucket_refills_over_the_period():
+    limit = RateLimit.parse("2/second")
+    allowed, state, _ = take_token(None, limit, 100.0)
+    allowed, state, _ = take_token(state, limit, 100.0)
+    assert allowed
+    allowed, state, retry_after = take_token(state, limit, 100.0)
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+
+    allowed, state, _ = take_token(state, limit, 100.5)
+    assert allowed
+
+
+async def test_limits_are_per_user():
+    async with client_for(build_app(limiter())) as client:
+        statuses = [
+            (await client.get("/tasks/", headers=auth("a@example.com"))).status_code
+            for _ in range(3)
+        ]
+        other = await client.get("/tasks/", headers=auth("b@example.com"))
+        limited = await client.get("/tasks/", headers=auth("a@example.com"))
+
+    assert statuses == [200, 200, 429]
+    assert other.status_code == 200
+    assert int(limited.headers["retry-after"]) >= 1
+    assert limited.json() == {"detail": "Too many requests"}
+
+
+async def test_unauthenticated_routes_are_limited_by_ip():
+    rate_limiter = limiter()
+    async with client_for(build_app(rate_limiter)) as client:
+        first = await client.post("/users/login")
+        second = await client.post("/users/login")
+        # A token that does not verify counts against the IP as well
+        forged = jwt.encode({"sub": "x@example.com"}, "not-the-secret", algorithm="HS256")
+        tasks = [
+            (await client.get("/tasks/", headers={"Authorization": f"Bearer {forged}"})).status_code
+            for _ in range(3)
+        ]
+
+    assert (first.status_code, second.status_code) == (200, 429)
+    # The login route has its own bucket, the default one was still full
+    assert tasks == [200, 200, 429]
+    assert rate_limiter.stats()["limited"] == 2
+
+
+async def test_exempt_routes_are_not_limited():
+    async with client_for(build_app(limiter(default="1/minute"))) as client:
+        statuses = {(await client.get("/health")).status_code for _ in range(5)}
+
+    assert statuses == {200}
+
+
+async def test_in_flight_cap_sheds_load():
+    release = asyncio.Event()
+    rate_limiter = limiter(default="100/minute")
+    app = build_app(rate_limiter, max_in_flight=1, release=release)
+    async with client_for(app) as client:
+        slow = asyncio.create_task(client.get("/tasks/", headers=auth("a@example.com")))
+        # An open event stream does not count against the cap
+        stream = asyncio.create_task(client.get("/tasks/events", headers=auth("b@example.com")))
+        while rate_limiter.in_flight < 1:
+            await asyncio.sleep(0.001)
+
+        shed = await client.get("/tasks/", headers=auth("b@example.com"))
+        release.set()
+        assert (await slow).status_code == 200
+        assert (await stream).status_code == 200
+
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "1"
+    assert rate_limiter.stats()["shed"] == 1
+    assert rate_limiter.in_flight == 0
+
+
+async def test_shared_backend_limits_across_workers():
+    redis = FakeRedis()
+    workers = [build_app(limiter(RedisRateLimitBackend(redis))) for _ in range(2)]
+
+    statuses = []
+    for app in workers + workers:
+        async with client_for(app) as client:
+            statuses.append((await client.get("/tasks/", headers=auth("a@example.com"))).status_code)
+
+    assert statuses == [200, 200, 429, 429]
+    assert list(redis.buckets) == ["taskmanager:ratelimit:default:user:a@example.com"]
+
+
+async def test_backend_failure_lets_requests_through():
+    rate_limiter = limiter(FailingBackend(), default="1/minute")
+    async with client_for(build_app(rate_limiter)) as client:
+        statuses = [(await client.get("/tasks/")).status_code for _ in range(3)]
+
+    assert statuses == [200, 200, 200]
+    assert rate_limiter.stats()["errors"] == 3
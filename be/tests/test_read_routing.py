@@ -0,0 +1,145 @@
+import httpx
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import service.task_service
+from database import get_replica_session_maker, get_session, get_session_maker
+from main import app
+from models.task import Task, TaskCreateDTO
+from service.task_service import TaskService
+from tests.conftest import add_users, auth, enable_foreign_keys
+from utils.read_routing import ReadOnlySessionError, ReadRouting, read_routing
+from utils.shared_state import DatabaseStateBackend, shared_state
+from utils.task_cache import LocalCacheBackend, TaskCache
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_engine(path):
+    # Two files stand in for the primary and a replica that has not caught up
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    event.listen(engine.sync_engine, "connect", enable_foreign_keys)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        await add_users(session, (1, 2))
+    return engine
+
+
+@pytest.fixture
+async def primary_maker(tmp_path):
+    engine = await create_engine(tmp_path / "primary.db")
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def replica_maker(tmp_path):
+    engine = await create_engine(tmp_path / "replica.db")
+    async with AsyncSession(engine) as session:
+        session.add(Task(id=100, title="Replicated", description="D"))
+        await session.commit()
+    yield async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False, info={"read_only": True}
+    )
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(primary_maker, replica_maker):
+    async def primary_session():
+        async with primary_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = primary_session
+    app.dependency_overrides[get_session_maker] = lambda: primary_maker
+    app.dependency_overrides[get_replica_session_maker] = lambda: replica_maker
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+async def listed_titles(client: httpx.AsyncClient, user_id: int) -> list[str]:
+    response = await client.get("/tasks/", headers=auth(user_id))
+    assert response.status_code == 200
+    return [task["title"] for task in response.json()["items"]]
+
+
+async def test_listings_read_from_replica(client: httpx.AsyncClient):
+    assert await listed_titles(client, 1) == ["Replicated"]
+    users = (await client.get("/users/all", headers=auth(1))).json()["items"]
+    assert [user["id"] for user in users] == [1, 2]
+    assert read_routing.stats()["replica_sessions"] == 2
+
+
+async def test_writer_reads_primary_within_window(client: httpx.AsyncClient, monkeypatch):
+    response = await client.post(
+        "/tasks", json={"title": "Mine", "description": "D"}, headers=auth(1)
+    )
+    assert response.status_code == 200
+
+    # The writer sees the write, other users keep reading the replica
+    assert await listed_titles(client, 1) == ["Mine"]
+    assert await listed_titles(client, 2) == ["Replicated"]
+
+    monkeypatch.setattr(read_routing, "window_seconds", 0)
+    await client.post("/tasks", json={"title": "Again", "description": "D"}, headers=auth(2))
+    assert await listed_titles(client, 2) == ["Replicated"]
+
+
+async def test_window_is_seen_by_other_workers(
+    client: httpx.AsyncClient, primary_maker, monkeypatch
+):
+    monkeypatch.setattr(shared_state, "backend", DatabaseStateBackend(primary_maker))
+    await client.post("/tasks", json={"title": "Mine", "description": "D"}, headers=auth(1))
+
+    # The routing of another worker, which has nothing in memory
+    other_worker = ReadRouting()
+    assert not await other_worker.use_replica("1")
+    assert await other_worker.use_replica("2")
+
+
+async def test_export_follows_routing(client: httpx.AsyncClient):
+    response = await client.get("/tasks/export", headers=auth(2))
+    assert [line for line in response.text.splitlines() if "Replicated" in line]
+
+    await client.post("/tasks", json={"title": "Mine", "description": "D"}, headers=auth(2))
+    response = await client.get("/tasks/export", headers=auth(2))
+    assert "Replicated" not in response.text
+    assert "Mine" in response.text
+
+
+async def test_reads_after_a_write_in_the_same_request_use_primary(
+    primary_maker, replica_maker, monkeypatch
+):
+    monkeypatch.setattr(service.task_service, "task_cache", TaskCache(None))
+    async with primary_maker() as primary, replica_maker() as replica:
+        task_service = TaskService(session=primary, read_session=replica)
+        tasks, _ = await task_service.find_all()
+        assert [task["title"] for task in tasks] == ["Replicated"]
+
+        await task_service.create_task(TaskCreateDTO(title="Mine", description="D"), creator_id=1)
+
+        tasks, _ = await task_service.find_all()
+        assert [task["title"] for task in tasks] == ["Mine"]
+
+
+async def test_cached_reads_use_primary(primary_maker, replica_maker, monkeypatch):
+    monkeypatch.setattr(service.task_service, "task_cache", TaskCache(LocalCacheBackend()))
+    async with primary_maker() as primary, replica_maker() as replica:
+        task_service = TaskService(session=primary, read_session=replica)
+
+        # Only on the replica, the cache is never filled from it
+        assert await task_service.get_task_by_id(100) is None
+
+
+async def test_replica_session_refuses_writes(replica_maker):
+    async with replica_maker() as replica:
+        replica.add(Task(title="Lost", description="D"))
+        with pytest.raises(ReadOnlySessionError):
+            await replica.flush()
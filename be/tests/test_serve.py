@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+import database
+from serve import (
+    SHUTDOWN_GRACE_SECONDS,
+    ProductionWorker,
+    default_workers,
+    per_worker_warnings,
+    server_options,
+    worker_count,
+)
+from utils.process_stats import ProcessStats, memory_usage
+
+
+def test_zero_workers_means_one_per_cpu():
+    assert worker_count(2) == 2
+    assert worker_count(0) == default_workers()
+    assert 1 <= default_workers() <= (os.cpu_count() or 1)
+
+
+def test_several_workers_warn_about_local_shared_state():
+    assert per_worker_warnings(4, "database") == []
+    assert per_worker_warnings(4, "redis") == []
+    assert per_worker_warnings(1, "local") == []
+    warnings = per_worker_warnings(4, "local")
+    assert len(warnings) == 2
+    assert "deactivated user" in warnings[0]
+    assert "replica" in warnings[1]
+
+
+def test_server_preloads_and_outlasts_the_drain():
+    options = server_options(workers=3, bind="127.0.0.1:8000")
+
+    assert options["workers"] == 3
+    assert options["preload_app"] is True
+    assert options["worker_class"] is ProductionWorker
+    assert options["graceful_timeout"] == (
+        ProductionWorker.CONFIG_KWARGS["timeout_graceful_shutdown"] + SHUTDOWN_GRACE_SECONDS
+    )
+
+
+def test_worker_uses_uvloop_and_httptools_when_installed():
+    pytest.importorskip("uvloop")
+    pytest.importorskip("httptools")
+
+    assert ProductionWorker.CONFIG_KWARGS["loop"] == "uvloop"
+    assert ProductionWorker.CONFIG_KWARGS["http"] == "httptools"
+    assert ProductionWorker.CONFIG_KWARGS["lifespan"] == "on"
+
+
+@pytest.mark.anyio
+async def test_schema_is_prepared_once_per_process_tree(monkeypatch):
+    upgrades = []
+
+    async def upgrade(engine):
+        upgrades.append(engine)
+
+    monkeypatch.setattr(database, "DB_STARTUP_MODE", database.DBStartupMode.migrate)
+    monkeypatch.setattr(database, "upgrade", upgrade)
+    monkeypatch.setattr(database, "_schema_prepared", False)
+
+    assert await database.prepare_schema() is True
+    # As in a worker forked after serve.py prepared the schema
+    assert await database.prepare_schema() is False
+    assert len(upgrades) == 1
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="Linux /proc only")
+def test_process_stats_report_startup_and_memory():
+    process_stats = ProcessStats()
+    assert "startup_seconds" not in process_stats.stats()
+
+    startup_seconds = process_stats.ready()
+    stats = process_stats.stats()
+
+    assert stats["startup_seconds"] == startup_seconds > 0
+    assert 0 < stats["pss_bytes"] <= stats["rss_bytes"]
+    assert stats["peak_rss_bytes"] > 0
+    assert memory_usage(os.getpid())["rss_bytes"] > 0
+    assert memory_usage("0") == {}
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.shared_state import SharedStateKey
+from tests.conftest import FakeRedis
+from utils.shared_state import (
+    DatabaseStateBackend,
+    LocalStateBackend,
+    RedisStateBackend,
+    SharedState,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(params=["local", "redis", "database"])
+def state(request, session: AsyncSession):
+    if request.param == "local":
+        return SharedState(LocalStateBackend())
+    if request.param == "redis":
+        return SharedState(RedisStateBackend(FakeRedis()))
+    maker = async_sessionmaker(session.bind, class_=AsyncSession, expire_on_commit=False)
+    return SharedState(DatabaseStateBackend(maker))
+
+
+async def test_keys_are_set_until_deleted(state: SharedState):
+    assert not await state.exists("revoked:1")
+
+    await state.set("revoked:1", 60)
+    await state.set("revoked:1", 60)
+    assert await state.exists("revoked:1")
+    assert not await state.exists("revoked:2")
+
+    await state.delete("revoked:1")
+    assert not await state.exists("revoked:1")
+    # No expiry means not set at all
+    await state.set("revoked:3", 0)
+    assert not await state.exists("revoked:3")
+
+
+async def test_local_keys_expire_and_are_pruned():
+    backend = LocalStateBackend(min_prune_size=4)
+    for i in range(3):
+        await backend.set(f"short:{i}", 0.01)
+    time.sleep(0.02)
+    await backend.set("long", 60)
+
+    assert backend.stats() == {"keys": 1}
+    assert await backend.exists("long")
+
+
+async def test_database_keys_expire_and_are_pruned(session: AsyncSession):
+    maker = async_sessionmaker(session.bind, class_=AsyncSession, expire_on_commit=False)
+    backend = DatabaseStateBackend(maker, prune_seconds=0)
+    await backend.set("short", 0.01)
+    time.sleep(0.02)
+    assert not await backend.exists("short")
+
+    await backend.set("long", 60)
+
+    keys = (await session.exec(select(SharedStateKey.key))).all()
+    assert keys == ["long"]
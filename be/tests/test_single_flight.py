@@ -0,0 +1,198 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.task import Task
+from service.task_service import TaskService
+from service.user_service import UserService
+from tests.conftest import add_users, auth
+from utils.read_routing import read_routing
+from utils.single_flight import SingleFlight, single_flight
+
+pytestmark = pytest.mark.anyio
+
+CLIENTS = 5
+
+
+@pytest.fixture(autouse=True)
+async def tasks(session: AsyncSession):
+    await add_users(session, range(1, CLIENTS + 2), admin_ids=(1,))
+    session.add_all(
+        Task(title=f"Task {i}", description="D", assignee_id=i % CLIENTS + 1, creator_id=1)
+        for i in range(20)
+    )
+    await session.commit()
+
+
+async def until_collapsed(count: int):
+    while single_flight.stats()["collapsed"] < count:
+        await asyncio.sleep(0.001)
+
+
+def gated(method, calls: list, collapsed: int):
+    # Holds the flight until `collapsed` requests in total have joined one
+    async def wrapper(self, *args, **kwargs):
+        calls.append(method.__name__)
+        await asyncio.wait_for(until_collapsed(collapsed), 5)
+        return await method(self, *args, **kwargs)
+
+    return wrapper
+
+
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = asyncio.Event()
+
+    async def query():
+        calls.append(1)
+        await release.wait()
+        return b"page"
+
+    callers = [asyncio.create_task(flight.do("key", query)) for _ in range(4)]
+    await asyncio.sleep(0)
+    other = asyncio.create_task(flight.do("other", query))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*callers) == [b"page"] * 4
+    assert await other == b"page"
+    assert len(calls) == 2
+    assert flight.stats() == {
+        "in_flight": 0, "leaders": 2, "collapsed": 3, "bypassed": 0, "retried": 0
+    }
+    # Landed flights are not kept
+    assert await flight.do("key", query) == b"page"
+    assert len(calls) == 3
+
+
+async def test_errors_reach_every_caller():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise ValueError("broken")
+
+    callers = [asyncio.create_task(flight.do("key", failing)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+async def test_cancelled_leader_lets_followers_run_their_own():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def stuck():
+        started.set()
+        await asyncio.Event().wait()
+
+    async def query():
+        return b"own"
+
+    leader = asyncio.create_task(flight.do("key", stuck))
+    await started.wait()
+    follower = asyncio.create_task(flight.do("key", query))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == b"own"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert flight.stats()["retried"] == 1
+
+
+async def test_no_key_runs_alone():
+    flight = SingleFlight()
+
+    async def query():
+        return b"page"
+
+    assert await flight.do(None, query) == b"page"
+    # REQUEST_COALESCING=false
+    assert await SingleFlight(enabled=False).do("key", query) == b"page"
+    assert flight.stats()["bypassed"] == 1
+
+
+@pytest.mark.parametrize(
+    "path, service, etag_method, page_method",
+    [
+        ("/tasks/?limit=5", TaskService, "get_list_etag", "find_all"),
+        ("/users/all?limit=5", UserService, "get_list_etag", "get_all_users"),
+    ],
+)
+async def test_identical_requests_share_queries_and_body(
+    client: httpx.AsyncClient, monkeypatch, path, service, etag_method, page_method
+):
+    calls = []
+    # Every request joins the ETag flight, then the page flight
+    monkeypatch.setattr(
+        service, etag_method, gated(getattr(service, etag_method), calls, CLIENTS - 1)
+    )
+    monkeypatch.setattr(
+        service, page_method, gated(getattr(service, page_method), calls, 2 * (CLIENTS - 1))
+    )
+
+    # Different users with the same access to the listing
+    responses = await asyncio.gather(
+        *(client.get(path, headers=auth(user_id)) for user_id in range(2, CLIENTS + 2))
+    )
+
+    assert calls == [etag_method, page_method]
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.content for response in responses}) == 1
+    assert len({response.headers["etag"] for response in responses}) == 1
+    assert len(responses[0].json()["items"]) == 5
+    assert b"password" not in responses[0].content
+    assert single_flight.stats()["collapsed"] == 2 * (CLIENTS - 1)
+
+
+async def test_conditional_request_joins_only_the_etag_flight(client: httpx.AsyncClient):
+    first = await client.get("/tasks/", headers=auth(2))
+
+    response = await client.get(
+        "/tasks/", headers={**auth(3), "If-None-Match": first.headers["etag"]}
+    )
+
+    assert response.status_code == 304
+    assert single_flight.stats()["leaders"] == 3
+
+
+async def test_scopes_and_recent_writers_do_not_share(
+    client: httpx.AsyncClient, monkeypatch
+):
+    calls = []
+    release = asyncio.Event()
+    original = TaskService.find_all
+
+    async def held(self, *args, **kwargs):
+        calls.append(1)
+        await release.wait()
+        return await original(self, *args, **kwargs)
+
+    monkeypatch.setattr(TaskService, "find_all", held)
+    # User 3 just wrote, a flight started before the write must not serve them
+    await read_routing.mark_write("3")
+
+    requests = [
+        asyncio.create_task(client.get("/tasks/", headers=auth(user_id))) for user_id in (1, 2)
+    ]
+    while len(calls) < 2:
+        await asyncio.sleep(0.001)
+    # User 2's page is in flight when user 3 asks for the same one
+    requests.append(asyncio.create_task(client.get("/tasks/", headers=auth(3))))
+    while len(calls) < 3:
+        await asyncio.sleep(0.001)
+    release.set()
+    responses = await asyncio.gather(*requests)
+
+    assert {response.status_code for response in responses} == {200}
+    # Admin and user scopes fly apart, the writer runs alone
+    assert single_flight.stats()["collapsed"] == 0
+    assert single_flight.stats()["bypassed"] == 1
@@ -0,0 +1,72 @@
+import logging
+
+import pytest
+from sqlalchemy import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.task import Task
+from models.user import User
+from utils.slow_query import EXPLAIN_PREFIXES, SlowQueryLog
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("users")]
+
+
+def attach(session: AsyncSession, **options) -> SlowQueryLog:
+    slow_query_log = SlowQueryLog(**options)
+    slow_query_log.attach(session.bind.sync_engine)
+    return slow_query_log
+
+
+async def test_slow_select_is_logged_with_params_and_plan(session: AsyncSession, caplog):
+    # Every statement is slow with a threshold this low
+    slow_query_log = attach(session, threshold_ms=1e-9, log_params=True)
+
+    with caplog.at_level(logging.WARNING, logger="utils.slow_query"):
+        await session.exec(select(Task.id).where(Task.assignee_id == 1).order_by(Task.id))
+
+    (record,) = caplog.records
+    assert record.getMessage().startswith("Slow query (")
+    assert "FROM task WHERE task.assignee_id = ? ORDER BY task.id" in record.getMessage()
+    assert "params=(1,)" in record.getMessage()
+    # SQLite's EXPLAIN QUERY PLAN, through the (assignee_id, is_complete, id) index
+    assert "USING" in record.getMessage() and "INDEX" in record.getMessage()
+    assert slow_query_log.stats()["slow"] == 1
+    assert slow_query_log.stats()["explained"] == 1
+
+
+async def test_writes_are_logged_without_a_plan_or_params(session: AsyncSession, caplog):
+    # Parameters are opt-in
+    slow_query_log = attach(session, threshold_ms=1e-9)
+
+    with caplog.at_level(logging.WARNING, logger="utils.slow_query"):
+        await session.exec(
+            insert(User).values(id=4, email="secret@example.com", password="p", name="n")
+        )
+
+    message = caplog.records[0].getMessage()
+    assert "INSERT INTO user" in message
+    assert "params=<hidden> plan=None" in message
+    assert "secret@example.com" not in message
+    assert slow_query_log.stats()["explained"] == 0
+
+
+async def test_fast_queries_are_not_logged(session: AsyncSession, caplog):
+    slow_query_log = attach(session, threshold_ms=60_000)
+
+    with caplog.at_level(logging.WARNING, logger="utils.slow_query"):
+        await session.exec(select(Task.id))
+
+    assert caplog.records == []
+    assert slow_query_log.stats()["slow"] == 0
+
+
+async def test_failed_explain_is_counted(session: AsyncSession, caplog, monkeypatch):
+    slow_query_log = attach(session, threshold_ms=1e-9)
+    monkeypatch.setitem(EXPLAIN_PREFIXES, "sqlite", "EXPLAIN NOTHING ")
+
+    with caplog.at_level(logging.WARNING, logger="utils.slow_query"):
+        await session.exec(select(Task.id))
+
+    assert "plan=None" in caplog.records[0].getMessage()
+    assert slow_query_log.stats()["explain_errors"] == 1
@@ -0,0 +1,178 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.task import Task, TaskBulkUpdateItemDTO, TaskCreateDTO, TaskFilterDTO, TaskUpdateDTO
+from models.task_archive import TaskArchive
+from service.task_archive_service import TaskArchiver, TaskArchiveService
+from service.task_service import TaskService
+from service.task_stats_service import TaskStatsService
+from utils.clock import utc_now
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("users")]
+
+
+@pytest.fixture
+def archive_service(session: AsyncSession):
+    return TaskArchiveService(session=session)
+
+
+async def create(task_service: TaskService, title: str, assignee_id=None, complete_days_ago=None):
+    task = await task_service.create_task(
+        TaskCreateDTO(title=title, description="D", assignee_id=assignee_id), creator_id=1
+    )
+    if complete_days_ago is not None:
+        await task_service.update_task(task.id, TaskUpdateDTO(is_complete=True))
+        # Written behind the service's back, as if completed back then
+        session = task_service.session
+        await session.exec(
+            update(Task)
+            .where(Task.id == task.id)
+            .values(updated_at=utc_now() - timedelta(days=complete_days_ago))
+        )
+        await session.commit()
+    return task
+
+
+async def archived_ids(session: AsyncSession) -> list[int]:
+    return list((await session.exec(select(TaskArchive.id).order_by(TaskArchive.id))).all())
+
+
+async def test_archive_moves_old_completed_tasks(
+    session: AsyncSession, task_service: TaskService, archive_service: TaskArchiveService
+):
+    old = await create(task_service, "A", assignee_id=2, complete_days_ago=40)
+    recent = await create(task_service, "B", assignee_id=2, complete_days_ago=5)
+    open_task = await create(task_service, "C", assignee_id=2)
+
+    assert await archive_service.archive(after_days=30) == 1
+
+    assert await archived_ids(session) == [old.id]
+    hot, _ = await task_service.find_all()
+    assert [task["id"] for task in hot] == [recent.id, open_task.id]
+    mine, _ = await task_service.find_all_for_user(2)
+    assert [task["id"] for task in mine] == [recent.id, open_task.id]
+    # Nothing left to move
+    assert await archive_service.archive(after_days=30) == 0
+
+
+async def test_archived_task_is_served_by_id(
+    task_service: TaskService, archive_service: TaskArchiveService
+):
+    task = await create(task_service, "A", assignee_id=2, complete_days_ago=40)
+    etag = await task_service.get_task_etag(task.id)
+
+    await archive_service.archive(after_days=30)
+
+    assert await task_service.get_task_etag(task.id) == etag
+    archived = await task_service.get_task_by_id(task.id)
+    assert (archived.id, archived.title, archived.is_complete) == (task.id, "A", True)
+    assert archived.assignee.email == "user2@example.com"
+    assert await task_service.get_task_by_id(999) is None
+
+
+async def test_listings_include_archived_on_request(
+    task_service: TaskService, archive_service: TaskArchiveService
+):
+    ids = []
+    for i in range(5):
+        task = await create(
+            task_service, f"T{i}", assignee_id=2, complete_days_ago=40 if i % 2 == 0 else None
+        )
+        ids.append(task.id)
+    await archive_service.archive(after_days=30)
+
+    archived, _ = await task_service.find_archived()
+    assert [task["id"] for task in archived] == [ids[0], ids[2], ids[4]]
+
+    pages, cursor = [], None
+    while True:
+        tasks, cursor = await task_service.find_all(
+            limit=2, cursor=cursor, include_archived=True
+        )
+        pages.append([task["id"] for task in tasks])
+        if cursor is None:
+            break
+    assert pages == [ids[:2], ids[2:4], ids[4:]]
+
+    completed, _ = await task_service.find_all_for_user(
+        2, filters=TaskFilterDTO(is_complete=True), include_archived=True
+    )
+    assert [task["id"] for task in completed] == [ids[0], ids[2], ids[4]]
+    assert completed[0]["assignee"]["name"] == "user2"
+
+
+async def test_archive_runs_in_batches(
+    session: AsyncSession, task_service: TaskService, archive_service: TaskArchiveService
+):
+    tasks = [await create(task_service, f"T{i}", complete_days_ago=40) for i in range(5)]
+
+    assert await archive_service.archive(after_days=30, batch_size=2) == 5
+    assert await archived_ids(session) == [task.id for task in tasks]
+
+
+async def test_writes_restore_archived_tasks(
+    session: AsyncSession,
+    task_service: TaskService,
+    archive_service: TaskArchiveService,
+):
+    updated = await create(task_service, "A", assignee_id=2, complete_days_ago=40)
+    bulk_updated = await create(task_service, "B", assignee_id=2, complete_days_ago=40)
+    deleted = await create(task_service, "C", assignee_id=3, complete_days_ago=40)
+    await archive_service.archive(after_days=30)
+
+    await task_service.update_task(updated.id, TaskUpdateDTO(is_complete=False))
+    await task_service.bulk_update_tasks(
+        [TaskBulkUpdateItemDTO(id=bulk_updated.id, assignee_id=3)]
+    )
+    await task_service.delete_task(deleted.id)
+
+    assert await archived_ids(session) == []
+    hot, _ = await task_service.find_all()
+    assert [(task["id"], task["is_complete"], task["assignee_id"]) for task in hot] == [
+        (updated.id, False, 2),
+        (bulk_updated.id, True, 3),
+    ]
+    # A new task never takes an archived task's id
+    assert (await create(task_service, "D")).id > deleted.id
+    assert await TaskStatsService(session=session).check() == []
+
+
+async def test_archiving_keeps_stats_and_leaves_changes_feed(
+    session: AsyncSession, task_service: TaskService, archive_service: TaskArchiveService
+):
+    task = await create(task_service, "A", assignee_id=2, complete_days_ago=40)
+    kept = await create(task_service, "B", assignee_id=2)
+    cursor = (await task_service.get_changes(2))["next_cursor"]
+
+    await archive_service.archive(after_days=30)
+
+    changes = await task_service.get_changes(2, since=cursor)
+    assert (changes["items"], changes["removed"]) == ([], [task.id])
+    full_sync = await task_service.get_changes(2)
+    assert [item["id"] for item in full_sync["items"]] == [kept.id]
+    stats_service = TaskStatsService(session=session)
+    assert (await stats_service.get_stats()).totals.total == 2
+    assert await stats_service.check() == []
+
+
+async def test_archiver_runs_with_its_own_sessions(
+    session: AsyncSession, task_service: TaskService
+):
+    await create(task_service, "A", complete_days_ago=40)
+    archiver = TaskArchiver(
+        interval_seconds=0,
+        after_days=30,
+        session_maker=async_sessionmaker(
+            session.bind, class_=AsyncSession, expire_on_commit=False
+        ),
+    )
+
+    assert await archiver.run_once() == 1
+    await archiver.start()
+
+    assert archiver.stats() == {"running": False, "runs": 1, "archived": 1, "errors": 0}
@@ -0,0 +1,106 @@
+import httpx
+import pytest
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.task import BULK_MAX_ITEMS, Task
+from tests.conftest import add_users, auth
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+async def tasks(session: AsyncSession):
+    await add_users(session, (1, 2))
+    session.add_all(Task(id=i, title=f"Task {i}", description="D", creator_id=1) for i in (1, 2))
+    await session.commit()
+
+
+async def titles(client: httpx.AsyncClient) -> dict[int, str]:
+    response = await client.get("/tasks/", headers=auth(1))
+    return {task["id"]: task["title"] for task in response.json()["items"]}
+
+
+async def test_bulk_create_reports_each_item(client: httpx.AsyncClient):
+    response = await client.post(
+        "/tasks/bulk",
+        json={
+            "tasks": [
+                {"title": "New", "description": "D", "assignee_id": 2},
+                {"title": "Orphan", "description": "D", "assignee_id": 999},
+            ]
+        },
+        headers=auth(1),
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "results": [{"id": 3, "status": "created"}, {"id": None, "status": "assignee_not_found"}]
+    }
+    assert await titles(client) == {1: "Task 1", 2: "Task 2", 3: "New"}
+
+
+async def test_bulk_update_reports_each_item(client: httpx.AsyncClient):
+    response = await client.patch(
+        "/tasks/bulk",
+        json={
+            "tasks": [
+                {"id": 1, "title": "Renamed"},
+                {"id": 2, "assignee_id": 999},
+                {"id": 999, "title": "Missing"},
+            ]
+        },
+        headers=auth(1),
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "results": [
+            {"id": 1, "status": "updated"},
+            {"id": 2, "status": "assignee_not_found"},
+            {"id": 999, "status": "not_found"},
+        ]
+    }
+    assert await titles(client) == {1: "Renamed", 2: "Task 2"}
+
+
+async def test_bulk_update_rejects_duplicate_ids(client: httpx.AsyncClient):
+    response = await client.patch(
+        "/tasks/bulk",
+        json={"tasks": [{"id": 1, "assignee_id": 2}, {"id": 1, "is_complete": True}]},
+        headers=auth(1),
+    )
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "tasks"]
+    task = (await client.get("/tasks/1", headers=auth(1))).json()
+    assert (task["assignee_id"], task["is_complete"]) == (None, False)
+
+
+async def test_bulk_delete_reports_each_item(client: httpx.AsyncClient):
+    response = await client.request(
+        "DELETE", "/tasks/bulk", json={"ids": [1, 999]}, headers=auth(1)
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "results": [{"id": 1, "status": "deleted"}, {"id": 999, "status": "not_found"}]
+    }
+    assert await titles(client) == {2: "Task 2"}
+
+
+@pytest.mark.parametrize("method", ["PATCH", "DELETE"])
+async def test_bulk_is_not_taken_for_a_task_id(client: httpx.AsyncClient, method):
+    # An invalid bulk body is rejected by the bulk route, not as task id "bulk"
+    response = await client.request(method, "/tasks/bulk", json={}, headers=auth(1))
+
+    assert response.status_code == 422
+    assert {error["loc"][-1] for error in response.json()["detail"]} <= {"tasks", "ids"}
+
+
+async def test_bulk_limits_and_authentication(client: httpx.AsyncClient):
+    too_many = {"ids": list(range(BULK_MAX_ITEMS + 1))}
+    response = await client.request("DELETE", "/tasks/bulk", json=too_many, headers=auth(1))
+    assert response.status_code == 422
+
+    response = await client.post("/tasks/bulk", json={"tasks": []})
+    assert response.status_code == 401
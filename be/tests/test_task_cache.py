@@ -0,0 +1,189 @@
+import pytest
+from sqlalchemy import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import service.task_service
+from models.task import Task, TaskBulkUpdateItemDTO, TaskCreateDTO, TaskUpdateDTO
+from service.task_service import TaskService
+from tests.conftest import FakeRedis
+from utils.task_cache import LocalCacheBackend, RedisCacheBackend, TaskCache
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("users")]
+
+
+@pytest.fixture(params=["local", "shared"])
+def cache(request, monkeypatch):
+    backend = LocalCacheBackend() if request.param == "local" else RedisCacheBackend(FakeRedis())
+    cache = TaskCache(backend, ttl_seconds=60)
+    monkeypatch.setattr(service.task_service, "task_cache", cache)
+    return cache
+
+
+def new_request(session: AsyncSession) -> TaskService:
+    # Services are request scoped, a new one drops the per request lookups
+    return TaskService(session=session)
+
+
+async def create(session: AsyncSession, assignee_id=None) -> Task:
+    return await new_request(session).create_task(
+        TaskCreateDTO(title="Task", description="Desc", assignee_id=assignee_id), creator_id=1
+    )
+
+
+async def my_task_ids(session: AsyncSession, user_id: int) -> list[int]:
+    tasks, _ = await new_request(session).find_all_for_user(user_id)
+    return [task["id"] for task in tasks]
+
+
+async def test_task_reads_are_served_from_cache(session: AsyncSession, cache: TaskCache):
+    task = await create(session, assignee_id=2)
+    db_etag = await new_request(session).get_task_etag(task.id)
+
+    await new_request(session).get_task_by_id(task.id)
+    # Removed behind the service's back, only the cache can still answer
+    await session.exec(delete(Task).where(Task.id == task.id))
+    await session.commit()
+
+    service = new_request(session)
+    assert await service.get_task_etag(task.id) == db_etag
+    cached = await service.get_task_by_id(task.id)
+    assert cached.title == "Task"
+    assert cached.assignee.email == "user2@example.com"
+    assert cache.hits == 1
+
+
+async def test_update_invalidates_task(session: AsyncSession, cache: TaskCache):
+    task = await create(session)
+    await new_request(session).get_task_by_id(task.id)
+    etag = await new_request(session).get_task_etag(task.id)
+
+    await new_request(session).update_task(task.id, TaskUpdateDTO(title="New"))
+
+    service = new_request(session)
+    assert (await service.get_task_by_id(task.id)).title == "New"
+    assert await service.get_task_etag(task.id) != etag
+
+
+async def test_fill_racing_with_an_update_is_not_served(
+    session: AsyncSession, cache: TaskCache, monkeypatch
+):
+    task_id = (await create(session)).id
+    set_task = cache.set_task
+
+    async def set_after_update(key, loaded):
+        # Another request's update commits between the reader's load and its fill
+        async with AsyncSession(session.bind, expire_on_commit=False) as writer:
+            await new_request(writer).update_task(task_id, TaskUpdateDTO(title="New"))
+        await set_task(key, loaded)
+
+    monkeypatch.setattr(cache, "set_task", set_after_update)
+    assert (await new_request(session).get_task_by_id(task_id)).title == "Task"
+    monkeypatch.setattr(cache, "set_task", set_task)
+    # A later request of its own, not this session's copy of the row
+    session.expire_all()
+
+    assert (await new_request(session).get_task_by_id(task_id)).title == "New"
+
+
+async def test_reassignment_invalidates_old_and_new_assignee(
+    session: AsyncSession, cache: TaskCache
+):
+    task = await create(session, assignee_id=2)
+    assert await my_task_ids(session, 2) == [task.id]
+    assert await my_task_ids(session, 3) == []
+
+    await new_request(session).update_task(task.id, TaskUpdateDTO(assignee_id=3))
+
+    assert await my_task_ids(session, 2) == []
+    assert await my_task_ids(session, 3) == [task.id]
+
+
+async def test_create_invalidates_assignee_pages(session: AsyncSession, cache: TaskCache):
+    first = await create(session, assignee_id=2)
+    assert await my_task_ids(session, 2) == [first.id]
+
+    second = await create(session, assignee_id=2)
+
+    assert await my_task_ids(session, 2) == [first.id, second.id]
+
+
+@pytest.mark.parametrize("delete_returning", [True, False])
+async def test_delete_invalidates_task_and_pages(
+    session: AsyncSession, cache: TaskCache, monkeypatch, delete_returning
+):
+    monkeypatch.setattr(session.bind.dialect, "delete_returning", delete_returning)
+    task = await create(session, assignee_id=2)
+    await new_request(session).get_task_by_id(task.id)
+    assert await my_task_ids(session, 2) == [task.id]
+
+    await new_request(session).delete_task(task.id)
+
+    assert await new_request(session).get_task_by_id(task.id) is None
+    assert await my_task_ids(session, 2) == []
+
+
+async def test_bulk_update_invalidates_previous_assignees(
+    session: AsyncSession, cache: TaskCache
+):
+    task = await create(session, assignee_id=2)
+    assert await my_task_ids(session, 2) == [task.id]
+
+    await new_request(session).bulk_update_tasks(
+        [TaskBulkUpdateItemDTO(id=task.id, assignee_id=3)]
+    )
+
+    assert await my_task_ids(session, 2) == []
+    assert await my_task_ids(session, 3) == [task.id]
+
+
+async def test_page_etag_is_cached_with_the_page(session: AsyncSession, cache: TaskCache):
+    await create(session, assignee_id=2)
+    service = new_request(session)
+    etag = await service.get_list_etag_for_user(2)
+    await service.find_all_for_user(2)
+
+    service = new_request(session)
+    assert await service.get_list_etag_for_user(2) == etag
+    assert cache.stats()["hits"] == 1
+
+
+async def test_shared_backend_sets_ttl(session: AsyncSession):
+    redis = FakeRedis()
+    cache = TaskCache(RedisCacheBackend(redis), ttl_seconds=1.5)
+    task = await create(session)
+    key = await cache.task_key(task.id)
+    await cache.set_task(key, await new_request(session).get_task_by_id(task.id))
+
+    assert redis.ttls["taskmanager:" + key] == 2
+    # Versions outlive the entries they key
+    assert redis.ttls[f"taskmanager:tasks:id:{task.id}:version"] == 3
+
+
+async def test_local_backend_evicts_least_recently_used():
+    backend = LocalCacheBackend(max_size=2)
+    await backend.set("a", "1", 60)
+    await backend.set("b", "2", 60)
+    await backend.get("a")
+    await backend.set("c", "3", 60)
+
+    assert await backend.get("b") is None
+    assert await backend.get("a") == "1"
+    assert backend.stats() == {"size": 2, "evictions": 1}
+
+
+async def test_local_backend_expires_entries():
+    backend = LocalCacheBackend()
+    await backend.set("a", "1", 0)
+
+    assert await backend.get("a") is None
+
+
+async def test_hit_ratio(session: AsyncSession, cache: TaskCache):
+    task = await create(session)
+    await new_request(session).get_task_by_id(task.id)
+    await new_request(session).get_task_by_id(task.id)
+    await new_request(session).get_task_by_id(task.id)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_ratio"] == pytest.approx(0.6667)
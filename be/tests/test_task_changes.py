@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.task import TaskBulkUpdateItemDTO, TaskCreateDTO, TaskUpdateDTO
+from models.task_change import TaskTombstone
+from service.task_change_service import TaskChangeService, next_change_seq
+from service.task_service import TaskService
+from tests.conftest import recorded_statements
+from utils.clock import utc_now
+from utils.exception import ChangeCursorExpiredException
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("users")]
+
+
+async def create(task_service: TaskService, title: str, assignee_id=None):
+    return await task_service.create_task(
+        TaskCreateDTO(title=title, description="D", assignee_id=assignee_id), creator_id=1
+    )
+
+
+async def test_full_sync_returns_assigned_tasks(task_service: TaskService):
+    first = await create(task_service, "A", assignee_id=2)
+    await create(task_service, "B", assignee_id=3)
+    await create(task_service, "C")
+    second = await create(task_service, "D", assignee_id=2)
+
+    changes = await task_service.get_changes(2)
+
+    assert [task["id"] for task in changes["items"]] == [first.id, second.id]
+    assert changes["items"][0]["assignee"]["email"] == "user2@example.com"
+    assert changes["removed"] == []
+    assert changes["has_more"] is False
+
+
+async def test_sync_since_cursor_returns_later_changes(task_service: TaskService):
+    first = await create(task_service, "A", assignee_id=2)
+    second = await create(task_service, "B", assignee_id=2)
+    cursor = (await task_service.get_changes(2))["next_cursor"]
+
+    await task_service.update_task(first.id, TaskUpdateDTO(title="Renamed"))
+    third = await create(task_service, "C", assignee_id=2)
+    await create(task_service, "D", assignee_id=3)
+
+    changes = await task_service.get_changes(2, since=cursor)
+
+    assert [task["id"] for task in changes["items"]] == [first.id, third.id]
+    assert changes["items"][0]["title"] == "Renamed"
+    assert second.id not in [task["id"] for task in changes["items"]]
+    # Nothing new, the cursor stays usable
+    again = await task_service.get_changes(2, since=changes["next_cursor"])
+    assert (again["items"], again["removed"]) == ([], [])
+    assert again["next_cursor"] == changes["next_cursor"]
+
+
+@pytest.mark.parametrize("delete_returning", [True, False])
+async def test_delete_and_reassignment_leave_tombstones(
+    session: AsyncSession, task_service: TaskService, monkeypatch, delete_returning
+):
+    monkeypatch.setattr(session.bind.dialect, "delete_returning", delete_returning)
+    moved = await create(task_service, "A", assignee_id=2)
+    deleted = await create(task_service, "B", assignee_id=2)
+    cursor = (await task_service.get_changes(2))["next_cursor"]
+
+    await task_service.update_task(moved.id, TaskUpdateDTO(assignee_id=3))
+    await task_service.delete_task(deleted.id)
+
+    changes = await task_service.get_changes(2, since=cursor)
+    assert changes["items"] == []
+    assert changes["removed"] == [moved.id, deleted.id]
+    # The new assignee sees the task
+    assert [task["id"] for task in (await task_service.get_changes(3))["items"]] == [moved.id]
+
+
+async def test_bulk_writes_are_sequenced(task_service: TaskService):
+    results = await task_service.bulk_create_tasks(
+        [TaskCreateDTO(title=f"T{i}", description="D", assignee_id=2) for i in range(4)],
+        creator_id=1,
+    )
+    ids = [r.id for r in results]
+    cursor = (await task_service.get_changes(2))["next_cursor"]
+
+    await task_service.bulk_update_tasks(
+        [
+            TaskBulkUpdateItemDTO(id=ids[2], is_complete=True),
+            TaskBulkUpdateItemDTO(id=ids[0], assignee_id=3),
+        ]
+    )
+    await task_service.bulk_delete_tasks([ids[1], 999])
+
+    changes = await task_service.get_changes(2, since=cursor)
+    assert [task["id"] for task in changes["items"]] == [ids[2]]
+    assert changes["items"][0]["is_complete"] is True
+    assert changes["removed"] == [ids[0], ids[1]]
+
+
+async def test_sequence_is_reserved_last_in_one_statement(
+    session: AsyncSession, task_service: TaskService
+):
+    task = await create(task_service, "A", assignee_id=2)
+    writes = [
+        lambda: create(task_service, "B", assignee_id=2),
+        lambda: task_service.update_task(task.id, TaskUpdateDTO(assignee_id=3)),
+        lambda: task_service.delete_task(task.id),
+    ]
+    for write in writes:
+        with recorded_statements(session) as statements:
+            await write()
+        reserved = [i for i, s in enumerate(statements) if "task_change_sequence" in s]
+        assert len(reserved) == 1
+        # Only rows the write already holds and new tombstones come after
+        assert all(
+            s.startswith(("UPDATE task SET", "INSERT INTO task_tombstone"))
+            for s in statements[reserved[0] + 1 :]
+        )
+
+    first = await next_change_seq(session, 3)
+    assert await next_change_seq(session) == first + 3
+
+
+async def test_changes_are_paged(task_service: TaskService):
+    tasks = [await create(task_service, f"T{i}", assignee_id=2) for i in range(3)]
+    await task_service.delete_task(tasks[0].id)
+
+    first = await task_service.get_changes(2, limit=2)
+    second = await task_service.get_changes(2, since=first["next_cursor"], limit=2)
+
+    assert [task["id"] for task in first["items"]] == [tasks[1].id, tasks[2].id]
+    assert first["has_more"] is True
+    assert second["removed"] == [tasks[0].id]
+    assert second["has_more"] is False
+
+
+async def test_pruned_cursor_expires(session: AsyncSession, task_service: TaskService):
+    task = await create(task_service, "A", assignee_id=2)
+    cursor = (await task_service.get_changes(2))["next_cursor"]
+    await task_service.delete_task(task.id)
+    await session.exec(update(TaskTombstone).values(created_at=utc_now() - timedelta(days=31)))
+    await session.commit()
+
+    assert await TaskChangeService(session).prune_tombstones(30) == 1
+
+    with pytest.raises(ChangeCursorExpiredException):
+        await task_service.get_changes(2, since=cursor)
+    # A full sync starts over
+    changes = await task_service.get_changes(2)
+    assert (changes["items"], changes["removed"]) == ([], [])
+    assert (await task_service.get_changes(2, since=changes["next_cursor"]))["items"] == []
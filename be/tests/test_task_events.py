@@ -0,0 +1,209 @@
+import asyncio
+import json
+from datetime import timedelta
+
+import httpx
+import pytest
+
+from models.task import TaskBulkUpdateItemDTO, TaskCreateDTO, TaskUpdateDTO
+from service.task_service import TaskService
+from service.user_service import UserService
+from tests.conftest import FakeRedis, auth
+from utils.dependencies import get_event_stream_user
+from utils.security import create_access_token
+from utils.task_events import (
+    CLOSED_FRAME,
+    HEARTBEAT_FRAME,
+    RESYNC_FRAME,
+    RETRY_FRAME,
+    RedisEventBackend,
+    TaskEventBroker,
+    TaskEventType,
+    event_stream,
+    task_events,
+)
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("users")]
+
+
+def drain(subscription) -> list[tuple[str, dict]]:
+    events = []
+    while not subscription.queue.empty():
+        frame = subscription.queue.get_nowait()
+        event_line, data_line = frame.strip().split("\n")
+        events.append((event_line.removeprefix("event: "), json.loads(data_line[6:])))
+    return events
+
+
+async def test_service_writes_publish_deltas(task_service: TaskService):
+    admin = task_events.subscribe(user_id=1, is_admin=True)
+
+    task = await task_service.create_task(
+        TaskCreateDTO(title="A", description="D", assignee_id=2), creator_id=1
+    )
+    await task_service.update_task(task.id, TaskUpdateDTO(is_complete=True))
+    await task_service.delete_task(task.id)
+
+    assert drain(admin) == [
+        (
+            "created",
+            {"id": task.id, "title": "A", "description": "D", "assignee_id": 2, "is_complete": False},
+        ),
+        (
+            "updated",
+            {"id": task.id, "title": "A", "description": "D", "assignee_id": 2, "is_complete": True},
+        ),
+        ("deleted", {"id": task.id, "assignee_id": 2}),
+    ]
+
+
+async def test_non_admins_only_see_their_tasks(task_service: TaskService):
+    old_assignee = task_events.subscribe(user_id=2, is_admin=False)
+    new_assignee = task_events.subscribe(user_id=3, is_admin=False)
+
+    task = await task_service.create_task(
+        TaskCreateDTO(title="A", description="D", assignee_id=2), creator_id=1
+    )
+    await task_service.create_task(TaskCreateDTO(title="B", description="D"), creator_id=2)
+    await task_service.update_task(task.id, TaskUpdateDTO(assignee_id=3))
+    await task_service.update_task(task.id, TaskUpdateDTO(title="Renamed"))
+
+    # The previous assignee learns the task left them, then hears no more
+    assert [(e, t["id"], t["assignee_id"]) for e, t in drain(old_assignee)] == [
+        ("created", task.id, 2),
+        ("updated", task.id, 3),
+    ]
+    assert [(e, t["title"]) for e, t in drain(new_assignee)] == [
+        ("updated", "A"),
+        ("updated", "Renamed"),
+    ]
+
+
+async def test_bulk_writes_publish_one_delta_per_task(task_service: TaskService):
+    admin = task_events.subscribe(user_id=1, is_admin=True)
+
+    results = await task_service.bulk_create_tasks(
+        [TaskCreateDTO(title=f"T{i}", description="D", assignee_id=2) for i in range(3)],
+        creator_id=1,
+    )
+    ids = [r.id for r in results]
+    await task_service.bulk_update_tasks([TaskBulkUpdateItemDTO(id=ids[0], is_complete=True)])
+    await task_service.bulk_delete_tasks(ids[1:])
+
+    events = drain(admin)
+    assert [e for e, _ in events] == ["created"] * 3 + ["updated"] + ["deleted"] * 2
+    assert events[3][1] == {"id": ids[0], "is_complete": True, "assignee_id": 2}
+
+
+async def test_slow_subscriber_is_closed_with_resync():
+    broker = TaskEventBroker(queue_size=2)
+    slow = broker.subscribe(user_id=1, is_admin=True)
+    fast = broker.subscribe(user_id=2, is_admin=True)
+
+    for i in range(3):
+        await broker.publish(TaskEventType.created, [{"id": i}], [[None]])
+        await fast.get()
+
+    assert slow.closed
+    assert await slow.get() == RESYNC_FRAME
+    assert broker.stats()["subscribers"] == 1
+    assert broker.stats()["resyncs"] == 1
+
+
+async def test_event_stream_sends_heartbeats_and_ends_on_resync():
+    broker = TaskEventBroker(queue_size=1)
+    subscription = broker.subscribe(user_id=1, is_admin=True)
+    stream = event_stream(broker, subscription, heartbeat_seconds=0.01)
+
+    assert await anext(stream) == RETRY_FRAME
+    assert await anext(stream) == HEARTBEAT_FRAME
+
+    for i in range(2):
+        await broker.publish(TaskEventType.created, [{"id": i}], [[None]])
+    assert await anext(stream) == RESYNC_FRAME
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+    assert broker.stats()["subscribers"] == 0
+
+
+async def test_redis_backend_reaches_other_workers():
+    redis = FakeRedis()
+    publisher = TaskEventBroker(RedisEventBackend(redis))
+    worker = TaskEventBroker(RedisEventBackend(redis))
+    await publisher.start()
+    await worker.start()
+    local = publisher.subscribe(user_id=2, is_admin=False)
+    remote = worker.subscribe(user_id=2, is_admin=False)
+
+    await publisher.publish(TaskEventType.deleted, [{"id": 7, "assignee_id": 2}], [[2]])
+
+    assert await asyncio.wait_for(remote.get(), 1) == await asyncio.wait_for(local.get(), 1)
+    await publisher.stop()
+    await worker.stop()
+    assert redis.subscribers == []
+
+
+async def test_deactivation_ends_the_user_streams(user_service: UserService):
+    user_stream = event_stream(task_events, task_events.subscribe(user_id=2, is_admin=False))
+    other = task_events.subscribe(user_id=3, is_admin=False)
+    assert await anext(user_stream) == RETRY_FRAME
+
+    await user_service.deactivate_user(2)
+
+    assert await anext(user_stream) == CLOSED_FRAME
+    with pytest.raises(StopAsyncIteration):
+        await anext(user_stream)
+    assert not other.closed
+    assert task_events.stats()["subscribers"] == 1
+    assert task_events.stats()["closed"] == 1
+
+
+async def test_close_user_reaches_other_workers():
+    redis = FakeRedis()
+    deactivating = TaskEventBroker(RedisEventBackend(redis))
+    worker = TaskEventBroker(RedisEventBackend(redis))
+    await deactivating.start()
+    await worker.start()
+    remote = worker.subscribe(user_id=2, is_admin=False)
+    remote.put("pending frame")
+
+    await deactivating.close_user(2)
+
+    # Pending frames are dropped, the stream only gets the closed frame
+    assert await asyncio.wait_for(remote.get(), 1) == CLOSED_FRAME
+    assert remote.closed and remote.queue.empty()
+    assert worker.stats()["subscribers"] == 0
+    await deactivating.stop()
+    await worker.stop()
+
+
+async def test_event_source_opens_the_stream_with_an_events_token(
+    client: httpx.AsyncClient, user_service: UserService
+):
+    response = await client.post("/tasks/events/token", headers=auth(2))
+    assert response.status_code == 200
+    assert response.json()["expires_in"] == 60
+
+    # What GET /tasks/events?access_token=... authenticates with
+    principal = await get_event_stream_user(
+        user_service, token=None, access_token=response.json()["access_token"]
+    )
+    assert (principal.id, principal.email) == (2, "user2@example.com")
+
+
+async def test_events_tokens_and_access_tokens_do_not_mix(client: httpx.AsyncClient):
+    events_token = (await client.post("/tasks/events/token", headers=auth(2))).json()[
+        "access_token"
+    ]
+    access_token = auth(2)["Authorization"].removeprefix("Bearer ")
+    expired = create_access_token(
+        {"sub": "user2@example.com", "id": 2, "scope": "events"},
+        expires_delta=timedelta(seconds=-1),
+    )
+
+    # Access tokens stay out of URLs, events tokens only open streams
+    for token in (access_token, expired):
+        assert (await client.get(f"/tasks/events?access_token={token}")).status_code == 401
+    response = await client.get("/tasks/", headers={"Authorization": f"Bearer {events_token}"})
+    assert response.status_code == 401
+    assert (await client.get("/tasks/events")).status_code == 401
@@ -1,69 +1,394 @@
 import pytest
-from models.task import TaskCreateDTO, TaskUpdateDTO
-from models.user import User
-from sqlmodel import Session
+from fastapi import HTTPException
+from models.task import (
+    BulkItemStatus,
+    TaskBulkUpdateItemDTO,
+    TaskCreateDTO,
+    TaskFilterDTO,
+    TaskUpdateDTO,
+)
+from sqlmodel.ext.asyncio.session import AsyncSession
 from service.task_service import TaskService
-from utils.exception import UserNotFoundException
+from tests.conftest import recorded_statements
+from utils.exception import InvalidCursorException, UserNotFoundException
 
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("users")]
 
-def test_create_task_without_assignee(task_service: TaskService):
+
+async def test_create_task_without_assignee(task_service: TaskService):
     task_data = TaskCreateDTO(title="Test Task", description="Test Desc")
-    created = task_service.create_task(task_data, creator_id=1)
+    created = await task_service.create_task(task_data, creator_id=1)
     assert created.title == "Test Task"
     assert created.creator_id == 1
 
 
-def test_create_task_with_nonexistent_assignee_raises(task_service: TaskService):
+async def test_create_task_with_nonexistent_assignee_raises(task_service: TaskService):
     task_data = TaskCreateDTO(
         title="Failing Task", description="No user", assignee_id=999
     )
     with pytest.raises(UserNotFoundException):
-        task_service.create_task(task_data, creator_id=1)
-
+        await task_service.create_task(task_data, creator_id=1)
 
-def test_create_task_with_valid_assignee(task_service: TaskService, session: Session):
-    user = User(
-        id=1,
-        email="test@example.com",
-        password="hashed_password",
-        name="test_user",
-        is_admin=False,
-    )
-    session.add(user)
-    session.commit()
 
+async def test_create_task_with_valid_assignee(task_service: TaskService, session: AsyncSession):
     task_data = TaskCreateDTO(title="Assigned Task", description="OK", assignee_id=1)
-    task = task_service.create_task(task_data, creator_id=2)
+    task = await task_service.create_task(task_data, creator_id=2)
     assert task.assignee_id == 1
     assert task.creator_id == 2
 
 
-def test_update_task(task_service: TaskService, session: Session):
-    task = task_service.create_task(
+async def test_update_task(task_service: TaskService, session: AsyncSession):
+    task = await task_service.create_task(
         TaskCreateDTO(title="Old", description="Desc"), creator_id=1
     )
-    updated = task_service.update_task(task.id, TaskUpdateDTO(title="New Title"))
+    updated = await task_service.update_task(task.id, TaskUpdateDTO(title="New Title"))
 
     assert updated.title == "New Title"
 
 
-def test_update_task_invalid_id(task_service: TaskService):
+async def test_update_task_invalid_id(task_service: TaskService):
     with pytest.raises(Exception) as exc:
-        task_service.update_task(999, TaskUpdateDTO(title="Test"))
+        await task_service.update_task(999, TaskUpdateDTO(title="Test"))
+    assert exc.value.status_code == 404
+
+
+async def test_update_task_with_nonexistent_assignee_raises(task_service: TaskService):
+    task = await task_service.create_task(
+        TaskCreateDTO(title="Old", description="Desc"), creator_id=1
+    )
+    with pytest.raises(UserNotFoundException):
+        await task_service.update_task(task.id, TaskUpdateDTO(assignee_id=999))
+
+
+async def test_update_task_without_returning(
+    task_service: TaskService, session: AsyncSession, monkeypatch
+):
+    # MySQL path: UPDATE followed by a single primary key read
+    monkeypatch.setattr(session.bind.dialect, "update_returning", False)
+    task = await task_service.create_task(
+        TaskCreateDTO(title="Old", description="Desc"), creator_id=1
+    )
+    updated = await task_service.update_task(
+        task.id, TaskUpdateDTO(is_complete=True, assignee_id=2)
+    )
+    assert updated.is_complete is True
+    assert updated.assignee_id == 2
+
+    with pytest.raises(HTTPException) as exc:
+        await task_service.update_task(999, TaskUpdateDTO(title="Test"))
     assert exc.value.status_code == 404
 
 
-def test_delete_task(task_service: TaskService):
-    created = task_service.create_task(
+async def test_single_writes_statement_counts(task_service: TaskService, session: AsyncSession):
+    with recorded_statements(session) as created:
+        task = await task_service.create_task(
+            TaskCreateDTO(title="Old", description="Desc", assignee_id=2), creator_id=1
+        )
+    with recorded_statements(session) as renamed:
+        await task_service.update_task(task.id, TaskUpdateDTO(title="New"))
+    with recorded_statements(session) as reassigned:
+        await task_service.update_task(task.id, TaskUpdateDTO(assignee_id=3))
+    with recorded_statements(session) as deleted:
+        await task_service.delete_task(task.id)
+
+    # Insert, two stats upserts, sequence, change_seq stamp
+    assert len(created) == 5
+    # Locking read, sequence, UPDATE ... RETURNING
+    assert len(renamed) == 3
+    # Plus the assignees' stats upsert and the tombstone
+    assert len(reassigned) == 5
+    # DELETE ... RETURNING, two stats upserts, sequence, tombstone
+    assert len(deleted) == 5
+    # The archive is only looked at for a missing task
+    assert not any("task_archive" in s for s in renamed + reassigned + deleted)
+
+
+async def test_delete_task(task_service: TaskService):
+    created = await task_service.create_task(
         TaskCreateDTO(title="ToDelete", description="Test"), creator_id=1
     )
-    task_service.delete_task(created.id)
+    await task_service.delete_task(created.id)
+
+    assert await task_service.get_task_by_id(created.id) is None
 
-    assert task_service.get_task_by_id(created.id) is None
 
+async def test_delete_task_invalid_id(task_service: TaskService):
+    with pytest.raises(HTTPException) as exc:
+        await task_service.delete_task(999)
+    assert exc.value.status_code == 404
 
-def test_find_all_returns_all(task_service: TaskService):
-    task_service.create_task(TaskCreateDTO(title="T1", description="D"), creator_id=1)
-    task_service.create_task(TaskCreateDTO(title="T2", description="D"), creator_id=1)
-    all_tasks = task_service.find_all()
+
+async def test_find_all_returns_all(task_service: TaskService):
+    await task_service.create_task(TaskCreateDTO(title="T1", description="D"), creator_id=1)
+    await task_service.create_task(TaskCreateDTO(title="T2", description="D"), creator_id=1)
+    all_tasks, next_cursor = await task_service.find_all()
     assert len(all_tasks) >= 2
+    assert next_cursor is None
+
+
+async def test_find_all_paginates_by_cursor(task_service: TaskService):
+    for i in range(5):
+        await task_service.create_task(
+            TaskCreateDTO(title=f"T{i}", description="D"), creator_id=1
+        )
+
+    first_page, cursor = await task_service.find_all(limit=2)
+    second_page, cursor = await task_service.find_all(limit=2, cursor=cursor)
+    last_page, cursor = await task_service.find_all(limit=2, cursor=cursor)
+
+    assert [t["title"] for t in first_page] == ["T0", "T1"]
+    assert [t["title"] for t in second_page] == ["T2", "T3"]
+    assert [t["title"] for t in last_page] == ["T4"]
+    assert cursor is None
+
+
+async def test_find_all_embeds_only_public_assignee_fields(task_service: TaskService):
+    await task_service.create_task(
+        TaskCreateDTO(title="Assigned", description="D", assignee_id=2), creator_id=1
+    )
+    await task_service.create_task(TaskCreateDTO(title="Free", description="D"), creator_id=1)
+
+    tasks, _ = await task_service.find_all()
+
+    assert tasks[0]["assignee"] == {"id": 2, "name": "user2", "email": "user2@example.com"}
+    assert tasks[1]["assignee"] is None
+    assert set(tasks[0]) == {"id", "title", "description", "assignee_id", "is_complete", "assignee"}
+
+
+async def test_find_all_invalid_cursor_raises(task_service: TaskService):
+    with pytest.raises(InvalidCursorException):
+        await task_service.find_all(cursor="not-a-cursor")
+
+
+async def test_find_all_filters(task_service: TaskService, session: AsyncSession):
+    done = await task_service.create_task(
+        TaskCreateDTO(title="Done", description="D", assignee_id=1), creator_id=2
+    )
+    await task_service.update_task(done.id, TaskUpdateDTO(is_complete=True))
+    await task_service.create_task(
+        TaskCreateDTO(title="Open", description="D", assignee_id=1), creator_id=3
+    )
+    await task_service.create_task(
+        TaskCreateDTO(title="Other", description="D"), creator_id=2
+    )
+
+    completed, _ = await task_service.find_all(filters=TaskFilterDTO(is_complete=True))
+    by_creator, _ = await task_service.find_all(filters=TaskFilterDTO(creator_id=2))
+    my_open, _ = await task_service.find_all_for_user(
+        user_id=1, filters=TaskFilterDTO(is_complete=False)
+    )
+
+    assert [t["title"] for t in completed] == ["Done"]
+    assert [t["title"] for t in by_creator] == ["Done", "Other"]
+    assert [t["title"] for t in my_open] == ["Open"]
+
+
+async def test_search_ranks_title_matches_first(task_service: TaskService):
+    await task_service.create_task(
+        TaskCreateDTO(title="Write docs", description="Deploy notes"), creator_id=1
+    )
+    await task_service.create_task(
+        TaskCreateDTO(title="Deploy backend", description="Roll out"), creator_id=1
+    )
+    await task_service.create_task(
+        TaskCreateDTO(title="Unrelated", description="Nothing"), creator_id=1
+    )
+
+    tasks, next_cursor = await task_service.search("deploy")
+
+    assert [t["title"] for t in tasks] == ["Deploy backend", "Write docs"]
+    assert tasks[0]["score"] > tasks[1]["score"]
+    assert next_cursor is None
+
+
+async def test_search_matches_every_term_as_prefix(task_service: TaskService):
+    await task_service.create_task(
+        TaskCreateDTO(title="Deployment checklist", description="Backend"), creator_id=1
+    )
+    await task_service.create_task(
+        TaskCreateDTO(title="Deployment checklist", description="Frontend"), creator_id=1
+    )
+
+    tasks, _ = await task_service.search("DEPLOY back")
+
+    assert [t["description"] for t in tasks] == ["Backend"]
+
+
+async def test_search_treats_query_syntax_as_words(task_service: TaskService):
+    await task_service.create_task(
+        TaskCreateDTO(title="Fix login", description="D"), creator_id=1
+    )
+
+    assert (await task_service.search('login" OR NEAR(*'))[0] == []
+    assert (await task_service.search("?!"))[0] == []
+
+
+async def test_search_paginates_by_rank(task_service: TaskService):
+    for i in range(5):
+        await task_service.create_task(
+            TaskCreateDTO(title="Release " * (i + 1), description=f"Task {i}"), creator_id=1
+        )
+    ranked, _ = await task_service.search("release", limit=5)
+
+    pages, cursor = [], None
+    while True:
+        page, cursor = await task_service.search("release", limit=2, cursor=cursor)
+        pages.append(page)
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [t["id"] for page in pages for t in page] == [t["id"] for t in ranked]
+
+
+async def test_search_follows_writes_and_filters(task_service: TaskService):
+    task = await task_service.create_task(
+        TaskCreateDTO(title="Old title", description="D", assignee_id=2), creator_id=1
+    )
+    other = await task_service.create_task(
+        TaskCreateDTO(title="Renamed sibling", description="D"), creator_id=1
+    )
+
+    await task_service.update_task(task.id, TaskUpdateDTO(title="Renamed task"))
+    assert (await task_service.search("old"))[0] == []
+    mine, _ = await task_service.search("renamed", filters=TaskFilterDTO(assignee_id=2))
+    assert [t["id"] for t in mine] == [task.id]
+    assert mine[0]["assignee"]["email"] == "user2@example.com"
+
+    await task_service.delete_task(other.id)
+    assert [t["id"] for t in (await task_service.search("renamed"))[0]] == [task.id]
+
+
+async def test_bulk_create_tasks(task_service: TaskService, session: AsyncSession):
+
+    results = await task_service.bulk_create_tasks(
+        [
+            TaskCreateDTO(title="T1", description="D", assignee_id=1),
+            TaskCreateDTO(title="T2", description="D", assignee_id=999),
+            TaskCreateDTO(title="T3", description="D"),
+        ],
+        creator_id=1,
+    )
+
+    assert [r.status for r in results] == [
+        BulkItemStatus.created,
+        BulkItemStatus.assignee_not_found,
+        BulkItemStatus.created,
+    ]
+    assert results[1].id is None
+    tasks, _ = await task_service.find_all()
+    assert [t["title"] for t in tasks] == ["T1", "T3"]
+
+
+async def test_bulk_update_tasks(task_service: TaskService, session: AsyncSession):
+    created = await task_service.bulk_create_tasks(
+        [TaskCreateDTO(title=f"T{i}", description="D") for i in range(2)],
+        creator_id=1,
+    )
+    first, second = (r.id for r in created)
+
+    results = await task_service.bulk_update_tasks(
+        [
+            TaskBulkUpdateItemDTO(id=first, title="Renamed", assignee_id=1),
+            TaskBulkUpdateItemDTO(id=second, assignee_id=999),
+            TaskBulkUpdateItemDTO(id=999, is_complete=True),
+        ]
+    )
+
+    assert [r.status for r in results] == [
+        BulkItemStatus.updated,
+        BulkItemStatus.assignee_not_found,
+        BulkItemStatus.not_found,
+    ]
+    session.expire_all()
+    updated = await task_service.get_task_by_id(first)
+    assert updated.title == "Renamed"
+    assert updated.assignee_id == 1
+
+
+async def test_bulk_delete_tasks(task_service: TaskService):
+    created = await task_service.bulk_create_tasks(
+        [TaskCreateDTO(title=f"T{i}", description="D") for i in range(3)],
+        creator_id=1,
+    )
+    ids = [r.id for r in created]
+
+    results = await task_service.bulk_delete_tasks([ids[0], ids[2], 999])
+
+    assert [r.status for r in results] == [
+        BulkItemStatus.deleted,
+        BulkItemStatus.deleted,
+        BulkItemStatus.not_found,
+    ]
+    remaining, _ = await task_service.find_all()
+    assert [t["id"] for t in remaining] == [ids[1]]
+
+
+async def test_stream_export_rows_in_batches(task_service: TaskService):
+    for i in range(5):
+        await task_service.create_task(
+            TaskCreateDTO(title=f"T{i}", description="D", assignee_id=2), creator_id=1
+        )
+
+    batches = [
+        batch
+        async for batch in task_service.stream_export_rows(
+            filters=TaskFilterDTO(assignee_id=2), batch_size=2
+        )
+    ]
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert batches[0][0]["title"] == "T0"
+    assert batches[0][0]["assignee_email"] == "user2@example.com"
+    assert "password" not in batches[0][0]
+
+
+async def test_list_etag_changes_when_a_row_slides_into_a_full_page(
+    task_service: TaskService,
+):
+    for i in range(6):
+        await task_service.create_task(TaskCreateDTO(title=f"T{i}", description="D"), creator_id=1)
+    # The newest write is inside the page, it stays the page's max after the delete
+    await task_service.update_task(2, TaskUpdateDTO(title="Renamed"))
+    etag = await task_service.get_list_etag(limit=3)
+
+    await task_service.delete_task(1)
+
+    page, _ = await task_service.find_all(limit=3)
+    assert [task["id"] for task in page] == [2, 3, 4]
+    assert await task_service.get_list_etag(limit=3) != etag
+
+
+async def test_task_etag_changes_on_update(task_service: TaskService):
+    task = await task_service.create_task(
+        TaskCreateDTO(title="Old", description="Desc", assignee_id=1), creator_id=1
+    )
+    etag = await task_service.get_task_etag(task.id)
+    assert etag == await task_service.get_task_etag(task.id)
+
+    await task_service.update_task(task.id, TaskUpdateDTO(title="New"))
+    assert await task_service.get_task_etag(task.id) != etag
+    assert await task_service.get_task_etag(999) is None
+
+
+async def test_list_etag_changes_on_create_and_delete(task_service: TaskService):
+    await task_service.create_task(
+        TaskCreateDTO(title="T1", description="D"), creator_id=1
+    )
+    etag = await task_service.get_list_etag()
+
+    second = await task_service.create_task(
+        TaskCreateDTO(title="T2", description="D"), creator_id=1
+    )
+    after_create = await task_service.get_list_etag()
+    await task_service.delete_task(second.id)
+    after_delete = await task_service.get_list_etag()
+
+    assert after_create != etag
+    assert after_delete != after_create
+    # Back to the same single task, so the same representation
+    assert after_delete == etag
+    # Other users' lists are unaffected by unassigned tasks
+    assert await task_service.get_list_etag_for_user(user_id=2) == (
+        await task_service.get_list_etag_for_user(user_id=2)
+    )
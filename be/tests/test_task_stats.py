@@ -0,0 +1,170 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.task import Task, TaskBulkUpdateItemDTO, TaskCreateDTO, TaskUpdateDTO
+from models.task_stats import TaskUserStats
+from service.task_service import TaskService
+from service.task_stats_service import TaskStatsService
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("users")]
+
+
+@pytest.fixture
+def stats_service(session: AsyncSession):
+    return TaskStatsService(session=session)
+
+
+async def assert_consistent(stats_service: TaskStatsService):
+    assert await stats_service.check() == []
+
+
+async def user_stats(stats_service: TaskStatsService) -> dict:
+    stats = await stats_service.get_stats()
+    return {
+        user.user_id: (user.assigned_open, user.assigned_completed, user.created)
+        for user in stats.users
+    }
+
+
+async def test_create_counts_assignee_creator_and_totals(
+    task_service: TaskService, stats_service: TaskStatsService
+):
+    await task_service.create_task(
+        TaskCreateDTO(title="A", description="D", assignee_id=2), creator_id=1
+    )
+    await task_service.create_task(TaskCreateDTO(title="B", description="D"), creator_id=1)
+
+    stats = await stats_service.get_stats()
+
+    assert stats.totals.model_dump() == {"open": 2, "completed": 0, "total": 2}
+    assert await user_stats(stats_service) == {1: (0, 0, 2), 2: (1, 0, 0)}
+    await assert_consistent(stats_service)
+
+
+@pytest.mark.parametrize("update_returning", [True, False])
+async def test_update_moves_counts(
+    session: AsyncSession,
+    task_service: TaskService,
+    stats_service: TaskStatsService,
+    monkeypatch,
+    update_returning,
+):
+    monkeypatch.setattr(session.bind.dialect, "update_returning", update_returning)
+    task = await task_service.create_task(
+        TaskCreateDTO(title="A", description="D", assignee_id=2), creator_id=1
+    )
+
+    await task_service.update_task(task.id, TaskUpdateDTO(is_complete=True))
+    assert await user_stats(stats_service) == {1: (0, 0, 1), 2: (0, 1, 0)}
+
+    await task_service.update_task(task.id, TaskUpdateDTO(assignee_id=3))
+    assert await user_stats(stats_service) == {1: (0, 0, 1), 2: (0, 0, 0), 3: (0, 1, 0)}
+
+    await task_service.update_task(task.id, TaskUpdateDTO(assignee_id=-1, is_complete=False))
+    stats = await stats_service.get_stats()
+    assert stats.totals.model_dump() == {"open": 1, "completed": 0, "total": 1}
+    await assert_consistent(stats_service)
+
+
+async def test_failed_update_leaves_counts(
+    task_service: TaskService, stats_service: TaskStatsService
+):
+    task = await task_service.create_task(
+        TaskCreateDTO(title="A", description="D", assignee_id=2), creator_id=1
+    )
+
+    with pytest.raises(HTTPException):
+        await task_service.update_task(999, TaskUpdateDTO(is_complete=True))
+    await task_service.update_task(task.id, TaskUpdateDTO(title="Renamed"))
+
+    assert await user_stats(stats_service) == {1: (0, 0, 1), 2: (1, 0, 0)}
+    await assert_consistent(stats_service)
+
+
+@pytest.mark.parametrize("delete_returning", [True, False])
+async def test_delete_removes_counts(
+    session: AsyncSession,
+    task_service: TaskService,
+    stats_service: TaskStatsService,
+    monkeypatch,
+    delete_returning,
+):
+    monkeypatch.setattr(session.bind.dialect, "delete_returning", delete_returning)
+    task = await task_service.create_task(
+        TaskCreateDTO(title="A", description="D", assignee_id=2), creator_id=1
+    )
+    await task_service.update_task(task.id, TaskUpdateDTO(is_complete=True))
+
+    await task_service.delete_task(task.id)
+    with pytest.raises(HTTPException):
+        await task_service.delete_task(task.id)
+
+    stats = await stats_service.get_stats()
+    assert stats.totals.model_dump() == {"open": 0, "completed": 0, "total": 0}
+    await assert_consistent(stats_service)
+
+
+async def test_bulk_writes_keep_counts(
+    task_service: TaskService, stats_service: TaskStatsService
+):
+    results = await task_service.bulk_create_tasks(
+        [TaskCreateDTO(title=f"T{i}", description="D", assignee_id=(i % 3) + 1) for i in range(6)],
+        creator_id=2,
+    )
+    ids = [r.id for r in results]
+    await task_service.bulk_update_tasks(
+        [
+            TaskBulkUpdateItemDTO(id=ids[0], is_complete=True),
+            TaskBulkUpdateItemDTO(id=ids[1], assignee_id=-1),
+            TaskBulkUpdateItemDTO(id=ids[2], assignee_id=1, is_complete=True),
+            TaskBulkUpdateItemDTO(id=999, is_complete=True),
+        ]
+    )
+    await assert_consistent(stats_service)
+
+    await task_service.bulk_delete_tasks(ids[:4] + [999])
+
+    assert (await stats_service.get_stats()).totals.total == 2
+    await assert_consistent(stats_service)
+
+
+async def test_rebuild_repairs_drift(
+    session: AsyncSession, task_service: TaskService, stats_service: TaskStatsService
+):
+    task = await task_service.create_task(
+        TaskCreateDTO(title="A", description="D", assignee_id=2), creator_id=1
+    )
+    # Written behind the service's back, the counts no longer match
+    await session.exec(update(Task).where(Task.id == task.id).values(is_complete=True))
+    await session.exec(
+        update(TaskUserStats).where(TaskUserStats.user_id == 1).values(created=7)
+    )
+    await session.commit()
+
+    drift = await stats_service.check()
+    assert len(drift) == 3
+
+    totals = await stats_service.rebuild()
+
+    assert totals == {"open": 0, "completed": 1}
+    assert await user_stats(stats_service) == {1: (0, 0, 1), 2: (0, 1, 0)}
+    await assert_consistent(stats_service)
+
+
+async def test_stats_page_users(task_service: TaskService, stats_service: TaskStatsService):
+    for assignee_id in (1, 2, 3):
+        await task_service.create_task(
+            TaskCreateDTO(title="A", description="D", assignee_id=assignee_id), creator_id=1
+        )
+
+    first = await stats_service.get_stats(limit=2)
+    second = await stats_service.get_stats(limit=2, cursor=first.next_cursor)
+    only = await stats_service.get_stats(user_id=3)
+
+    assert [u.user_id for u in first.users] == [1, 2]
+    assert [u.user_id for u in second.users] == [3]
+    assert second.next_cursor is None
+    assert [u.user_id for u in only.users] == [3]
+    assert only.totals.total == 3
@@ -5,6 +5,8 @@ from service.user_service import UserService
 from utils.exception import UserNotFoundException
 from utils.security import verify_password
 
+pytestmark = pytest.mark.anyio
+
 
 @pytest.fixture
 def user_data():
@@ -13,75 +15,125 @@ def user_data():
     )   
 
 
-def test_register_user_success(user_service: UserService, user_data: UserCreateDTO):
-    user = user_service.register_user(user_data)
+async def test_register_user_success(user_service: UserService, user_data: UserCreateDTO):
+    user = await user_service.register_user(user_data)
     assert user.id is not None
     assert user.email == user_data.email
     assert verify_password(user_data.password, user.password)
 
 
-def test_register_user_conflict(user_service: UserService, user_data: UserCreateDTO):
-    user_service.register_user(user_data)
+async def test_register_user_conflict(user_service: UserService, user_data: UserCreateDTO):
+    await user_service.register_user(user_data)
     with pytest.raises(HTTPException) as e:
-        user_service.register_user(user_data)
+        await user_service.register_user(user_data)
     assert e.value.status_code == 409
 
 
-def test_get_user_by_email_found(user_service: UserService, user_data: UserCreateDTO):
-    created = user_service.register_user(user_data)
-    found = user_service.get_user_by_email(user_data.email)
+async def test_get_user_by_email_found(user_service: UserService, user_data: UserCreateDTO):
+    created = await user_service.register_user(user_data)
+    found = await user_service.get_user_by_email(user_data.email)
     assert found.id == created.id
 
 
-def test_get_user_by_email_not_found(user_service: UserService):
+async def test_get_user_by_email_not_found(user_service: UserService):
     with pytest.raises(UserNotFoundException):
-        user_service.get_user_by_email("missing@example.com")
+        await user_service.get_user_by_email("missing@example.com")
 
 
-def test_get_user_by_id_found(user_service: UserService, user_data: UserCreateDTO):
-    created = user_service.register_user(user_data)
-    found = user_service.get_user_by_id(created.id)
+async def test_get_user_by_id_found(user_service: UserService, user_data: UserCreateDTO):
+    created = await user_service.register_user(user_data)
+    found = await user_service.get_user_by_id(created.id)
     assert found.email == user_data.email
 
 
-def test_get_user_by_id_not_found(user_service: UserService):
+async def test_get_user_by_id_not_found(user_service: UserService):
     with pytest.raises(UserNotFoundException):
-        user_service.get_user_by_id(999)
+        await user_service.get_user_by_id(999)
 
 
-def test_deactivate_user(user_service: UserService, user_data: UserCreateDTO):
-    user = user_service.register_user(user_data)
-    user_service.deactivate_user(user.id)
-    updated = user_service.get_user_by_id(user.id)
+async def test_deactivate_user(user_service: UserService, user_data: UserCreateDTO):
+    user = await user_service.register_user(user_data)
+    await user_service.deactivate_user(user.id)
+    updated = await user_service.get_user_by_id(user.id)
     assert updated.is_active is False
 
 
-def test_activate_user(user_service: UserService, user_data: UserCreateDTO):
-    user = user_service.register_user(user_data)
-    user_service.deactivate_user(user.id)
-    user_service.activate_user(user.id)
-    updated = user_service.get_user_by_id(user.id)
+async def test_activate_user(user_service: UserService, user_data: UserCreateDTO):
+    user = await user_service.register_user(user_data)
+    await user_service.deactivate_user(user.id)
+    await user_service.activate_user(user.id)
+    updated = await user_service.get_user_by_id(user.id)
     assert updated.is_active is True
 
 
-def test_get_all_users_only_active(user_service: UserService, user_data: UserCreateDTO):
-    user1 = user_service.register_user(user_data)
-    user2 = user_service.register_user(
+async def test_deactivate_user_not_found(user_service: UserService):
+    with pytest.raises(HTTPException) as e:
+        await user_service.deactivate_user(999)
+    assert e.value.status_code == 404
+
+
+async def test_get_all_users_only_active(user_service: UserService, user_data: UserCreateDTO):
+    user1 = await user_service.register_user(user_data)
+    user2 = await user_service.register_user(
         UserCreateDTO(email="second@example.com", password="123", name="Second")
     )
-    user_service.deactivate_user(user2.id)
-    active_users = user_service.get_all_users()
+    await user_service.deactivate_user(user2.id)
+    active_users, _ = await user_service.get_all_users()
     assert len(active_users) == 1
     assert active_users[0].email == user1.email
 
 
-def test_get_all_users_include_inactive(
+async def test_get_all_users_include_inactive(
     user_service: UserService, user_data: UserCreateDTO
 ):
-    user1 = user_service.register_user(user_data)
-    user2 = user_service.register_user(
+    user1 = await user_service.register_user(user_data)
+    user2 = await user_service.register_user(
         UserCreateDTO(email="second@example.com", password="123", name="Second")
     )
-    user_service.deactivate_user(user2.id)
-    all_users = user_service.get_all_users(only_active=False)
+    await user_service.deactivate_user(user2.id)
+    all_users, _ = await user_service.get_all_users(only_active=False)
     assert len(all_users) == 2
+
+
+async def test_get_all_users_paginates(user_service: UserService):
+    for i in range(3):
+        await user_service.register_user(
+            UserCreateDTO(email=f"user{i}@example.com", password="123", name=f"U{i}")
+        )
+
+    first_page, cursor = await user_service.get_all_users(limit=2)
+    second_page, next_cursor = await user_service.get_all_users(limit=2, cursor=cursor)
+
+    assert [u.name for u in first_page] == ["U0", "U1"]
+    assert [u.name for u in second_page] == ["U2"]
+    assert next_cursor is None
+
+
+async def test_list_etag_changes_on_deactivate(
+    user_service: UserService, user_data: UserCreateDTO
+):
+    user = await user_service.register_user(user_data)
+    etag = await user_service.get_list_etag(only_active=False)
+    assert etag == await user_service.get_list_etag(only_active=False)
+
+    await user_service.deactivate_user(user.id)
+    assert await user_service.get_list_etag(only_active=False) != etag
+
+
+async def test_list_etag_changes_when_a_user_slides_into_a_full_page(
+    user_service: UserService,
+):
+    users = [
+        await user_service.register_user(
+            UserCreateDTO(email=f"user{i}@example.com", password="123", name=f"U{i}")
+        )
+        for i in range(3)
+    ]
+    # The newest write is inside the page, it stays the page's max after the deactivation
+    await user_service.deactivate_user(users[1].id)
+    await user_service.activate_user(users[1].id)
+    etag = await user_service.get_list_etag(limit=1)
+
+    await user_service.deactivate_user(users[0].id)
+
+    assert await user_service.get_list_etag(limit=1) != etag
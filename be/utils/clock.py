@@ -0,0 +1,6 @@
+from datetime import datetime, timezone
+
+
+def utc_now() -> datetime:
+    # Naive UTC, MySQL DATETIME columns carry no timezone
+    return datetime.now(timezone.utc).replace(tzinfo=None)
@@ -1,24 +1,73 @@
-import os
-from fastapi import Depends, HTTPException, status
+from datetime import timedelta
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
+from config import settings
 from models.user import UserOutDTO
 from service.user_service import UserServiceDep
+from utils.exception import UserNotFoundException
+from utils.principal_cache import PRINCIPAL_CACHE_TRUST_TOKEN_CLAIMS, principal_cache
+from utils.security import create_access_token
 
-from dotenv import load_dotenv
-
-load_dotenv()
-
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-TOKEN_EXPIRE_MINUTES = int(os.getenv("TOKEN_EXPIRE_MINUTES"))
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
+TOKEN_EXPIRE_MINUTES = settings.token_expire_minutes
+# Lifetime of the query string tokens of GET /tasks/events, they only open a stream
+TASK_EVENTS_TOKEN_SECONDS = settings.task_events_token_seconds
+EVENTS_SCOPE = "events"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login", auto_error=False)
 
 
-def get_current_user(
+async def get_current_user(
     user_service: UserServiceDep, token: str = Depends(oauth2_scheme)
+) -> UserOutDTO:
+    return await _authenticate(user_service, token)
+
+
+async def get_event_stream_user(
+    user_service: UserServiceDep,
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = Query(
+        None, description="Token of POST /tasks/events/token, for clients that cannot send headers"
+    ),
+) -> UserOutDTO:
+    """
+    get_current_user for GET /tasks/events. Browsers open it with EventSource,
+    which cannot send an Authorization header, so a short-lived events token
+    is accepted in the query string too. Access tokens are not: URLs end up
+    in proxy and server logs.
+    """
+    if token is not None:
+        return await _authenticate(user_service, token)
+    if access_token is not None:
+        return await _authenticate(user_service, access_token, scope=EVENTS_SCOPE)
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def create_events_token(principal: UserOutDTO) -> str:
+    return create_access_token(
+        {
+            "sub": principal.email,
+            "id": principal.id,
+            "name": principal.name,
+            "is_admin": principal.is_admin,
+            "scope": EVENTS_SCOPE,
+        },
+        expires_delta=timedelta(seconds=TASK_EVENTS_TOKEN_SECONDS),
+    )
+
+
+async def _authenticate(
+    user_service: UserServiceDep, token: str, scope: Optional[str] = None
 ) -> UserOutDTO:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -31,21 +80,50 @@ def get_current_user(
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM)
         email: str = payload.get("sub")
-        if email is None:
+        # Access tokens have no scope, scoped tokens only work where asked for
+        if email is None or payload.get("scope") != scope:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = user_service.get_user_by_email(email)
-    if user is None:
+
+    user_id = payload.get("id")
+    if user_id is not None:
+        principal = principal_cache.get(user_id)
+        if principal is None and PRINCIPAL_CACHE_TRUST_TOKEN_CLAIMS:
+            principal = _principal_from_claims(payload)
+        if principal is not None:
+            # Not read from the user row, another worker may have deactivated them
+            if await principal_cache.is_deactivated(user_id):
+                raise deactivated_exception
+            return principal
+
+    try:
+        user = await user_service.get_user_by_email(email)
+    except UserNotFoundException:
         raise credentials_exception
 
     if not user.is_active:
         raise deactivated_exception
 
-    return UserOutDTO.model_validate(user)
+    principal = UserOutDTO.model_validate(user)
+    principal_cache.set(principal)
+    return principal
+
+
+def _principal_from_claims(payload: dict) -> UserOutDTO | None:
+    # Tokens issued before the name/is_admin claims were added fall back to the DB
+    if "name" not in payload or "is_admin" not in payload:
+        return None
+    return UserOutDTO(
+        id=payload["id"],
+        email=payload["sub"],
+        name=payload["name"],
+        is_admin=payload["is_admin"],
+        is_active=True,
+    )
 
 
-def admin_required(current_user: UserOutDTO = Depends(get_current_user)) -> UserOutDTO:
+async def admin_required(current_user: UserOutDTO = Depends(get_current_user)) -> UserOutDTO:
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required"
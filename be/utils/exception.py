@@ -4,3 +4,23 @@ class UserNotFoundException(Exception):
 
 class UserAlreadyExistsException(Exception):
     """User already exists!"""
+
+
+class InvalidCursorException(Exception):
+    """Pagination cursor is malformed!"""
+
+
+class PasswordHasherOverloadedException(Exception):
+    """Password hashing queue is full!"""
+
+
+class ChangeCursorExpiredException(Exception):
+    """Change cursor is older than the retained tombstones!"""
+
+
+class QueryBudgetExceededException(Exception):
+    """Request issued more DB queries than its route's budget!"""
+
+
+class SingleFlightLeaderCancelledException(Exception):
+    """Request running a coalesced read went away before it finished!"""
@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, List
+
+EXPORT_COLUMNS = [
+    "id",
+    "title",
+    "description",
+    "is_complete",
+    "assignee_id",
+    "creator_id",
+    "assignee_name",
+    "assignee_email",
+]
+
+# Spreadsheets run cells starting with these as formulas
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+async def encode_ndjson(batches: AsyncIterator[List[dict]]) -> AsyncIterator[str]:
+    async for rows in batches:
+        yield "".join(json.dumps(row) + "\n" for row in rows)
+
+
+async def encode_csv(batches: AsyncIterator[List[dict]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows({key: _csv_cell(value) for key, value in row.items()} for row in rows)
+        yield buffer.getvalue()
+
+
+def _csv_cell(value):
+    # Titles, descriptions and names are user input, quoted so they stay text
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
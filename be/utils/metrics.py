@@ -0,0 +1,315 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import settings
+from utils.exception import QueryBudgetExceededException
+
+logger = logging.getLogger(__name__)
+
+# Adds a Server-Timing header with app and DB time to every response
+DEBUG = settings.debug
+# Requests over their route's query budget raise instead of only being
+# logged, the tests run this way
+QUERY_BUDGET_STRICT = settings.query_budget_strict
+
+METRICS_PREFIX = "taskmanager"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Cumulative histogram per label set, rendered in the Prometheus text format."""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            # One counter per bucket plus +Inf, then sum and count
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, labels: tuple) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def sum(self, labels: tuple) -> float:
+        series = self._series.get(labels)
+        return series[1] if series else 0.0
+
+    def clear(self):
+        self._series.clear()
+
+    def render(self, name: str, help_text: str, label_names: tuple) -> list[str]:
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            base = _format_labels(label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = _format_labels(("le",), (_format_value(bound),))
+                lines.append(f"{name}_bucket{_merge_labels(base, le)} {cumulative}")
+            lines.append(f"{name}_sum{base} {_format_value(total)}")
+            lines.append(f"{name}_count{base} {count}")
+        return lines
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    # Declared by the route with query_budget()
+    query_budget: Optional[int] = None
+
+    @property
+    def over_budget(self) -> bool:
+        return self.query_budget is not None and self.queries > self.query_budget
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+class RequestMetrics:
+    """
+    Per route latency, status and DB usage, fed by MetricsMiddleware and
+    cursor events of every attached engine.
+
+    Queries are attributed to the request whose context they run in,
+    anything else (startup, background work) only counts towards the totals.
+    """
+
+    def __init__(self, strict_budgets: bool = QUERY_BUDGET_STRICT):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.strict_budgets = strict_budgets
+        self.reset()
+
+    def reset(self):
+        self.latency.clear()
+        self.db_queries.clear()
+        self.db_time.clear()
+        self.responses: dict[tuple, int] = {}
+        self.in_flight = 0
+        self.queries_total = 0
+        self.db_seconds_total = 0.0
+        self.over_budget: dict[tuple, int] = {}
+
+    def attach(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        context._metrics_query_start = time.perf_counter()
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        elapsed = time.perf_counter() - context._metrics_query_start
+        self.queries_total += 1
+        self.db_seconds_total += elapsed
+
+        stats = _current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    def start_request(self) -> RequestStats:
+        stats = RequestStats()
+        _current_request.set(stats)
+        self.in_flight += 1
+        return stats
+
+    def finish_request(
+        self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats
+    ):
+        self.in_flight -= 1
+        labels = (method, route)
+        self.latency.observe(labels, seconds)
+        self.db_queries.observe(labels, stats.queries)
+        self.db_time.observe(labels, stats.db_seconds)
+        key = (method, route, str(status_code))
+        self.responses[key] = self.responses.get(key, 0) + 1
+        if stats.over_budget:
+            self.over_budget[labels] = self.over_budget.get(labels, 0) + 1
+            logger.warning(
+                "%s %s issued %d DB queries, over its budget of %d",
+                method, route, stats.queries, stats.query_budget,
+            )
+
+    def render(self, gauges: Optional[dict[str, dict]] = None) -> str:
+        """
+        Prometheus text exposition of the request metrics, `gauges` maps a
+        subsystem name to a flat stats dict such as the pool snapshot.
+        """
+        route_labels = ("method", "route")
+        lines = self.latency.render(
+            f"{METRICS_PREFIX}_http_request_duration_seconds",
+            "Request latency by route",
+            route_labels,
+        )
+        lines += self.db_queries.render(
+            f"{METRICS_PREFIX}_http_request_db_queries",
+            "DB queries issued per request by route",
+            route_labels,
+        )
+        lines += self.db_time.render(
+            f"{METRICS_PREFIX}_http_request_db_seconds",
+            "Time spent in DB queries per request by route",
+            route_labels,
+        )
+
+        name = f"{METRICS_PREFIX}_http_responses_total"
+        lines += [f"# HELP {name} Responses by route and status", f"# TYPE {name} counter"]
+        for labels, count in sorted(self.responses.items()):
+            lines.append(f"{name}{_format_labels(route_labels + ('status',), labels)} {count}")
+
+        name = f"{METRICS_PREFIX}_http_requests_over_query_budget_total"
+        lines += [
+            f"# HELP {name} Requests that issued more DB queries than their route's budget",
+            f"# TYPE {name} counter",
+        ]
+        for labels, count in sorted(self.over_budget.items()):
+            lines.append(f"{name}{_format_labels(route_labels, labels)} {count}")
+
+        lines += _render_single(
+            f"{METRICS_PREFIX}_http_requests_in_flight", "gauge",
+            "Requests currently being served", self.in_flight,
+        )
+        lines += _render_single(
+            f"{METRICS_PREFIX}_db_queries_total", "counter",
+            "DB queries issued by this process", self.queries_total,
+        )
+        lines += _render_single(
+            f"{METRICS_PREFIX}_db_query_seconds_total", "counter",
+            "Time spent in DB queries by this process", self.db_seconds_total,
+        )
+
+        for subsystem, stats in (gauges or {}).items():
+            for key, value in stats.items():
+                if isinstance(value, (int, float)):
+                    lines += _render_single(
+                        f"{METRICS_PREFIX}_{subsystem}_{key}", "gauge",
+                        f"{subsystem} {key}", value,
+                    )
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+def query_budget(max_queries: int):
+    """
+    Route dependency declaring how many DB queries a request may issue,
+    authentication included: `dependencies=[Depends(query_budget(3))]`.
+    A fixed budget on a listing catches N+1 lazy loads, whose count grows
+    with the page.
+    """
+
+    # Async, a sync dependency would go through the thread pool
+    async def declare_query_budget():
+        stats = _current_request.get()
+        if stats is not None:
+            stats.query_budget = max_queries
+
+    return declare_query_budget
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware, so the request context (and with it the query
+    attribution) is the one the endpoint and its dependencies run in.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics, server_timing: bool = DEBUG):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stats = self.metrics.start_request()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    elapsed = time.perf_counter() - start
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"server-timing", _server_timing(elapsed, stats).encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route_path = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            self.metrics.finish_request(
+                scope["method"],
+                route_path,
+                status_code,
+                time.perf_counter() - start,
+                stats,
+            )
+        if self.metrics.strict_budgets and stats.over_budget:
+            raise QueryBudgetExceededException(
+                f"{scope['method']} {route_path} issued {stats.queries} DB queries, "
+                f"budget {stats.query_budget}"
+            )
+
+
+def _server_timing(elapsed: float, stats: RequestStats) -> str:
+    return (
+        f'app;dur={elapsed * 1000:.2f}, '
+        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} queries"'
+    )
+
+
+def _render_single(name: str, kind: str, help_text: str, value) -> list[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {_format_value(value)}"]
+
+
+def _format_value(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    escaped = (
+        str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values
+    )
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def _merge_labels(base: str, extra: str) -> str:
+    if base == "{}":
+        return extra
+    return base[:-1] + "," + extra[1:]
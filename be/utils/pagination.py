@@ -0,0 +1,86 @@
+import base64
+import json
+from typing import Optional, Sequence, Tuple, TypeVar
+
+from utils.exception import InvalidCursorException
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+T = TypeVar("T")
+
+
+def encode_cursor(last_id: int) -> str:
+    return _encode({"id": last_id})
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    last_id = _decode(cursor).get("id")
+    if not isinstance(last_id, int):
+        raise InvalidCursorException
+    return last_id
+
+
+def encode_ranked_cursor(score: float, last_id: int) -> str:
+    """Cursor of a listing ordered by descending score, then id."""
+    return _encode({"score": score, "id": last_id})
+
+
+def decode_ranked_cursor(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    if not cursor:
+        return None
+    payload = _decode(cursor)
+    score, last_id = payload.get("score"), payload.get("id")
+    if not isinstance(score, (int, float)) or not isinstance(last_id, int):
+        raise InvalidCursorException
+    return float(score), last_id
+
+
+def encode_sequence_cursor(seq: int) -> str:
+    """Cursor of a change feed, the last change sequence number seen."""
+    return _encode({"seq": seq})
+
+
+def decode_sequence_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    seq = _decode(cursor).get("seq")
+    if not isinstance(seq, int) or seq < 0:
+        raise InvalidCursorException
+    return seq
+
+
+def _encode(payload: dict) -> str:
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursorException
+    if not isinstance(payload, dict):
+        raise InvalidCursorException
+    return payload
+
+
+def keyset_paginate(query, id_column, limit: int, cursor: Optional[str]):
+    """
+    Restrict a select to the page after the cursor, ordered by id.
+    One extra row is fetched to detect whether a next page exists.
+    """
+    last_id = decode_cursor(cursor)
+    if last_id is not None:
+        query = query.where(id_column > last_id)
+    return query.order_by(id_column).limit(limit + 1)
+
+
+def split_page(rows: Sequence[T], limit: int) -> Tuple[Sequence[T], Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+    items = rows[:limit]
+    return items, encode_cursor(items[-1].id)
@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import settings
+from models.user import UserOutDTO
+from utils.shared_state import SharedState, shared_state
+
+PRINCIPAL_CACHE_SIZE = settings.principal_cache_size
+PRINCIPAL_CACHE_TTL_SECONDS = settings.principal_cache_ttl_seconds
+PRINCIPAL_CACHE_TRUST_TOKEN_CLAIMS = settings.principal_cache_trust_token_claims
+TOKEN_EXPIRE_MINUTES = settings.token_expire_minutes
+
+
+class PrincipalCache:
+    """
+    Bounded LRU + TTL cache of authenticated users, keyed by user id.
+
+    The cache is per process. Deactivated ids are kept in the shared state
+    for the token lifetime instead, where every worker sees them: a principal
+    served from the cache or rebuilt from token claims is checked against
+    them, so a deactivation locks the user out everywhere at once.
+    """
+
+    def __init__(
+        self,
+        max_size: int = PRINCIPAL_CACHE_SIZE,
+        ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS,
+        revocation_ttl_seconds: float = TOKEN_EXPIRE_MINUTES * 60,
+        revocations: SharedState = shared_state,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.revocation_ttl_seconds = revocation_ttl_seconds
+        self.revocations = revocations
+        self._entries: OrderedDict[int, tuple[float, UserOutDTO]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: int) -> Optional[UserOutDTO]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, principal = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return principal
+
+    def set(self, principal: UserOutDTO):
+        if self.max_size <= 0:
+            return
+        self._entries[principal.id] = (time.monotonic() + self.ttl_seconds, principal)
+        self._entries.move_to_end(principal.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+    async def mark_deactivated(self, user_id: int):
+        self.invalidate(user_id)
+        # Tokens issued before the deactivation are refused until they expire
+        await self.revocations.set(_revocation_key(user_id), self.revocation_ttl_seconds)
+
+    async def mark_activated(self, user_id: int):
+        self.invalidate(user_id)
+        await self.revocations.delete(_revocation_key(user_id))
+
+    async def is_deactivated(self, user_id: int) -> bool:
+        return await self.revocations.exists(_revocation_key(user_id))
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def _revocation_key(user_id: int) -> str:
+    return f"revoked:{user_id}"
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# /proc fields -> stats keys, smaps_rollup has PSS, status only RSS
+MEMORY_FIELDS = {"Rss": "rss_bytes", "Pss": "pss_bytes", "VmRSS": "rss_bytes"}
+
+
+def memory_usage(pid="self") -> dict:
+    """
+    Resident and proportional set size of a process in bytes, from /proc
+    (Linux, {} elsewhere). PSS splits the pages shared with other processes,
+    such as the app preloaded before forking, between them: summed over the
+    workers it is their actual footprint, where RSS counts shared pages in
+    every worker.
+    """
+    usage = {}
+    for path in (f"/proc/{pid}/smaps_rollup", f"/proc/{pid}/status"):
+        try:
+            with open(path) as file:
+                for line in file:
+                    key, _, value = line.partition(":")
+                    name = MEMORY_FIELDS.get(key)
+                    if name and name not in usage:
+                        usage[name] = int(value.split()[0]) * 1024
+        except OSError:
+            continue
+        if usage:
+            break
+    return usage
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started, forked or not (Linux)."""
+    try:
+        with open("/proc/self/stat") as file:
+            # Fields after the command name, which may contain spaces
+            fields = file.read().rpartition(")")[2].split()
+        with open("/proc/uptime") as file:
+            uptime = float(file.read().split()[0])
+    except OSError:
+        return None
+    return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+
+
+class ProcessStats:
+    """
+    Startup time and memory of this process, the figures that decide how
+    many workers fit a machine. Startup counts from the process start, so a
+    forked worker does not count the app import it inherited.
+    """
+
+    def __init__(self):
+        # Fallback start where /proc is not available
+        self._imported_at = time.monotonic()
+        self.startup_seconds: Optional[float] = None
+
+    def ready(self) -> float:
+        age = process_age()
+        self.startup_seconds = age if age is not None else time.monotonic() - self._imported_at
+        return self.startup_seconds
+
+    def stats(self) -> dict:
+        stats = memory_usage()
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Kilobytes on Linux, bytes on macOS
+            stats["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+        if self.startup_seconds is not None:
+            stats["startup_seconds"] = self.startup_seconds
+        return stats
+
+
+process_stats = ProcessStats()
@@ -0,0 +1,341 @@
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from jose import JWTError, jwt
+from starlette.routing import Match
+
+from config import settings
+from utils.security import ALGORITHM, SECRET_KEY
+
+logger = logging.getLogger(__name__)
+
+# local: buckets of this process, redis: shared by every worker, none: no rate limits
+RATE_LIMIT_BACKEND = settings.rate_limit_backend.lower()
+RATE_LIMIT_REDIS_URL = settings.rate_limit_redis_url
+RATE_LIMIT_MAX_KEYS = settings.rate_limit_max_keys
+# Per client bucket shared by every route without a limit of its own
+RATE_LIMIT_DEFAULT = settings.rate_limit_default
+# "METHOD /route=rate" pairs separated by commas, a route gets its own bucket
+RATE_LIMIT_ROUTES = settings.rate_limit_routes
+# Requests served at once by this process before new ones get 503, 0 disables
+MAX_IN_FLIGHT_REQUESTS = settings.max_in_flight_requests
+
+# Never limited: monitoring must keep working under load
+EXEMPT_ROUTES = {"/health", "/health/db-pool", "/health/task-cache", "/metrics"}
+# Open for as long as the client listens, not counted as in flight
+STREAMING_ROUTES = {"/tasks/events"}
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    # Burst size, refilled evenly over the period
+    capacity: int
+    period_seconds: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """From "<count>/<second|minute|hour>", e.g. "10/minute"."""
+        count, _, period = value.strip().partition("/")
+        return cls(capacity=int(count), period_seconds=PERIODS[period.strip()])
+
+
+def parse_route_limits(value: str) -> dict[str, RateLimit]:
+    limits = {}
+    for item in filter(None, (item.strip() for item in value.split(","))):
+        route, _, rate = item.rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        limits[f"{method.upper()} {path.strip()}"] = RateLimit.parse(rate)
+    return limits
+
+
+def take_token(
+    state: Optional[tuple[float, float]], limit: RateLimit, now: float
+) -> tuple[bool, tuple[float, float], float]:
+    """
+    Token bucket step: (allowed, new (tokens, timestamp) state, seconds
+    until a token is available when denied).
+    """
+    tokens, updated = state if state is not None else (float(limit.capacity), now)
+    tokens = min(limit.capacity, tokens + max(now - updated, 0) * limit.refill_per_second)
+    if tokens >= 1:
+        return True, (tokens - 1, now), 0.0
+    return False, (tokens, now), (1 - tokens) / limit.refill_per_second
+
+
+class LocalRateLimitBackend:
+    """Buckets of this process in a bounded LRU map."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, limit: RateLimit, now: float) -> tuple[bool, float]:
+        allowed, state, retry_after = take_token(self._buckets.get(key), limit, now)
+        self._buckets[key] = state
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            # The least recent client loses its bucket, it starts over full
+            self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def clear(self):
+        self._buckets.clear()
+
+    def stats(self) -> dict:
+        return {"keys": len(self._buckets)}
+
+
+# Same step as take_token, atomic in Redis. Buckets expire once full again.
+TAKE_TOKEN_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - updated, 0) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Buckets shared by every worker, over an asyncio Redis client or anything
+    with the same eval() coroutine. One round trip per request.
+    """
+
+    def __init__(self, client, prefix: str = "taskmanager:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def take(self, key: str, limit: RateLimit, now: float) -> tuple[bool, float]:
+        allowed, retry_after = await self.client.eval(
+            TAKE_TOKEN_SCRIPT, 1, self.prefix + key, limit.capacity, limit.refill_per_second, now
+        )
+        if isinstance(retry_after, bytes):
+            retry_after = retry_after.decode()
+        return bool(int(allowed)), float(retry_after)
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+# Verified token -> (expiry, subject), clients send the same token many times
+_token_subjects: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+
+def token_subject(token: str) -> Optional[str]:
+    cached = _token_subjects.get(token)
+    if cached is not None and cached[0] > time.time():
+        _token_subjects.move_to_end(token)
+        return cached[1]
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM)
+    except JWTError:
+        return None
+    subject = payload.get("sub")
+    if subject and payload.get("exp"):
+        _token_subjects[token] = (float(payload["exp"]), subject)
+        while len(_token_subjects) > RATE_LIMIT_MAX_KEYS:
+            _token_subjects.popitem(last=False)
+    return subject
+
+
+def client_key(scope) -> str:
+    """
+    The JWT subject of a valid bearer token, the client IP otherwise (login,
+    register, bad tokens). Verified: a forged subject must not get a bucket.
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                subject = token_subject(token)
+                if subject:
+                    return f"user:{subject}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimiter:
+    """
+    Per client token buckets: one per configured route, and one default
+    bucket shared by the other routes. A backend failure lets the request
+    through, the limiter must not take the API down with it.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        default: Optional[RateLimit] = RateLimit.parse(RATE_LIMIT_DEFAULT),
+        routes: Optional[dict[str, RateLimit]] = None,
+    ):
+        self.backend = backend
+        self.default = default
+        self.routes = parse_route_limits(RATE_LIMIT_ROUTES) if routes is None else routes
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+        # Kept by RateLimitMiddleware
+        self.in_flight = 0
+        self.shed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def check(self, route_key: str, client: str) -> Optional[float]:
+        """None when the request may go ahead, else seconds to wait."""
+        limit = self.routes.get(route_key)
+        bucket = route_key
+        if limit is None:
+            limit, bucket = self.default, "default"
+        if limit is None:
+            return None
+        try:
+            allowed, retry_after = await self.backend.take(
+                f"{bucket}:{client}", limit, time.time()
+            )
+        except Exception:
+            self.errors += 1
+            logger.exception("Rate limit backend failed, request let through")
+            return None
+        if allowed:
+            self.allowed += 1
+            return None
+        self.limited += 1
+        return retry_after
+
+    def clear(self):
+        _token_subjects.clear()
+        if self.backend is not None:
+            self.backend.clear()
+        self.allowed = self.limited = self.errors = self.shed = 0
+
+    def stats(self) -> dict:
+        return {
+            "backend": RATE_LIMIT_BACKEND if self.backend is not None else "none",
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "shed": self.shed,
+            **(self.backend.stats() if self.backend is not None else {}),
+        }
+
+
+def create_backend(name: str = RATE_LIMIT_BACKEND):
+    if name == "none":
+        return None
+    if name == "redis":
+        # Optional dependency, only needed to share the buckets between workers
+        import redis.asyncio as redis
+
+        return RedisRateLimitBackend(redis.from_url(RATE_LIMIT_REDIS_URL))
+    return LocalRateLimitBackend()
+
+
+rate_limiter = RateLimiter(create_backend())
+
+
+class RateLimitMiddleware:
+    """
+    Sheds load before any work is done: 503 once MAX_IN_FLIGHT_REQUESTS are
+    being served, 429 when the client's bucket for the route is empty. Both
+    carry Retry-After. Plain ASGI, routes are matched against the app's
+    router to find their template.
+    """
+
+    def __init__(
+        self,
+        app,
+        router,
+        limiter: RateLimiter = rate_limiter,
+        max_in_flight: int = MAX_IN_FLIGHT_REQUESTS,
+    ):
+        self.app = app
+        self.router = router
+        self.limiter = limiter
+        self.max_in_flight = max_in_flight
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = self._route_path(scope)
+        if path in EXEMPT_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        counted = path not in STREAMING_ROUTES
+        limiter = self.limiter
+        if counted and self.max_in_flight and limiter.in_flight >= self.max_in_flight:
+            limiter.shed += 1
+            await _reject(send, 503, "Server is busy, try again shortly", 1)
+            return
+
+        if limiter.enabled:
+            retry_after = await limiter.check(f"{scope['method']} {path}", client_key(scope))
+            if retry_after is not None:
+                await _reject(send, 429, "Too many requests", retry_after)
+                return
+
+        if not counted:
+            await self.app(scope, receive, send)
+            return
+        limiter.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.in_flight -= 1
+
+    def _route_path(self, scope) -> Optional[str]:
+        for route in self.router.routes:
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                # Lets the metrics label rejected requests with their route
+                scope["route"] = child_scope.get("route", route)
+                return route.path
+        return None
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(math.ceil(retry_after), 1)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
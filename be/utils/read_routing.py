@@ -0,0 +1,108 @@
+from typing import Optional
+
+from fastapi import Request
+from jose import JWTError, jwt
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import settings
+from utils.shared_state import SharedState, shared_state
+
+# How long a user's reads stay on the primary after their own write, should
+# exceed the replica lag
+READ_YOUR_WRITES_SECONDS = settings.read_your_writes_seconds
+
+
+class ReadOnlySessionError(RuntimeError):
+    pass
+
+
+def request_writer(request: Request) -> Optional[str]:
+    """
+    Who the request acts for, the user id claim of its bearer token. Read
+    unverified: it only picks the database a read goes to, authentication
+    is get_current_user's job.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        user_id = jwt.get_unverified_claims(token).get("id")
+    except JWTError:
+        return None
+    return None if user_id is None else str(user_id)
+
+
+class ReadRouting:
+    """
+    Read-your-writes bookkeeping for replica reads. A request whose primary
+    session committed a write opens a window of `window_seconds` for its
+    writer, in the shared state so that every worker sees it; that writer's
+    read sessions use the primary until it closes, by when the replica has
+    caught up.
+    """
+
+    def __init__(
+        self, window_seconds: float = READ_YOUR_WRITES_SECONDS, state: SharedState = shared_state
+    ):
+        self.window_seconds = window_seconds
+        self.state = state
+        self.replica_sessions = 0
+        self.primary_sessions = 0
+
+    async def mark_write(self, writer: str):
+        await self.state.set(_window_key(writer), self.window_seconds)
+
+    async def wrote_recently(self, writer: Optional[str]) -> bool:
+        if writer is None:
+            return False
+        return await self.state.exists(_window_key(writer))
+
+    async def use_replica(self, writer: Optional[str]) -> bool:
+        if await self.wrote_recently(writer):
+            self.primary_sessions += 1
+            return False
+        self.replica_sessions += 1
+        return True
+
+    def clear(self):
+        self.replica_sessions = self.primary_sessions = 0
+
+    def stats(self) -> dict:
+        return {
+            "replica_sessions": self.replica_sessions,
+            "primary_sessions": self.primary_sessions,
+        }
+
+
+def _window_key(writer: str) -> str:
+    return f"wrote:{writer}"
+
+
+read_routing = ReadRouting()
+
+
+def _mark_written(session: Session):
+    if session.info.get("read_only"):
+        raise ReadOnlySessionError("Write on a read-only session")
+    # Kept for the session's lifetime, later reads of the request see the write
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_written(orm_execute_state.session)
+
+
+@event.listens_for(Session, "before_flush")
+def _track_flush(session, flush_context, instances):
+    _mark_written(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _record_commit(session):
+    # The window opens once the request is done with the session, see
+    # database.get_write_session; commit hooks cannot wait on the shared state
+    if session.info.get("wrote"):
+        session.info["committed_write"] = True
@@ -0,0 +1,25 @@
+import re
+from typing import List
+
+# Longer queries are cut, every term narrows the match (AND semantics)
+SEARCH_MAX_TERMS = 8
+SEARCH_MAX_QUERY_LENGTH = 200
+
+_WORD = re.compile(r"\w+")
+
+
+def search_terms(q: str) -> List[str]:
+    """Lowercased words of a search query in order, without duplicates."""
+    terms = dict.fromkeys(word.lower() for word in _WORD.findall(q))
+    return list(terms)[:SEARCH_MAX_TERMS]
+
+
+def fts5_query(terms: List[str]) -> str:
+    # Quoted so that FTS5 syntax typed by users is matched as plain words,
+    # the trailing * makes every term a prefix ("deploy" finds "deployment")
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def boolean_mode_query(terms: List[str]) -> str:
+    # MySQL BOOLEAN MODE, every term required and matched as a prefix
+    return " ".join(f"+{term}*" for term in terms)
@@ -0,0 +1,176 @@
+import math
+import time
+from datetime import timedelta
+
+from sqlalchemy import delete
+from sqlmodel import select
+
+from config import settings
+from models.shared_state import SharedStateKey
+from utils.clock import utc_now
+from utils.upsert import replace_statement
+
+# database: the shared_state table of the primary, redis: shared by all
+# workers too, local: this process only, exact with a single worker
+SHARED_STATE_BACKEND = settings.shared_state_backend.lower()
+SHARED_STATE_REDIS_URL = settings.shared_state_redis_url
+# How often a worker deletes the expired keys of the table, on a write
+SHARED_STATE_PRUNE_SECONDS = 60
+
+
+class LocalStateBackend:
+    """
+    Expiring keys of this process. Unbounded, expired keys are dropped
+    whenever the map has doubled since the last time.
+    """
+
+    def __init__(self, min_prune_size: int = 1024):
+        self.min_prune_size = min_prune_size
+        self._keys: dict[str, float] = {}
+        self._prune_size = min_prune_size
+
+    async def set(self, key: str, ttl_seconds: float):
+        now = time.monotonic()
+        self._keys[key] = now + ttl_seconds
+        if len(self._keys) >= self._prune_size:
+            self._keys = {k: expires_at for k, expires_at in self._keys.items() if expires_at > now}
+            self._prune_size = max(2 * len(self._keys), self.min_prune_size)
+
+    async def exists(self, key: str) -> bool:
+        expires_at = self._keys.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._keys[key]
+            return False
+        return True
+
+    async def delete(self, key: str):
+        self._keys.pop(key, None)
+
+    def clear(self):
+        self._keys.clear()
+        self._prune_size = self.min_prune_size
+
+    def stats(self) -> dict:
+        return {"keys": len(self._keys)}
+
+
+class RedisStateBackend:
+    """
+    Keys with a Redis expiry, over an asyncio Redis client or anything with
+    the same get/set(ex=)/delete coroutines.
+    """
+
+    def __init__(self, client, prefix: str = "taskmanager:state:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def set(self, key: str, ttl_seconds: float):
+        await self.client.set(self.prefix + key, "1", ex=math.ceil(ttl_seconds))
+
+    async def exists(self, key: str) -> bool:
+        return await self.client.get(self.prefix + key) is not None
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class DatabaseStateBackend:
+    """
+    Keys in the shared_state table. Every call is one statement on a
+    session of its own, committed right away whatever the caller's
+    transaction does.
+    """
+
+    def __init__(self, session_maker=None, prune_seconds: float = SHARED_STATE_PRUNE_SECONDS):
+        self._session_maker = session_maker
+        self.prune_seconds = prune_seconds
+        self._pruned_at = time.monotonic()
+
+    @property
+    def session_maker(self):
+        if self._session_maker is None:
+            # Imported late, database imports the modules that use this one
+            from database import async_session_maker
+
+            self._session_maker = async_session_maker
+        return self._session_maker
+
+    async def set(self, key: str, ttl_seconds: float):
+        table = SharedStateKey.__table__
+        async with self.session_maker() as session:
+            await session.exec(
+                replace_statement(session, table, ("expires_at",)),
+                params=[{"key": key, "expires_at": utc_now() + timedelta(seconds=ttl_seconds)}],
+            )
+            if time.monotonic() - self._pruned_at >= self.prune_seconds:
+                self._pruned_at = time.monotonic()
+                await session.exec(
+                    delete(SharedStateKey).where(SharedStateKey.expires_at <= utc_now())
+                )
+            await session.commit()
+
+    async def exists(self, key: str) -> bool:
+        query = select(SharedStateKey.key).where(
+            SharedStateKey.key == key, SharedStateKey.expires_at > utc_now()
+        )
+        async with self.session_maker() as session:
+            return (await session.exec(query)).first() is not None
+
+    async def delete(self, key: str):
+        async with self.session_maker() as session:
+            await session.exec(delete(SharedStateKey).where(SharedStateKey.key == key))
+            await session.commit()
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class SharedState:
+    """
+    Expiring keys that every worker sees, for state that must not stay in
+    the worker that wrote it: revoked users (principal_cache) and recent
+    writers (read_routing). Keys carry no value, they are either set or not.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def set(self, key: str, ttl_seconds: float):
+        if ttl_seconds > 0:
+            await self.backend.set(key, ttl_seconds)
+
+    async def exists(self, key: str) -> bool:
+        return await self.backend.exists(key)
+
+    async def delete(self, key: str):
+        await self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        return {"backend": SHARED_STATE_BACKEND, **self.backend.stats()}
+
+
+def create_backend(name: str = SHARED_STATE_BACKEND):
+    if name == "local":
+        return LocalStateBackend()
+    if name == "redis":
+        import redis.asyncio as redis
+
+        return RedisStateBackend(redis.from_url(SHARED_STATE_REDIS_URL))
+    return DatabaseStateBackend()
+
+
+shared_state = SharedState(create_backend())
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, Optional, TypeVar
+
+from fastapi import Request
+
+from config import settings
+from models.user import UserOutDTO
+from utils.exception import SingleFlightLeaderCancelledException
+from utils.read_routing import read_routing
+
+# Identical concurrent reads share one query and body, false runs each alone
+REQUEST_COALESCING = settings.request_coalescing
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent reads: the first caller of a key runs
+    it, callers arriving while it runs wait for its result instead of
+    running their own. Nothing is kept once the flight lands, this is not
+    a cache; results are shared, so they must not be mutated (bytes, str).
+
+    Errors reach every caller of the flight. When the leader is cancelled
+    its followers each run their own function instead. A writer inside the
+    read-your-writes window never joins a flight: one that started before
+    their write committed could hide it. Per process, like the task
+    cache's local backend.
+    """
+
+    def __init__(self, enabled: bool = REQUEST_COALESCING):
+        self.enabled = enabled
+        self._flights: dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.collapsed = 0
+        self.bypassed = 0
+        self.retried = 0
+
+    async def do(
+        self,
+        key: Optional[Hashable],
+        fn: Callable[[], Awaitable[T]],
+        writer: Optional[str] = None,
+    ) -> T:
+        """
+        fn()'s result, from the flight of `key` if one is running. No key
+        runs fn alone, and so does a `writer` who wrote recently.
+        """
+        if key is None or not self.enabled:
+            self.bypassed += 1
+            return await fn()
+
+        # Only followers ask, a leader reads after any write of theirs
+        if key in self._flights and await read_routing.wrote_recently(writer):
+            self.bypassed += 1
+            return await fn()
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.collapsed += 1
+            try:
+                # A follower going away must not cancel the flight
+                return await asyncio.shield(flight)
+            except SingleFlightLeaderCancelledException:
+                self.retried += 1
+                return await fn()
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        self.leaders += 1
+        try:
+            result = await fn()
+        except BaseException as exc:
+            # Cancellation is the leader's own, not the flight's outcome
+            outcome = exc if isinstance(exc, Exception) else SingleFlightLeaderCancelledException()
+            flight.set_exception(outcome)
+            # Marks it retrieved, a flight without followers must not log
+            # "exception was never retrieved"
+            flight.exception()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            # clear() may have dropped it meanwhile
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def clear(self):
+        self._flights.clear()
+        self.leaders = self.collapsed = self.bypassed = self.retried = 0
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+            "bypassed": self.bypassed,
+            "retried": self.retried,
+        }
+
+
+single_flight = SingleFlight()
+
+
+def flight_key(request: Request, principal: UserOutDTO, *params: Hashable) -> tuple:
+    """
+    Key of a coalescable read: route, parsed parameters and what the
+    principal may see.
+    """
+    route = request.scope.get("route")
+    return (
+        request.method,
+        route.path if route is not None else request.url.path,
+        "admin" if principal.is_admin else "user",
+        *params,
+    )
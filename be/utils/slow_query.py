@@ -0,0 +1,115 @@
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged with their plan, 0 disables
+SLOW_QUERY_MS = settings.slow_query_ms
+SLOW_QUERY_EXPLAIN = settings.slow_query_explain
+# Parameters hold user data (emails, password hashes), only logged when true
+SLOW_QUERY_LOG_PARAMS = settings.slow_query_log_params
+SLOW_QUERY_MAX_LENGTH = 2000
+
+EXPLAIN_PREFIXES = {"mysql": "EXPLAIN ", "sqlite": "EXPLAIN QUERY PLAN "}
+
+
+class SlowQueryLog:
+    """
+    Logs statements slower than the threshold at WARNING: duration,
+    statement, parameters and the EXPLAIN plan of SELECTs. The plan is read
+    on the same connection right after the statement, so it reflects the
+    transaction's view and the statistics of that moment.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        explain: bool = SLOW_QUERY_EXPLAIN,
+        log_params: bool = SLOW_QUERY_LOG_PARAMS,
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.log_params = log_params
+        self.slow = 0
+        self.explained = 0
+        self.explain_errors = 0
+
+    def attach(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        context._slow_query_start = time.perf_counter()
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        if self.threshold_ms <= 0:
+            return
+        elapsed_ms = (time.perf_counter() - context._slow_query_start) * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+
+        self.slow += 1
+        plan = None
+        # Not while a streamed result still holds the connection (export)
+        streaming = context.execution_options.get("stream_results", False)
+        if self.explain and not executemany and not streaming and _is_select(statement):
+            plan = self._explain(conn, statement, parameters)
+        logger.warning(
+            "Slow query (%.1f ms): %s params=%s plan=%s",
+            elapsed_ms,
+            _truncate(" ".join(statement.split())),
+            _truncate(repr(parameters)) if self.log_params else "<hidden>",
+            plan,
+        )
+
+    def _explain(self, conn, statement: str, parameters) -> Optional[str]:
+        prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+        if prefix is None:
+            return None
+        # On the raw DBAPI cursor, the EXPLAIN itself goes through no events
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception:
+            self.explain_errors += 1
+            logger.debug("EXPLAIN of a slow query failed", exc_info=True)
+            return None
+        finally:
+            cursor.close()
+        self.explained += 1
+        return _truncate("; ".join(" | ".join(str(value) for value in row) for row in rows))
+
+    def clear(self):
+        self.slow = self.explained = self.explain_errors = 0
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.threshold_ms,
+            "slow": self.slow,
+            "explained": self.explained,
+            "explain_errors": self.explain_errors,
+        }
+
+
+def _is_select(statement: str) -> bool:
+    return statement.lstrip().lower().startswith(("select", "with"))
+
+
+def _truncate(text: str) -> str:
+    if len(text) <= SLOW_QUERY_MAX_LENGTH:
+        return text
+    return text[:SLOW_QUERY_MAX_LENGTH] + "..."
+
+
+slow_query_log = SlowQueryLog()
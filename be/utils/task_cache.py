@@ -0,0 +1,245 @@
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from config import settings
+from models.task import Task, TaskFilterDTO, TaskWithAssigneeDTO
+from utils.etag import make_etag
+
+# local: per process LRU, redis: shared by all workers, none: disabled
+TASK_CACHE_BACKEND = settings.task_cache_backend.lower()
+TASK_CACHE_SIZE = settings.task_cache_size
+TASK_CACHE_TTL_SECONDS = settings.task_cache_ttl_seconds
+TASK_CACHE_REDIS_URL = settings.task_cache_redis_url
+
+
+class LocalCacheBackend:
+    """Bounded LRU + TTL map of serialized values, private to the process."""
+
+    def __init__(self, max_size: int = TASK_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl_seconds: float):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "evictions": self.evictions}
+
+
+class RedisCacheBackend:
+    """
+    Shared backend over an asyncio Redis client, or anything with the same
+    get/set(ex=)/delete coroutines. Evictions are Redis' own (maxmemory).
+    """
+
+    def __init__(self, client, prefix: str = "taskmanager:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value
+
+    async def set(self, key: str, value: str, ttl_seconds: float):
+        await self.client.set(self.prefix + key, value, ex=math.ceil(ttl_seconds))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class TaskCache:
+    """
+    Read-through cache of single tasks and of per-assignee pages
+    (GET /tasks/{task_id} and /tasks/my), stored with their ETag so that
+    conditional requests are answered from the cache too.
+
+    Tasks are keyed by a per-task version and pages by a per-assignee one.
+    A write bumps the versions it affects instead of deleting entries, so a
+    read that loaded the old row before the write cannot put it back, and
+    every limit/cursor/filter combination of a page goes at once. Embedded
+    assignee fields follow user writes within the TTL.
+    """
+
+    def __init__(self, backend=None, ttl_seconds: float = TASK_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def task_key(self, task_id: int) -> Optional[str]:
+        """
+        Key of a task under its current version. Read it before loading the
+        task, like page_key.
+        """
+        if not self.enabled:
+            return None
+        return f"tasks:id:{task_id}:{await self._version(_task_version_key(task_id))}"
+
+    async def get_task(self, key: Optional[str]) -> Optional[Tuple[str, TaskWithAssigneeDTO]]:
+        cached = await self._get(key)
+        if cached is None:
+            return None
+        return cached["etag"], _task_from_cache(cached["task"])
+
+    async def set_task(self, key: Optional[str], task: Task):
+        if not self.enabled:
+            return
+        value = {"etag": task_etag(task), "task": _task_to_cache(task)}
+        await self.backend.set(key, json.dumps(value), self.ttl_seconds)
+
+    async def page_key(
+        self, user_id: int, limit: int, cursor: Optional[str], filters: TaskFilterDTO
+    ) -> Optional[str]:
+        """
+        Key of a per-assignee page under the assignee's current version. Read it
+        before loading the page: a write racing with the load bumps the version,
+        which leaves the filled entry unreachable instead of stale.
+        """
+        if not self.enabled:
+            return None
+        version = await self._version(_version_key(user_id))
+        params = json.dumps(
+            [limit, cursor, filters.model_dump()], sort_keys=True, separators=(",", ":")
+        )
+        return f"tasks:assignee:{user_id}:{version}:{params}"
+
+    async def get_page(
+        self, key: Optional[str]
+    ) -> Optional[Tuple[str, List[dict], Optional[str]]]:
+        cached = await self._get(key)
+        if cached is None:
+            return None
+        return cached["etag"], cached["items"], cached["next_cursor"]
+
+    async def set_page(
+        self, key: Optional[str], etag: str, tasks: List[dict], next_cursor: Optional[str]
+    ):
+        """Pages are the plain dicts of TaskService.find_all, stored as they are."""
+        if not self.enabled:
+            return
+        value = {"etag": etag, "items": tasks, "next_cursor": next_cursor}
+        await self.backend.set(key, json.dumps(value), self.ttl_seconds)
+
+    async def invalidate(
+        self, task_ids: Iterable[int] = (), assignee_ids: Iterable[int | None] = ()
+    ):
+        if not self.enabled:
+            return
+        version_keys = {_task_version_key(task_id) for task_id in task_ids}
+        version_keys |= {_version_key(a) for a in assignee_ids if a is not None}
+        for version_key in version_keys:
+            # A fresh token rather than a counter, which could restart at a
+            # value whose entries are still cached once the version key is evicted
+            await self.backend.set(version_key, str(time.time_ns()), self.ttl_seconds * 2)
+
+    async def _version(self, version_key: str) -> str:
+        version = await self.backend.get(version_key)
+        if version is None:
+            # Losing the version key only costs misses, see invalidate
+            version = str(time.time_ns())
+            await self.backend.set(version_key, version, self.ttl_seconds * 2)
+        return version
+
+    async def _get(self, key: Optional[str]) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": TASK_CACHE_BACKEND if self.enabled else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": 0,
+            **(self.backend.stats() if self.enabled else {}),
+        }
+
+
+def task_etag(task: Task) -> str:
+    # Same value as TaskService.get_task_etag, from an already loaded task
+    assignee_updated_at = task.assignee.updated_at if task.assignee else None
+    return make_etag("task", task.id, task.updated_at, assignee_updated_at)
+
+
+def _task_version_key(task_id: int) -> str:
+    return f"tasks:id:{task_id}:version"
+
+
+def _version_key(user_id: int) -> str:
+    return f"tasks:assignee:{user_id}:version"
+
+
+def _task_to_cache(task: Task) -> dict:
+    return TaskWithAssigneeDTO.model_validate(task).model_dump(mode="json")
+
+
+def _task_from_cache(data: dict) -> TaskWithAssigneeDTO:
+    return TaskWithAssigneeDTO.model_validate(data)
+
+
+def create_backend(name: str = TASK_CACHE_BACKEND):
+    if name == "none":
+        return None
+    if name == "redis":
+        # Optional dependency, only needed for the shared backend
+        import redis.asyncio as redis
+
+        return RedisCacheBackend(redis.from_url(TASK_CACHE_REDIS_URL))
+    return LocalCacheBackend()
+
+
+task_cache = TaskCache(create_backend())
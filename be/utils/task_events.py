@@ -0,0 +1,277 @@
+import asyncio
+import json
+import logging
+from enum import StrEnum
+from typing import AsyncIterator, Iterable, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# local: subscribers of this process only, redis: fanned out to every worker
+TASK_EVENTS_BACKEND = settings.task_events_backend.lower()
+TASK_EVENTS_REDIS_URL = settings.task_events_redis_url
+TASK_EVENTS_QUEUE_SIZE = settings.task_events_queue_size
+TASK_EVENTS_HEARTBEAT_SECONDS = settings.task_events_heartbeat_seconds
+
+
+class TaskEventType(StrEnum):
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+    # Sent to a subscriber that fell behind, the stream ends after it
+    resync = "resync"
+    # Sent to the streams of a deactivated user, the stream ends after it
+    closed = "closed"
+
+
+def sse_frame(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+RESYNC_FRAME = sse_frame(TaskEventType.resync, "{}")
+CLOSED_FRAME = sse_frame(TaskEventType.closed, "{}")
+# Frames after which event_stream ends
+TERMINAL_FRAMES = (RESYNC_FRAME, CLOSED_FRAME)
+HEARTBEAT_FRAME = ": keep-alive\n\n"
+# Reconnection delay for EventSource clients
+RETRY_FRAME = "retry: 3000\n\n"
+
+
+class Subscription:
+    """
+    Bounded queue of SSE frames for one stream. A subscriber that lets it
+    fill up is closed with a resync frame instead of slowing everyone down.
+    """
+
+    def __init__(self, user_id: int, is_admin: bool, max_size: int):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.queue: asyncio.Queue[str] = asyncio.Queue(max_size)
+        self.closed = False
+
+    def wants(self, assignee_ids: Iterable[int]) -> bool:
+        return self.is_admin or self.user_id in assignee_ids
+
+    def put(self, frame: str) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.close(RESYNC_FRAME)
+            return False
+
+    def close(self, frame: str):
+        """Drops the pending frames and leaves `frame` as the last one."""
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(frame)
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+
+class RedisEventBackend:
+    """
+    Cross-worker transport over Redis pub/sub, or anything with the same
+    publish() and pubsub() coroutines. Every worker, the publishing one
+    included, receives the message through its listener.
+    """
+
+    def __init__(self, client, channel: str = "taskmanager:task-events"):
+        self.client = client
+        self.channel = channel
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver):
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(deliver))
+
+    async def _listen(self, deliver):
+        async for message in self._pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            data = message["data"]
+            deliver(data.decode() if isinstance(data, bytes) else data)
+
+    async def publish(self, message: str):
+        await self.client.publish(self.channel, message)
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+
+class TaskEventBroker:
+    """
+    Fan-out of task change deltas to the /tasks/events streams. Each event is
+    serialized and framed once, then queued to every subscriber allowed to
+    see it: admins get every event, other users the events of tasks assigned
+    to them before or after the change.
+
+    Without a backend events stay in this process; with one they go through
+    it and come back to each worker's fan-out. So does close_user, which
+    ends the streams of a user on every worker.
+    """
+
+    def __init__(self, backend=None, queue_size: int = TASK_EVENTS_QUEUE_SIZE):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscriptions: set[Subscription] = set()
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+        self.closed = 0
+
+    async def start(self):
+        if self.backend is not None:
+            await self.backend.start(self._fan_out)
+
+    async def stop(self):
+        if self.backend is not None:
+            await self.backend.stop()
+
+    def subscribe(self, user_id: int, is_admin: bool) -> Subscription:
+        subscription = Subscription(user_id, is_admin, self.queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    async def publish(
+        self,
+        event_type: TaskEventType,
+        tasks: Iterable[dict],
+        assignee_ids: Iterable[Iterable[int | None]],
+    ):
+        """
+        One event per task, `assignee_ids` holds the assignees of each task
+        before and after the change. Failures are logged, never raised: the
+        write they describe is already committed.
+        """
+        messages = [
+            json.dumps(
+                {
+                    "type": event_type,
+                    "task": task,
+                    "assignee_ids": sorted({a for a in assignees if a is not None}),
+                },
+                separators=(",", ":"),
+            )
+            for task, assignees in zip(tasks, assignee_ids)
+        ]
+        if not messages:
+            return
+        self.published += len(messages)
+        if self.backend is None:
+            for message in messages:
+                self._fan_out(message)
+            return
+        try:
+            for message in messages:
+                await self.backend.publish(message)
+        except Exception:
+            logger.exception("Publishing task events failed")
+
+    async def close_user(self, user_id: int):
+        """
+        Ends the streams of a user with a closed frame, for a deactivation.
+        Failures are logged, never raised, like those of publish.
+        """
+        if self.backend is None:
+            self._close_user(user_id)
+            return
+        message = json.dumps(
+            {"type": TaskEventType.closed, "user_id": user_id}, separators=(",", ":")
+        )
+        try:
+            await self.backend.publish(message)
+        except Exception:
+            logger.exception("Publishing the end of the task events of a user failed")
+
+    def _close_user(self, user_id: int):
+        for subscription in list(self._subscriptions):
+            if subscription.user_id == user_id:
+                subscription.close(CLOSED_FRAME)
+                self._subscriptions.discard(subscription)
+                self.closed += 1
+
+    def _fan_out(self, message: str):
+        if not self._subscriptions:
+            return
+        event = json.loads(message)
+        if event["type"] == TaskEventType.closed:
+            self._close_user(event["user_id"])
+            return
+        frame = sse_frame(event["type"], json.dumps(event["task"], separators=(",", ":")))
+        for subscription in list(self._subscriptions):
+            if not subscription.wants(event["assignee_ids"]):
+                continue
+            if subscription.put(frame):
+                self.delivered += 1
+            elif subscription.closed:
+                self.resyncs += 1
+                self._subscriptions.discard(subscription)
+
+    def clear(self):
+        self._subscriptions.clear()
+        self.published = self.delivered = self.resyncs = self.closed = 0
+
+    def stats(self) -> dict:
+        return {
+            "backend": TASK_EVENTS_BACKEND if self.backend is not None else "local",
+            "subscribers": len(self._subscriptions),
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+            "closed": self.closed,
+        }
+
+
+async def event_stream(
+    broker: TaskEventBroker,
+    subscription: Subscription,
+    heartbeat_seconds: float = TASK_EVENTS_HEARTBEAT_SECONDS,
+) -> AsyncIterator[str]:
+    """
+    SSE body of one subscription, with comment lines as heartbeats so that
+    proxies keep the connection open. Ends after a resync or closed frame;
+    the subscription is dropped when the client disconnects.
+    """
+    try:
+        yield RETRY_FRAME
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscription.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT_FRAME
+                continue
+            yield frame
+            if frame in TERMINAL_FRAMES:
+                return
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def create_backend(name: str = TASK_EVENTS_BACKEND):
+    if name == "redis":
+        # Optional dependency, only needed to reach other workers
+        import redis.asyncio as redis
+
+        return RedisEventBackend(redis.from_url(TASK_EVENTS_REDIS_URL))
+    return None
+
+
+task_events = TaskEventBroker(create_backend())
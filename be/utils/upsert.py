@@ -0,0 +1,56 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+def increment_statement(session: AsyncSession, table, columns):
+    """
+    INSERT of the given values that adds them to the existing row's columns
+    instead when the primary key is taken (ON DUPLICATE KEY / ON CONFLICT).
+    """
+    if session.bind.dialect.name == "mysql":
+        statement = mysql_insert(table)
+        return statement.on_duplicate_key_update(
+            {name: table.c[name] + statement.inserted[name] for name in columns}
+        )
+    statement = sqlite_insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=list(table.primary_key),
+        set_={name: table.c[name] + statement.excluded[name] for name in columns},
+    )
+
+
+def counter_statement(session: AsyncSession, table, key: dict, column: str, amount: int):
+    """
+    increment_statement of a single counter column by `amount`, whose new
+    value comes back from the statement itself: in RETURNING, or on MySQL
+    as the result's lastrowid, through LAST_INSERT_ID(expr).
+    """
+    if session.bind.dialect.name == "mysql":
+        statement = mysql_insert(table).values(**key, **{column: func.last_insert_id(amount)})
+        return statement.on_duplicate_key_update(
+            {column: func.last_insert_id(table.c[column] + statement.inserted[column])}
+        )
+    statement = sqlite_insert(table).values(**key, **{column: amount})
+    return statement.on_conflict_do_update(
+        index_elements=list(table.primary_key),
+        set_={column: table.c[column] + statement.excluded[column]},
+    ).returning(table.c[column])
+
+
+def replace_statement(session: AsyncSession, table, columns):
+    """
+    INSERT of the given values that overwrites the existing row's columns
+    with them instead when the primary key is taken.
+    """
+    if session.bind.dialect.name == "mysql":
+        statement = mysql_insert(table)
+        return statement.on_duplicate_key_update(
+            {name: statement.inserted[name] for name in columns}
+        )
+    statement = sqlite_insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=list(table.primary_key),
+        set_={name: statement.excluded[name] for name in columns},
+    )
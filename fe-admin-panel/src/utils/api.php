@@ -36,10 +36,24 @@ function apiRequest(string $method, string $endpoint, array $data = []) {
         $headers[] = 'Authorization: Bearer ' . $_SESSION['token'];
     }
 
+    // Revalidate previously fetched GET responses with their ETag
+    $isGet = strtoupper($method) === 'GET';
+    $cached = $isGet && isset($_SESSION['etag_cache'][$endpoint]) ? $_SESSION['etag_cache'][$endpoint] : null;
+    if ($cached) {
+        $headers[] = 'If-None-Match: ' . $cached['etag'];
+    }
+    $etag = null;
+
     curl_setopt($ch, CURLOPT_URL, $url);
     curl_setopt($ch, CURLOPT_RETURNTRANSFER, true);
     curl_setopt($ch, CURLOPT_CUSTOMREQUEST, strtoupper($method));
     curl_setopt($ch, CURLOPT_HTTPHEADER, $headers);
+    curl_setopt($ch, CURLOPT_HEADERFUNCTION, function($ch, $header) use (&$etag) {
+        if (stripos($header, 'ETag:') === 0) {
+            $etag = trim(substr($header, 5));
+        }
+        return strlen($header);
+    });
 
     if (in_array(strtoupper($method), ['POST', 'PUT', 'PATCH'])) {
         curl_setopt($ch, CURLOPT_POSTFIELDS, json_encode($data));
@@ -65,15 +79,34 @@ function apiRequest(string $method, string $endpoint, array $data = []) {
         exit;
     }
 
+    if ($status === 304 && $cached) {
+        return ['status' => 200, 'body' => $cached['body']];
+    }
+
     $body = json_decode($response, true);
+    if ($isGet && $status === 200 && $etag !== null && isset($_SESSION)) {
+        $_SESSION['etag_cache'][$endpoint] = ['etag' => $etag, 'body' => $body];
+    }
     return ['status' => $status, 'body' => $body];
 }
 
+// Follows next_cursor of a paginated listing and returns every item
+function apiRequestAllPages(string $endpoint, string $errorMessage) {
+    $items = [];
+    $cursor = null;
+    do {
+        $query = $cursor === null ? '' : '?' . http_build_query(['cursor' => $cursor]);
+        $res = apiRequest('GET', $endpoint . $query);
+        if ($res['status'] !== 200) throw new Exception($errorMessage);
+        $items = array_merge($items, $res['body']['items']);
+        $cursor = $res['body']['next_cursor'];
+    } while ($cursor !== null);
+    return $items;
+}
+
 // Task functions
 function getTasks() {
-    $res = apiRequest('GET', '/tasks/');
-    if ($res['status'] !== 200) throw new Exception('Failed to fetch tasks');
-    return $res['body'];
+    return apiRequestAllPages('/tasks/', 'Failed to fetch tasks');
 }
 
 function getTask($id) {
@@ -106,9 +139,7 @@ function deleteTask($id) {
 
 // User functions
 function getUsers() {
-    $res = apiRequest('GET', '/users/all');
-    if ($res['status'] !== 200) throw new Exception('Failed to fetch users');
-    return $res['body'];
+    return apiRequestAllPages('/users/all', 'Failed to fetch users');
 }
 
 function updateUserStatus($userId, $isActive) {
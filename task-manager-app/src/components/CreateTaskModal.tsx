@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useCreateTask } from '../hooks/useCreateTask';
-import api from '../utils/api';
+import { fetchAllPages } from '../utils/api';
 
 interface User {
     id: number;
@@ -33,8 +33,7 @@ export default function CreateTaskModal({ isOpen, onClose, onTaskCreated }: Crea
         setLoading(true);
         setError('');
         try {
-            const response = await api.get('/users/all');
-            setUsers(response.data);
+            setUsers(await fetchAllPages<User>('/users/all'));
         } catch (err: any) {
             setError(err.response?.data?.detail || err.message || 'Failed to load users');
         } finally {
@@ -2,7 +2,7 @@ import { useState, useEffect } from 'react';
 import { useUpdateTask } from '../hooks/useUpdateTask';
 import { useDeleteTask } from '../hooks/useDeleteTask';
 import { useCompleteTask } from '../hooks/useCompleteTask';
-import api from '../utils/api';
+import { fetchAllPages } from '../utils/api';
 
 interface User {
     id: number;
@@ -56,8 +56,7 @@ export default function TaskDetailsModal({ isOpen, onClose, task, onTaskUpdated
     const fetchUsers = async () => {
         setLoadingUsers(true);
         try {
-            const response = await api.get('/users/all');
-            setUsers(response.data);
+            setUsers(await fetchAllPages<User>('/users/all'));
         } catch (err: any) {
             console.error('Failed to load users:', err.response?.data?.detail || err.message);
         } finally {
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import api from "../utils/api";
+import { fetchAllPages } from "../utils/api";
 
 export interface Task {
   id: number;
@@ -28,8 +28,7 @@ export function useTasks() {
     setLoading(true);
     setError(null);
     try {
-      const response = await api.get('/tasks/my');
-      setTasks(response.data);
+      setTasks(await fetchAllPages<Task>('/tasks/my'));
     } catch (err: any) {
       setError(err.response?.data?.detail || err.message || "Unknown error");
     } finally {
@@ -36,4 +36,16 @@ api.interceptors.response.use(
     }
 );
 
+// Follows next_cursor of a paginated listing until every item is loaded
+export async function fetchAllPages<T>(url: string, params: Record<string, unknown> = {}): Promise<T[]> {
+    const items: T[] = [];
+    let cursor: string | null = null;
+    do {
+        const response = await api.get(url, { params: { ...params, cursor: cursor ?? undefined } });
+        items.push(...response.data.items);
+        cursor = response.data.next_cursor;
+    } while (cursor);
+    return items;
+}
+
 export default api; 
\ No newline at end of file